@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""日志开销基准测试
+
+模拟每个角色签到时的日志调用，对比两种日志配置下每次签到的平均日志开销：
+- sync: 旧写法（f-string 立即格式化、DEBUG 日志解析响应体、文件输出在调用线程同步写入）
+- queued: 当前写法（参数延迟格式化、文件写入/轮转/压缩交给后台线程）
+
+用法::
+
+    python benchmarks/bench_logging.py --signs 5000
+"""
+
+import sys
+import os
+from pathlib import Path
+
+# 获取项目根目录
+ROOT_DIR = Path(__file__).parent.parent
+SRC_DIR = ROOT_DIR / "src"
+
+# 添加到 Python 路径
+sys.path.insert(0, str(SRC_DIR))
+os.environ["PYTHONPATH"] = str(SRC_DIR)
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+
+from loguru import logger
+
+from utils.logger import shutdown_logger
+
+# 模拟的签到响应体
+RESPONSE_TEXT = json.dumps(
+    {
+        "code": 0,
+        "message": "OK",
+        "data": {"awards": [{"resource": {"name": f"道具{i}", "type": "MATERIAL"}, "count": i} for i in range(5)]},
+    },
+    ensure_ascii=False,
+)
+
+
+CONSOLE_FORMAT = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+FILE_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+
+
+class _Response:
+    text = RESPONSE_TEXT
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def _configure_sync(log_dir: Path, json_sink: bool, rotation: str):
+    """旧的日志配置：文件输出在调用线程同步写入"""
+    from utils.logger import _json_format
+
+    logger.remove()
+    logger.add(sys.stdout, level="INFO", format=CONSOLE_FORMAT, colorize=True)
+    for name, level in (("app.log", "INFO"), ("error.log", "ERROR")):
+        logger.add(log_dir / name, level=level, format=FILE_FORMAT, rotation=rotation, compression="zip", encoding="utf-8")
+    if json_sink:
+        logger.add(log_dir / "app.jsonl", level="INFO", format=_json_format, rotation=rotation, compression="zip", encoding="utf-8")
+
+
+def _configure_queued(log_dir: Path, json_sink: bool, rotation: str):
+    """当前的日志配置（utils.logger.setup_logger）"""
+    from config import config
+    from utils.logger import setup_logger
+
+    config.logging.level = "INFO"
+    config.logging.dir = str(log_dir)
+    config.logging.json_enabled = json_sink
+    config.logging.rotation = rotation
+    setup_logger()
+
+
+def _sign_sync(user: str, nickname: str, response: _Response):
+    logger.debug(f"明日方舟签到响应：{response.json()}")
+    logger.info(f"用户 {user} 角色 {nickname} 明日方舟签到成功")
+
+
+def _sign_queued(user: str, nickname: str, response: _Response):
+    data = response.json()  # 业务本身需要解析一次响应
+    logger.opt(lazy=True).debug("明日方舟签到响应：{}", lambda: response.text)
+    logger.info("用户 {} 角色 {} 明日方舟签到成功", user, nickname)
+    return data
+
+
+def _sign_baseline(user: str, nickname: str, response: _Response):
+    return response.json()
+
+
+def run(mode: str, signs: int, json_sink: bool, rotation: str) -> list[float]:
+    """返回每次签到的日志耗时（微秒）"""
+    response = _Response()
+    stdout = sys.stdout
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w", encoding="utf-8") as devnull:
+        # 控制台输出写入 /dev/null，避免终端速度影响结果
+        sys.stdout = devnull
+        try:
+            if mode == "baseline":
+                logger.remove()
+                sign = _sign_baseline
+            elif mode == "sync":
+                _configure_sync(Path(tmp), json_sink, rotation)
+                sign = _sign_sync
+            else:
+                _configure_queued(Path(tmp), json_sink, rotation)
+                sign = _sign_queued
+            durations = []
+            for i in range(signs):
+                start = time.perf_counter()
+                with logger.contextualize(run_id="bench", character_id=i):
+                    sign(f"用户{i % 50}", f"角色{i}", response)
+                durations.append((time.perf_counter() - start) * 1e6)
+            asyncio.run(shutdown_logger())
+            logger.remove()
+        finally:
+            sys.stdout = stdout
+    return sorted(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志开销基准测试")
+    parser.add_argument("--signs", type=int, default=5000, help="模拟签到次数")
+    parser.add_argument("--json", action="store_true", help="同时启用 JSON Lines 结构化日志")
+    parser.add_argument("--rotation", default="256 KB", help="日志轮转条件（较小的值可在测试中触发轮转和压缩）")
+    args = parser.parse_args()
+
+    print(f"模拟签到 {args.signs} 次（JSON 日志: {'开' if args.json else '关'}，轮转: {args.rotation}）")
+    print(f"{'模式':<10}{'平均':>10}{'P99':>10}{'最大':>12}")
+    for mode in ("baseline", "sync", "queued"):
+        durations = run(mode, args.signs, args.json, args.rotation)
+        mean = sum(durations) / len(durations)
+        p99 = durations[int(len(durations) * 0.99) - 1]
+        print(f"{mode:<10}{mean:>8.1f}us{p99:>8.1f}us{durations[-1]:>10.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""账号批量导入脚本
+
+从 JSON / CSV / YAML 文件批量导入账号：并发换取 cred 并同步角色，批量写入数据库。
+每个账号的结果以 JSON 行输出到标准输出，最后一行为汇总。
+
+用法::
+
+    python scripts/import_accounts.py tokens.csv
+    python scripts/import_accounts.py accounts.yaml --concurrency 10 --rate 0
+"""
+
+import sys
+import os
+from pathlib import Path
+
+# 获取项目根目录
+ROOT_DIR = Path(__file__).parent.parent
+SRC_DIR = ROOT_DIR / "src"
+
+# 添加到 Python 路径
+sys.path.insert(0, str(SRC_DIR))
+os.environ["PYTHONPATH"] = str(SRC_DIR)
+
+import argparse
+import asyncio
+import json
+from config import config
+from database import db
+from core.account_import import detect_format, import_accounts, parse_accounts
+from utils import setup_logger
+
+
+async def run(path: Path, fmt: str | None, concurrency: int | None, rate: float | None) -> int:
+    """导入账号
+
+    Returns:
+        int: 失败的账号数
+    """
+    setup_logger()
+    content = path.read_text(encoding="utf-8-sig")
+    accounts = parse_accounts(content, fmt or detect_format(path.name, content))
+
+    await db.init()
+    failed = 0
+    try:
+        async for progress in import_accounts(
+            accounts,
+            concurrency or config.scheduler.sync_concurrency,
+            config.scheduler.sync_rate_limit if rate is None else rate,
+        ):
+            if progress.get("event") == "summary":
+                failed = progress["failed"]
+            print(json.dumps(progress, ensure_ascii=False), flush=True)
+    finally:
+        await db.close()
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="森空岛自动签到 - 批量导入账号")
+    parser.add_argument("file", type=Path, help="账号列表文件（JSON / CSV / YAML）")
+    parser.add_argument("--format", choices=["json", "csv", "yaml"], help="文件格式（默认按扩展名或内容判断）")
+    parser.add_argument("--concurrency", type=int, help="同时换取 cred 的账号数（默认: SCHEDULER_SYNC_CONCURRENCY）")
+    parser.add_argument("--rate", type=float, help="每秒最多处理的账号数，0 为不限速（默认: SCHEDULER_SYNC_RATE_LIMIT）")
+
+    args = parser.parse_args()
+
+    try:
+        sys.exit(1 if asyncio.run(run(args.file, args.format, args.concurrency, args.rate)) else 0)
+    except KeyboardInterrupt:
+        print("\n导入已中断，已写入的账号会保留，重新导入时会更新")
@@ -31,15 +31,15 @@ async def init_database():
     # 确保数据目录存在
     data_dir = ROOT_DIR / "data"
     data_dir.mkdir(parents=True, exist_ok=True)
-    logger.info(f"数据目录: {data_dir}")
+    logger.info("数据目录: {}", data_dir)
 
     await db.init()
 
     # 验证表是否创建
     db_path = data_dir / "skland.db"
     if db_path.exists():
-        logger.info(f"数据库文件已创建: {db_path}")
-        logger.info(f"数据库大小: {db_path.stat().st_size} bytes")
+        logger.info("数据库文件已创建: {}", db_path)
+        logger.info("数据库大小: {} bytes", db_path.stat().st_size)
     else:
         logger.error("数据库文件未创建!")
 
@@ -61,7 +61,7 @@ async def create_test_user():
         existing = result.scalar_one_or_none()
 
         if existing:
-            logger.info(f"数据库中已有用户: {existing.name}")
+            logger.info("数据库中已有用户: {}", existing.name)
         else:
             logger.info("数据库中没有用户")
             logger.info("请通过 Web 界面添加账号: http://localhost:8080")
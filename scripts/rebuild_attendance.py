@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""签到日历重建脚本
+
+从签到记录（含归档记录）重新计算每个角色每年的签到位图。
+"""
+
+import sys
+import os
+from pathlib import Path
+
+# 获取项目根目录
+ROOT_DIR = Path(__file__).parent.parent
+SRC_DIR = ROOT_DIR / "src"
+
+# 添加到 Python 路径
+sys.path.insert(0, str(SRC_DIR))
+os.environ["PYTHONPATH"] = str(SRC_DIR)
+
+import asyncio
+import time
+from database import db
+from core.attendance import rebuild_attendance
+from utils import setup_logger
+from utils.logger import logger
+
+
+async def rebuild():
+    """重建签到日历"""
+    setup_logger()
+    await db.init()
+
+    start = time.perf_counter()
+    async with db.engine.begin() as conn:
+        count = await conn.run_sync(rebuild_attendance)
+    logger.info("已重建 {} 条签到日历，耗时 {:.2f}s", count, time.perf_counter() - start)
+
+    await db.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(rebuild())
+    except KeyboardInterrupt:
+        print("\n操作已取消")
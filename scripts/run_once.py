@@ -21,14 +21,16 @@ import argparse
 from main import SklandAutoSign
 
 
-async def run_once(game_type: str = "all"):
+async def run_once(game_type: str = "all", profile: set[str] | None = None, profile_top: int = 20):
     """运行一次签到
 
     Args:
         game_type: 游戏类型 ("arknights", "endfield", "all")
+        profile: 性能分析类型（cpu/tasks/memory），为空时不分析
+        profile_top: 性能分析报告中每项显示的条数
     """
     app = SklandAutoSign()
-    await app.run_once(game_type)
+    await app.run_once(game_type, profile, profile_top)
 
 
 if __name__ == "__main__":
@@ -39,10 +41,34 @@ if __name__ == "__main__":
         default="all",
         help="游戏类型 (默认: all)"
     )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="all",
+        default=None,
+        metavar="KINDS",
+        help="启用性能分析，可选 cpu,tasks,memory 的逗号组合 (默认: all)，结果写入 data/profiles/"
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=20,
+        metavar="N",
+        help="性能分析报告中每项显示的条数 (默认: 20)"
+    )
 
     args = parser.parse_args()
 
+    profile = None
+    if args.profile:
+        from utils.profiler import parse_profile_kinds
+
+        try:
+            profile = parse_profile_kinds(args.profile)
+        except ValueError as e:
+            parser.error(str(e))
+
     try:
-        asyncio.run(run_once(args.game))
+        asyncio.run(run_once(args.game, profile, args.profile_top))
     except KeyboardInterrupt:
         print("\n操作已取消")
@@ -3,19 +3,23 @@
 提供 Web 管理界面和 API 接口。
 """
 
+import time
 from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 
 from database import db
 from config import config, get_data_dir
-from utils.logger import logger
+from utils.logger import logger, shutdown_logger
 from scheduler import job_manager
-from api.routes import accounts, sign, records, stats
+from core.tracing import tracer
+from core.record_writer import record_writer
+from core.accounts_file import accounts_file
+from api.routes import accounts, sign, records, stats, runs, attendance
 
 
 @asynccontextmanager
@@ -24,12 +28,16 @@ async def lifespan(app: FastAPI):
     # 启动时
     logger.info("Web API 启动中...")
     await db.init()
+    await accounts_file.reload()
     job_manager.start()
     yield
     # 关闭时
     logger.info("Web API 关闭中...")
     job_manager.shutdown()
+    await record_writer.close()
     await db.close()
+    tracer.shutdown()
+    await shutdown_logger()
 
 
 def create_app() -> FastAPI:
@@ -58,6 +66,8 @@ def create_app() -> FastAPI:
     app.include_router(sign.router, prefix="/api/sign", tags=["签到管理"])
     app.include_router(records.router, prefix="/api/records", tags=["签到记录"])
     app.include_router(stats.router, prefix="/api/stats", tags=["统计信息"])
+    app.include_router(runs.router, prefix="/api/runs", tags=["运行历史"])
+    app.include_router(attendance.router, prefix="/api/attendance", tags=["签到日历"])
 
     @app.get("/", response_class=HTMLResponse)
     async def index(request: Request):
@@ -69,10 +79,31 @@ def create_app() -> FastAPI:
         """健康检查"""
         return {"status": "ok", "version": config.app.version}
 
+    if config.metrics.enabled:
+        from core.metrics import render_metrics, CONTENT_TYPE
+
+        @app.get("/metrics", include_in_schema=False)
+        async def metrics():
+            """Prometheus 指标"""
+            return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
+    if config.app.query_stats:
+        from core.query_stats import track_queries
+
+        @app.middleware("http")
+        async def query_stats(request: Request, call_next):
+            """统计请求执行的 SQL，写入 Server-Timing 响应头"""
+            start = time.perf_counter()
+            with track_queries(f"{request.method} {request.url.path}") as stats:
+                response = await call_next(request)
+            elapsed = (time.perf_counter() - start) * 1000
+            response.headers.append("Server-Timing", f"{stats.server_timing()}, app;dur={elapsed:.1f}")
+            return response
+
     @app.exception_handler(Exception)
     async def global_exception_handler(request: Request, exc: Exception):
         """全局异常处理"""
-        logger.error(f"API 错误: {exc}")
+        logger.error("API 错误: {}", exc)
         return JSONResponse(
             status_code=500,
             content={"error": str(exc)}
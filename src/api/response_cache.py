@@ -0,0 +1,90 @@
+"""接口响应缓存模块
+
+缓存只读统计接口的 JSON 响应：
+- 缓存键包含请求路径、查询参数、数据版本号和当天日期，写入数据或跨天后自动失效
+- 同一缓存键的并发请求只计算一次
+- 响应带 ETag 和 Last-Modified，浏览器再次请求时内容未变化返回 304
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from config import config
+from core.cache import AsyncTTLCache
+from core.data_version import data_version
+
+
+@dataclass
+class CachedResponse:
+    """缓存的响应"""
+
+    body: bytes
+    etag: str
+    last_modified: datetime
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {
+            "ETag": self.etag,
+            "Last-Modified": format_datetime(self.last_modified, usegmt=True),
+            # 每次都向服务器验证，未变化时返回 304
+            "Cache-Control": "no-cache",
+        }
+
+    def not_modified(self, request: Request) -> bool:
+        """请求头中的 ETag / 修改时间是否与当前响应一致"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            return self.etag in {tag.strip() for tag in if_none_match.split(",")} or if_none_match.strip() == "*"
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return self.last_modified.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+
+class ResponseCache:
+    """按数据版本失效的接口响应缓存"""
+
+    def __init__(self, name: str, ttl: float, maxsize: int):
+        self._cache = AsyncTTLCache(name, ttl, maxsize)
+
+    async def respond(self, request: Request, compute: Callable[[], Awaitable[Any]]) -> Response:
+        """返回缓存的响应，未命中时调用 compute 生成
+
+        Args:
+            request: 当前请求
+            compute: 生成响应数据的函数，返回值需可被 jsonable_encoder 序列化
+        """
+        key = f"{request.url.path}?{request.url.query}#{data_version.value}@{date.today().isoformat()}"
+        cached = await self._cache.get_or_load(key, lambda: self._render(compute))
+        if cached.not_modified(request):
+            return Response(status_code=304, headers=cached.headers)
+        return Response(content=cached.body, media_type="application/json", headers=cached.headers)
+
+    @staticmethod
+    async def _render(compute: Callable[[], Awaitable[Any]]) -> CachedResponse:
+        # 在计算前记录修改时间，计算期间发生的写入会使版本号变化，不会被当作已包含在本次结果中
+        last_modified = data_version.changed_at
+        data = await compute()
+        body = json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        # ETag 由内容生成，数据版本变化但内容未变时浏览器仍可得到 304
+        etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        return CachedResponse(body=body, etag=etag, last_modified=last_modified)
+
+    def clear(self):
+        """清空缓存"""
+        self._cache.clear()
+
+
+# 统计接口的响应缓存
+stats_cache = ResponseCache("stats", config.cache.stats_ttl, config.cache.stats_maxsize)
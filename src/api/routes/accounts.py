@@ -1,15 +1,18 @@
 """账号管理 API"""
 
+import json
 from datetime import datetime
-from typing import List
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from database import db
 from models import User, Character
 from schemas import CRED
 from core import SklandLoginAPI
+from core.cache import invalidate_cred
 from utils.logger import logger
 
 router = APIRouter()
@@ -46,40 +49,131 @@ class AccountResponse(BaseModel):
     remark: str
     created_at: datetime | None = None
     character_count: int = 0
-
-
-@router.get("/", response_model=List[AccountResponse])
-async def list_accounts():
-    """获取所有账号"""
+    last_sign_at: datetime | None = None
+    last_status: str | None = None
+    last_error_class: str | None = None
+    cred_status: str | None = None
+    cred_checked_at: datetime | None = None
+
+
+class AccountListResponse(BaseModel):
+    """账号列表响应"""
+    total: int
+    page: int
+    page_size: int
+    accounts: List[AccountResponse]
+
+
+def _truncate(value: str | None, length: int = 20) -> str:
+    """截断凭证用于展示"""
+    if value and len(value) > length:
+        return value[:length] + "..."
+    return value or ""
+
+
+@router.get("/", response_model=AccountListResponse)
+async def list_accounts(
+    page: int = Query(1, ge=1, description="页码"),
+    page_size: int = Query(50, ge=1, le=500, description="每页数量"),
+    keyword: Optional[str] = Query(None, description="按名称或备注搜索"),
+    enabled: Optional[bool] = Query(None, description="是否启用"),
+    sort: Literal["id", "name", "character_count"] = Query("id", description="排序字段"),
+    order: Literal["asc", "desc"] = Query("asc", description="排序方向"),
+):
+    """获取账号列表
+
+    账号、角色数和总数在一次查询中取得，凭证只取前 21 个字符用于截断展示。
+    """
     async with db.get_session() as session:
-        from sqlalchemy import select, func
-
-        # 获取账号列表
-        stmt = select(User)
-        result = await session.execute(stmt)
-        users = result.scalars().all()
-
-        # 获取每个账号的角色数量
-        account_list = []
-        for user in users:
-            # 修复：使用 Character 模型而不是裸列
-            char_stmt = select(func.count(Character.id)).where(Character.user_id == user.id)
-            char_result = await session.execute(char_stmt)
-            char_count = char_result.scalar() or 0
-
-            account_list.append(AccountResponse(
-                id=user.id,
-                name=user.name,
-                enabled=user.enabled,
-                token=user.token[:20] + "..." if user.token and len(user.token) > 20 else user.token,
-                cred=user.cred[:20] + "..." if user.cred and len(user.cred) > 20 else user.cred,
-                cred_token=user.cred_token[:20] + "..." if user.cred_token and len(user.cred_token) > 20 else user.cred_token,
-                user_id=user.user_id or "",
-                remark=user.remark or "",
-                character_count=char_count,
-            ))
-
-        return account_list
+        from sqlalchemy import select, func, or_
+
+        # 关联子查询，走 user_id 索引
+        def character_count():
+            return (
+                select(func.count(Character.id))
+                .where(Character.user_id == User.id, Character.deleted_at.is_(None))
+                .correlate(User)
+                .scalar_subquery()
+            )
+
+        conditions = []
+        if keyword:
+            pattern = f"%{keyword}%"
+            conditions.append(or_(User.name.like(pattern), User.remark.like(pattern)))
+        if enabled is not None:
+            conditions.append(User.enabled == enabled)
+
+        sort_column = {"id": User.id, "name": User.name, "character_count": character_count()}[sort]
+        order_by = [sort_column.desc() if order == "desc" else sort_column.asc()]
+        if sort != "id":
+            order_by.append(User.id.asc())
+
+        # 先在子查询中只按 id 分页并用窗口函数取总数，凭证和角色数只对当前页计算
+        page_rows = (
+            select(
+                User.id,
+                func.row_number().over(order_by=order_by).label("position"),
+                func.count().over().label("total"),
+            )
+            .where(*conditions)
+            .order_by(*order_by)
+            .offset((page - 1) * page_size)
+            .limit(page_size)
+            .subquery()
+        )
+        stmt = (
+            select(
+                User.id,
+                User.name,
+                User.enabled,
+                func.substr(User.token, 1, 21).label("token"),
+                func.substr(User.cred, 1, 21).label("cred"),
+                func.substr(User.cred_token, 1, 21).label("cred_token"),
+                User.user_id,
+                User.remark,
+                User.last_sign_at,
+                User.last_status,
+                User.last_error_class,
+                User.cred_status,
+                User.cred_checked_at,
+                character_count().label("character_count"),
+                page_rows.c.total,
+            )
+            .join(page_rows, page_rows.c.id == User.id)
+            .order_by(page_rows.c.position)
+        )
+        rows = (await session.execute(stmt)).all()
+
+        if rows:
+            total = rows[0].total
+        else:
+            # 超出最后一页时没有结果行，单独查询总数
+            total = (await session.execute(select(func.count(User.id)).where(*conditions))).scalar() or 0
+
+        return AccountListResponse(
+            total=total,
+            page=page,
+            page_size=page_size,
+            accounts=[
+                AccountResponse(
+                    id=row.id,
+                    name=row.name,
+                    enabled=row.enabled,
+                    token=_truncate(row.token),
+                    cred=_truncate(row.cred),
+                    cred_token=_truncate(row.cred_token),
+                    user_id=row.user_id or "",
+                    remark=row.remark or "",
+                    character_count=row.character_count,
+                    last_sign_at=row.last_sign_at,
+                    last_status=row.last_status,
+                    last_error_class=row.last_error_class,
+                    cred_status=row.cred_status,
+                    cred_checked_at=row.cred_checked_at,
+                )
+                for row in rows
+            ],
+        )
 
 
 @router.post("/", response_model=AccountResponse)
@@ -106,9 +200,9 @@ async def create_account(account: AccountCreate):
                 cred = cred_data.cred
                 cred_token = cred_data.token
                 user_id = cred_data.userId or ""
-                logger.info(f"账号 {account.name} 自动获取 cred 成功")
+                logger.info("账号 {} 自动获取 cred 成功", account.name)
             except Exception as e:
-                logger.error(f"账号 {account.name} 自动获取 cred 失败: {e}")
+                logger.error("账号 {} 自动获取 cred 失败: {}", account.name, e)
                 raise HTTPException(status_code=400, detail=f"获取 cred 失败: {e}")
 
         # 创建账号
@@ -120,6 +214,7 @@ async def create_account(account: AccountCreate):
             cred_token=cred_token,
             user_id=user_id,
             remark=account.remark,
+            cred_refreshed_at=datetime.now() if cred != account.cred else None,
         )
         session.add(user)
         await session.commit()
@@ -131,15 +226,15 @@ async def create_account(account: AccountCreate):
             try:
                 from core.sign_service import bind_characters
 
-                characters = await bind_characters(user, session)
-                character_count = len(characters)
-                logger.info(f"账号 {account.name} 自动同步角色成功，共 {character_count} 个角色")
+                sync = await bind_characters(user, session)
+                character_count = len(sync.characters)
+                logger.info("账号 {} 自动同步角色成功，共 {} 个角色", account.name, character_count)
             except Exception as e:
-                logger.warning(f"账号 {account.name} 自动同步角色失败: {e}")
+                logger.warning("账号 {} 自动同步角色失败: {}", account.name, e)
                 # 不影响账号创建，继续返回
 
         # 获取角色数量
-        char_stmt = select(func.count(Character.id)).where(Character.user_id == user.id)
+        char_stmt = select(func.count(Character.id)).where(Character.user_id == user.id, Character.deleted_at.is_(None))
         char_result = await session.execute(char_stmt)
         character_count = char_result.scalar() or 0
 
@@ -156,6 +251,44 @@ async def create_account(account: AccountCreate):
         )
 
 
+@router.post("/import")
+async def import_accounts(
+    file: UploadFile = File(..., description="账号列表文件（JSON / CSV / YAML）"),
+    format: Optional[Literal["json", "csv", "yaml"]] = Query(None, description="文件格式，为空时按扩展名或内容判断"),
+    concurrency: Optional[int] = Query(None, ge=1, le=50, description="同时换取 cred 的账号数，默认同步角色的并发数"),
+    rate: Optional[float] = Query(None, ge=0, description="每秒最多处理的账号数，默认同步角色的速率，0 为不限速"),
+):
+    """批量导入账号
+
+    并发用 token 换取 cred 并同步角色，批量写入账号和角色。
+    以 NDJSON 流式返回每个账号的结果（created / updated / failed），最后一行为汇总；
+    单个账号失败不影响其他账号。
+    """
+    from config import config
+    from core.account_import import detect_format, import_accounts as run_import, parse_accounts
+
+    data = await file.read()
+    try:
+        content = data.decode("utf-8-sig")
+        accounts = parse_accounts(content, format or detect_format(file.filename, content))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"解析导入文件失败: {e}")
+    if not accounts:
+        raise HTTPException(status_code=400, detail="导入文件中没有账号")
+
+    logger.info("开始批量导入 {} 个账号", len(accounts))
+
+    async def generate():
+        async for progress in run_import(
+            accounts,
+            concurrency or config.scheduler.sync_concurrency,
+            config.scheduler.sync_rate_limit if rate is None else rate,
+        ):
+            yield json.dumps(progress, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
 @router.get("/{account_id}", response_model=AccountResponse)
 async def get_account(account_id: int):
     """获取账号详情"""
@@ -179,6 +312,11 @@ async def get_account(account_id: int):
             user_id=user.user_id or "",
             remark=user.remark or "",
             character_count=0,
+            last_sign_at=user.last_sign_at,
+            last_status=user.last_status,
+            last_error_class=user.last_error_class,
+            cred_status=user.cred_status,
+            cred_checked_at=user.cred_checked_at,
         )
 
 
@@ -201,6 +339,7 @@ async def update_account(account_id: int, account: AccountUpdate):
         if account.token is not None:
             user.token = account.token
         if account.cred is not None:
+            invalidate_cred(user.cred)
             user.cred = account.cred
         if account.cred_token is not None:
             user.cred_token = account.cred_token
@@ -263,13 +402,15 @@ async def refresh_account_cred(account_id: int):
         try:
             grant_code = await SklandLoginAPI.get_grant_code(user.token, 0)
             cred_data = await SklandLoginAPI.get_cred(grant_code)
+            invalidate_cred(user.cred)
             user.cred = cred_data.cred
             user.cred_token = cred_data.token
+            user.cred_refreshed_at = datetime.now()
             if cred_data.userId:
                 user.user_id = cred_data.userId
             await session.commit()
 
-            logger.info(f"账号 {user.name} cred 刷新成功")
+            logger.info("账号 {} cred 刷新成功", user.name)
 
             return {
                 "message": "cred 刷新成功",
@@ -277,10 +418,44 @@ async def refresh_account_cred(account_id: int):
                 "cred_token": user.cred_token[:20] + "...",
             }
         except Exception as e:
-            logger.error(f"账号 {user.name} cred 刷新失败: {e}")
+            logger.error("账号 {} cred 刷新失败: {}", user.name, e)
             raise HTTPException(status_code=400, detail=f"刷新 cred 失败: {e}")
 
 
+@router.post("/sync")
+async def sync_all_account_characters():
+    """同步所有启用账号的角色（并发请求，批量写入）"""
+    from scheduler import job_manager
+
+    start = datetime.now()
+    results = await job_manager.sync_characters_now()
+
+    return {
+        "message": "角色同步完成",
+        "total": len(results),
+        "failed": sum(1 for sync in results.values() if sync.error),
+        "duration_ms": round((datetime.now() - start).total_seconds() * 1000),
+        "accounts": {
+            name: {
+                "added": sync.added,
+                "updated": sync.updated,
+                "removed": sync.removed,
+                "duration_ms": round(sync.duration * 1000),
+                "error": sync.error,
+            }
+            for name, sync in results.items()
+        },
+    }
+
+
+@router.post("/check")
+async def check_all_account_credentials():
+    """检查所有启用账号的凭证（并发请求，失效时自动刷新，返回每个账号的检查结果）"""
+    from scheduler import job_manager
+
+    return await job_manager.check_credentials_now()
+
+
 @router.post("/{account_id}/sync")
 async def sync_account_characters(account_id: int):
     """同步账号角色"""
@@ -297,22 +472,28 @@ async def sync_account_characters(account_id: int):
         try:
             from core.sign_service import bind_characters
 
-            characters = await bind_characters(user, session)
+            sync = await bind_characters(user, session)
+            characters = sync.characters
 
-            logger.info(f"账号 {user.name} 角色同步成功，共 {len(characters)} 个角色")
+            logger.info("账号 {} 角色同步成功，共 {} 个角色", user.name, len(characters))
 
             return {
                 "message": "角色同步成功",
                 "count": len(characters),
+                "added": sync.added,
+                "updated": sync.updated,
+                "removed": sync.removed,
                 "characters": [
                     {
                         "uid": char.uid,
                         "nickname": char.nickname,
                         "app_name": char.app_name,
+                        "last_sign_at": char.last_sign_at,
+                        "last_status": char.last_status,
                     }
                     for char in characters
                 ],
             }
         except Exception as e:
-            logger.error(f"账号 {user.name} 角色同步失败: {e}")
+            logger.error("账号 {} 角色同步失败: {}", user.name, e)
             raise HTTPException(status_code=400, detail=f"同步角色失败: {e}")
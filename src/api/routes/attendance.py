@@ -0,0 +1,120 @@
+"""签到日历 API
+
+连续签到天数、月历和漏签日期都只读取角色的签到位图（见 core.attendance），不扫描签到记录。
+"""
+
+import calendar
+from datetime import date, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+
+from database import db
+from models import Attendance, Character
+from core.attendance import day_index, month_days, streak, to_int
+
+router = APIRouter()
+
+
+class StreakResponse(BaseModel):
+    """连续签到响应"""
+    character_id: int
+    streak: int
+    signed_today: bool
+    signed_this_year: int
+
+
+class CalendarResponse(BaseModel):
+    """月历响应"""
+    character_id: int
+    year: int
+    month: int
+    signed: List[int]
+    missed: List[int]
+    signed_count: int
+
+
+class MissedResponse(BaseModel):
+    """漏签日期响应"""
+    character_id: int
+    days: int
+    missed: List[date]
+
+
+async def _load_bitmaps(character_id: int, years: Optional[set[int]] = None) -> dict[int, int]:
+    """读取角色的签到位图（年份 -> 位图整数），角色不存在时返回 404"""
+    async with db.get_session() as session:
+        from sqlalchemy import select
+
+        if await session.get(Character, character_id) is None:
+            raise HTTPException(status_code=404, detail="角色不存在")
+
+        stmt = select(Attendance.year, Attendance.days).where(Attendance.character_id == character_id)
+        if years is not None:
+            stmt = stmt.where(Attendance.year.in_(years))
+        result = await session.execute(stmt)
+        return {row.year: to_int(row.days) for row in result.all()}
+
+
+@router.get("/{character_id}/streak", response_model=StreakResponse)
+async def get_streak(character_id: int):
+    """获取连续签到天数（今天还没签到时截至昨天）"""
+    bitmaps = await _load_bitmaps(character_id)
+    today = date.today()
+    this_year = bitmaps.get(today.year, 0)
+    return StreakResponse(
+        character_id=character_id,
+        streak=streak(bitmaps, today),
+        signed_today=bool(this_year >> day_index(today) & 1),
+        signed_this_year=this_year.bit_count(),
+    )
+
+
+@router.get("/{character_id}/calendar", response_model=CalendarResponse)
+async def get_calendar(
+    character_id: int,
+    year: Optional[int] = Query(None, ge=2000, le=9999, description="年份（默认今年）"),
+    month: Optional[int] = Query(None, ge=1, le=12, description="月份（默认本月）"),
+):
+    """获取某月的签到日历（漏签只统计到今天）"""
+    today = date.today()
+    year = year or today.year
+    month = month or today.month
+    bitmaps = await _load_bitmaps(character_id, {year})
+
+    days = month_days(bitmaps.get(year, 0), year, month)
+    last_day = calendar.monthrange(year, month)[1]
+    if (year, month) == (today.year, today.month):
+        last_day = today.day
+    elif (year, month) > (today.year, today.month):
+        last_day = 0
+
+    signed = [day for day, attended in enumerate(days, start=1) if attended]
+    return CalendarResponse(
+        character_id=character_id,
+        year=year,
+        month=month,
+        signed=signed,
+        missed=[day for day, attended in enumerate(days[:last_day], start=1) if not attended],
+        signed_count=len(signed),
+    )
+
+
+@router.get("/{character_id}/missed", response_model=MissedResponse)
+async def get_missed(
+    character_id: int,
+    days: int = Query(30, ge=1, le=366, description="最近天数（不含今天）"),
+):
+    """获取最近几天的漏签日期"""
+    today = date.today()
+    start = today - timedelta(days=days)
+    bitmaps = await _load_bitmaps(character_id, {start.year, today.year})
+
+    missed = []
+    day = start
+    while day < today:
+        if not bitmaps.get(day.year, 0) >> day_index(day) & 1:
+            missed.append(day)
+        day += timedelta(days=1)
+    return MissedResponse(character_id=character_id, days=days, missed=missed)
@@ -1,13 +1,18 @@
 """签到记录 API"""
 
-from datetime import datetime, date
+import json
+from datetime import datetime, date, timedelta
 from typing import List, Optional
 
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from config import config
 from database import db
 from models import SignRecord, Character, User
+from core.archive import archive_records, archive_summary, parse_record, read_archived, read_archived_page
 
 router = APIRouter()
 
@@ -21,9 +26,12 @@ class SignRecordResponse(BaseModel):
     character_nickname: str | None
     game_type: str
     sign_time: datetime
+    sign_date: date | None = None
     status: str
+    attempts: int = 1
     rewards: str
     error_message: str
+    error_class: str | None = None
 
     class Config:
         from_attributes = True
@@ -47,7 +55,10 @@ async def get_records(
     start_date: Optional[date] = Query(None, description="开始日期"),
     end_date: Optional[date] = Query(None, description="结束日期"),
 ):
-    """获取签到记录列表"""
+    """获取签到记录列表
+
+    指定开始日期时，早于数据库中最早记录的部分从归档文件中读取（排在数据库记录之后）。
+    """
     async with db.get_session() as session:
         from sqlalchemy import select, func, desc
 
@@ -60,6 +71,8 @@ async def get_records(
             )
             .join(User, SignRecord.user_id == User.id)
             .join(Character, SignRecord.character_id == Character.id)
+            # 认领中的占位记录还没有结果，不返回
+            .where(SignRecord.status != "pending")
         )
 
         # 添加过滤条件
@@ -76,7 +89,7 @@ async def get_records(
             stmt = stmt.where(SignRecord.sign_time <= end_datetime)
 
         # 获取总数（需要使用子查询避免 JOIN 影响计数）
-        count_stmt = select(func.count(SignRecord.id))
+        count_stmt = select(func.count(SignRecord.id)).where(SignRecord.status != "pending")
         if game_type:
             count_stmt = count_stmt.where(SignRecord.game_type == game_type)
         if status:
@@ -99,6 +112,18 @@ async def get_records(
         result = await session.execute(stmt)
         rows = result.all()
 
+        # 指定开始日期时合并归档记录（总数包含归档记录，数据库中的记录不足一页时从归档中补充）
+        archived = []
+        if start_date:
+            archived_total, archived = await read_archived_page(
+                start_date,
+                end_date,
+                _archive_filters(game_type, status, user_id),
+                offset=max((page - 1) * page_size - total, 0),
+                limit=page_size - len(rows),
+            )
+            total += archived_total
+
         # 构建响应数据
         records = []
         for row in rows:
@@ -112,12 +137,17 @@ async def get_records(
                     character_nickname=row.character_nickname,
                     game_type=record.game_type,
                     sign_time=record.sign_time,
+                    sign_date=record.sign_date,
                     status=record.status,
+                    attempts=record.attempts,
                     rewards=record.rewards,
                     error_message=record.error_message,
+                    error_class=record.error_class,
                 )
             )
 
+        records.extend(await _archived_responses(session, archived))
+
         return SignRecordListResponse(
             total=total,
             page=page,
@@ -126,6 +156,123 @@ async def get_records(
         )
 
 
+def _archive_filters(game_type: str | None, status: str | None, user_id: int | None) -> dict:
+    """归档记录的过滤条件"""
+    filters = {"game_type": game_type, "status": status, "user_id": user_id}
+    return {field: value for field, value in filters.items() if value}
+
+
+async def _archived_responses(session, archived: list[dict]) -> list[SignRecordResponse]:
+    """归档记录转换为响应（用户名和角色昵称从数据库补充）"""
+    if not archived:
+        return []
+    from sqlalchemy import select
+
+    user_names = dict((await session.execute(
+        select(User.id, User.name).where(User.id.in_({record["user_id"] for record in archived}))
+    )).all())
+    nicknames = dict((await session.execute(
+        select(Character.id, Character.nickname).where(
+            Character.id.in_({record["character_id"] for record in archived})
+        )
+    )).all())
+    return [
+        SignRecordResponse(
+            **parse_record(record),
+            user_name=user_names.get(record["user_id"]),
+            character_nickname=nicknames.get(record["character_id"]),
+        )
+        for record in archived
+    ]
+
+
+@router.get("/export")
+async def export_records(
+    game_type: Optional[str] = Query(None, description="游戏类型"),
+    status: Optional[str] = Query(None, description="签到状态"),
+    user_id: Optional[int] = Query(None, description="用户ID"),
+    start_date: Optional[date] = Query(None, description="开始日期"),
+    end_date: Optional[date] = Query(None, description="结束日期"),
+):
+    """导出签到记录（NDJSON，每行一条，按签到日期升序，包含归档记录）"""
+
+    async def generate():
+        async for record in read_archived(start_date, end_date, _archive_filters(game_type, status, user_id)):
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+        from sqlalchemy import select, or_, and_
+
+        last_date, last_id = date.min, 0
+        while True:
+            stmt = select(SignRecord).where(
+                or_(
+                    SignRecord.sign_date > last_date,
+                    and_(SignRecord.sign_date == last_date, SignRecord.id > last_id),
+                ),
+                SignRecord.status != "pending",
+            ).order_by(SignRecord.sign_date, SignRecord.id).limit(1000)
+            if game_type:
+                stmt = stmt.where(SignRecord.game_type == game_type)
+            if status:
+                stmt = stmt.where(SignRecord.status == status)
+            if user_id:
+                stmt = stmt.where(SignRecord.user_id == user_id)
+            if start_date:
+                stmt = stmt.where(SignRecord.sign_date >= start_date)
+            if end_date:
+                stmt = stmt.where(SignRecord.sign_date <= end_date)
+            async with db.get_session() as session:
+                records = (await session.execute(stmt)).scalars().all()
+            if not records:
+                break
+            last_date, last_id = records[-1].sign_date, records[-1].id
+            for record in records:
+                data = SignRecordExport.model_validate(record).model_dump()
+                yield json.dumps(jsonable_encoder(data), ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="sign_records.ndjson"'},
+    )
+
+
+class SignRecordExport(BaseModel):
+    """导出的签到记录（字段与归档文件相同）"""
+    id: int
+    user_id: int
+    character_id: int
+    game_type: str
+    sign_time: datetime
+    sign_date: date | None = None
+    status: str
+    attempts: int = 1
+    rewards: str | None = None
+    error_message: str | None = None
+    error_class: str | None = None
+
+    class Config:
+        from_attributes = True
+
+
+@router.get("/archive")
+async def get_archive():
+    """获取归档文件概况（每月一个文件）"""
+    return {"months": archive_summary()}
+
+
+@router.post("/archive")
+async def archive_old_records(
+    days: int = Query(config.archive.after_days, ge=1, description="归档多少天前的记录"),
+):
+    """把旧的签到记录移到归档文件"""
+    count = await archive_records(date.today() - timedelta(days=days), config.archive.chunk_size)
+    return {
+        "message": f"已归档 {count} 条 {days} 天前的签到记录",
+        "archived_count": count,
+    }
+
+
 @router.get("/{record_id}", response_model=SignRecordResponse)
 async def get_record(record_id: int):
     """获取签到记录详情"""
@@ -151,7 +298,7 @@ async def get_user_records(
     async with db.get_session() as session:
         from sqlalchemy import select, desc
 
-        stmt = select(SignRecord).where(SignRecord.user_id == user_id)
+        stmt = select(SignRecord).where(SignRecord.user_id == user_id, SignRecord.status != "pending")
         stmt = stmt.order_by(desc(SignRecord.sign_time))
         stmt = stmt.limit(limit)
 
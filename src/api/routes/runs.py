@@ -0,0 +1,123 @@
+"""签到运行历史 API"""
+
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+
+from database import db
+from models import SignRun, SignRunItem
+
+router = APIRouter()
+
+
+class SignRunResponse(BaseModel):
+    """签到运行响应"""
+    id: int
+    game_type: str
+    trigger: str
+    started_at: datetime
+    finished_at: datetime | None
+    duration_ms: float
+    total: int
+    success: int
+    failed: int
+    duplicate: int
+    plan_ms: float
+    cred_refresh_ms: float
+    sign_ms: float
+    http_ms: float
+    db_write_ms: float
+    throughput: float
+    p95_ms: float
+
+    class Config:
+        from_attributes = True
+
+
+class SignRunItemResponse(BaseModel):
+    """签到运行明细响应"""
+    id: int
+    user_id: int
+    character_id: int | None
+    game_type: str
+    status: str
+    duration_ms: float
+    http_ms: float
+    http_calls: int
+    cred_refresh_ms: float
+    db_write_ms: float
+
+    class Config:
+        from_attributes = True
+
+
+class SignRunDetailResponse(SignRunResponse):
+    """签到运行详情响应"""
+    items: List[SignRunItemResponse]
+
+
+class SignRunListResponse(BaseModel):
+    """签到运行列表响应"""
+    total: int
+    page: int
+    page_size: int
+    runs: List[SignRunResponse]
+
+
+@router.get("/", response_model=SignRunListResponse)
+async def list_runs(
+    page: int = Query(1, ge=1, description="页码"),
+    page_size: int = Query(20, ge=1, le=100, description="每页数量"),
+    game_type: Optional[str] = Query(None, description="游戏类型"),
+    trigger: Optional[str] = Query(None, description="触发方式"),
+):
+    """获取签到运行历史（按开始时间倒序）"""
+    async with db.get_session() as session:
+        from sqlalchemy import select, func, desc
+
+        stmt = select(SignRun)
+        count_stmt = select(func.count(SignRun.id))
+        if game_type:
+            stmt = stmt.where(SignRun.game_type == game_type)
+            count_stmt = count_stmt.where(SignRun.game_type == game_type)
+        if trigger:
+            stmt = stmt.where(SignRun.trigger == trigger)
+            count_stmt = count_stmt.where(SignRun.trigger == trigger)
+
+        total_result = await session.execute(count_stmt)
+        total = total_result.scalar() or 0
+
+        stmt = stmt.order_by(desc(SignRun.started_at))
+        stmt = stmt.offset((page - 1) * page_size).limit(page_size)
+        result = await session.execute(stmt)
+
+        return SignRunListResponse(
+            total=total,
+            page=page,
+            page_size=page_size,
+            runs=[SignRunResponse.model_validate(run) for run in result.scalars().all()],
+        )
+
+
+@router.get("/{run_id}", response_model=SignRunDetailResponse)
+async def get_run(run_id: int):
+    """获取签到运行详情（含每个角色的耗时）"""
+    async with db.get_session() as session:
+        from sqlalchemy import select
+
+        stmt = select(SignRun).where(SignRun.id == run_id)
+        result = await session.execute(stmt)
+        run = result.scalar_one_or_none()
+
+        if not run:
+            raise HTTPException(status_code=404, detail="运行记录不存在")
+
+        item_stmt = select(SignRunItem).where(SignRunItem.run_id == run_id).order_by(SignRunItem.id)
+        item_result = await session.execute(item_stmt)
+
+        return SignRunDetailResponse(
+            **SignRunResponse.model_validate(run).model_dump(),
+            items=[SignRunItemResponse.model_validate(item) for item in item_result.scalars().all()],
+        )
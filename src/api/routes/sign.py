@@ -2,12 +2,13 @@
 
 from typing import Literal
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
 from pydantic import BaseModel
 
 from database import db
 from models import User
 from core.sign_service import sign_user, sign_all_users
+from core.record_writer import record_writer
 from utils.logger import logger
 
 router = APIRouter()
@@ -39,31 +40,30 @@ async def run_sign(game: Literal["arknights", "endfield", "all"] = "all", backgr
     Returns:
         签到结果
     """
-    logger.info(f"收到签到请求，游戏类型: {game}")
+    logger.info("收到签到请求，游戏类型: {}", game)
 
     try:
-        async with db.get_session() as session:
-            results = await sign_all_users(session, game)
-
-            # 转换结果格式
-            formatted_results = {}
-            for user_name, result in results.items():
-                formatted_results[user_name] = {
-                    "total": result.total,
-                    "success": result.success,
-                    "failed": result.failed,
-                    "duplicate": result.duplicate,
-                    "details": result.details,
-                    "summary": result.summary,
-                }
-
-            return {
-                "game": game,
-                "results": formatted_results,
-                "timestamp": __import__("datetime").datetime.now().isoformat(),
+        results = await sign_all_users(game, trigger="api")
+
+        # 转换结果格式
+        formatted_results = {}
+        for user_name, result in results.items():
+            formatted_results[user_name] = {
+                "total": result.total,
+                "success": result.success,
+                "failed": result.failed,
+                "duplicate": result.duplicate,
+                "details": result.details,
+                "summary": result.summary,
             }
+
+        return {
+            "game": game,
+            "results": formatted_results,
+            "timestamp": __import__("datetime").datetime.now().isoformat(),
+        }
     except Exception as e:
-        logger.error(f"签到失败: {e}")
+        logger.error("签到失败: {}", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -91,24 +91,26 @@ async def sign_account(account_id: int, game: Literal["arknights", "endfield", "
         if not user.enabled:
             raise HTTPException(status_code=400, detail="账号未启用")
 
-        try:
-            sign_result = await sign_user(user, session, game)
-
-            return {
-                "account_id": account_id,
-                "account_name": user.name,
-                "game": game,
-                "total": sign_result.total,
-                "success": sign_result.success,
-                "failed": sign_result.failed,
-                "duplicate": sign_result.duplicate,
-                "details": sign_result.details,
-                "summary": sign_result.summary,
-                "timestamp": __import__("datetime").datetime.now().isoformat(),
-            }
-        except Exception as e:
-            logger.error(f"账号 {user.name} 签到失败: {e}")
-            raise HTTPException(status_code=500, detail=str(e))
+    # 签到请求不占用数据库会话，结果由 sign_user 在短事务中写入
+    try:
+        sign_result = await sign_user(user, game)
+        await record_writer.flush()
+
+        return {
+            "account_id": account_id,
+            "account_name": user.name,
+            "game": game,
+            "total": sign_result.total,
+            "success": sign_result.success,
+            "failed": sign_result.failed,
+            "duplicate": sign_result.duplicate,
+            "details": sign_result.details,
+            "summary": sign_result.summary,
+            "timestamp": __import__("datetime").datetime.now().isoformat(),
+        }
+    except Exception as e:
+        logger.error("账号 {} 签到失败: {}", user.name, e)
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/status")
@@ -127,7 +129,9 @@ async def get_sign_status():
             func.sum(func.cast(SignRecord.status == "failed", __import__("sqlalchemy").Integer)).label("failed"),
             func.sum(func.cast(SignRecord.status == "duplicate", __import__("sqlalchemy").Integer)).label("duplicate"),
         ).where(
-            func.date(SignRecord.sign_time) == today
+            SignRecord.sign_date == today,
+            # 认领中的占位记录还没有结果，不计入
+            SignRecord.status != "pending",
         )
 
         result = await session.execute(stmt)
@@ -162,3 +166,38 @@ async def get_schedule():
         },
         "timezone": config.scheduler.timezone,
     }
+
+
+@router.post("/profile")
+async def profile_next_run(
+    kinds: str = "all",
+    top: int = Query(20, ge=1, le=200, description="报告中每项显示的条数"),
+):
+    """为下一次定时签到开启性能分析
+
+    Args:
+        kinds: 分析类型，cpu/tasks/memory 的逗号组合，all 表示全部
+        top: 报告中每项显示的条数
+    """
+    from scheduler import job_manager
+    from utils.profiler import parse_profile_kinds
+
+    try:
+        profile_kinds = parse_profile_kinds(kinds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job_manager.profile_next_run(profile_kinds, top)
+    return {"message": "下一次定时签到将进行性能分析", "kinds": sorted(profile_kinds), "top": top}
+
+
+@router.get("/profile")
+async def get_profile_status():
+    """获取性能分析状态及最近一次报告"""
+    from scheduler import job_manager
+
+    pending = job_manager.pending_profile
+    return {
+        "pending": {"kinds": sorted(pending[0]), "top": pending[1]} if pending else None,
+        "last": job_manager.last_profile,
+    }
@@ -1,13 +1,16 @@
 """统计信息 API"""
 
 from datetime import datetime, date, timedelta
-from typing import List, Dict
+from typing import Callable, List, Dict
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request
 from pydantic import BaseModel
 
 from database import db
-from models import User, Character, SignRecord
+from api.response_cache import stats_cache
+from core.archive import read_archived
+from core.rewards import parse_rewards
+from models import User, Character, SignRecord, RewardItem, SignReward
 from utils.logger import logger
 
 router = APIRouter()
@@ -21,6 +24,18 @@ class OverviewStats(BaseModel):
     today_sign: dict
 
 
+class UnsignedCharacter(BaseModel):
+    """今日未签到的角色"""
+    character_id: int
+    nickname: str
+    app_name: str
+    user_id: int
+    user_name: str
+    last_sign_at: datetime | None
+    last_status: str | None
+    last_error_class: str | None
+
+
 class GameStats(BaseModel):
     """游戏统计"""
     game_type: str
@@ -50,11 +65,37 @@ class UserStats(BaseModel):
     last_sign_time: datetime | None
 
 
-@router.get("/overview")
-async def get_overview():
+async def _archived_counts(start_date: date, key: Callable[[dict], str]) -> dict[str, dict[str, int]]:
+    """归档中签到日期不早于 start_date 的记录按 key 分组统计各状态的数量（不含认领中的记录）"""
+    counts: dict[str, dict[str, int]] = {}
+    async for record in read_archived(start_date):
+        if record["status"] == "pending":
+            continue
+        group = counts.setdefault(key(record), {"total": 0, "success": 0, "failed": 0, "duplicate": 0})
+        group["total"] += 1
+        if record["status"] in group:
+            group[record["status"]] += 1
+    return counts
+
+
+def _merge_counts(row, archived: dict[str, int] | None) -> dict[str, int]:
+    """数据库聚合行（可为空）与归档统计相加"""
+    return {
+        field: ((getattr(row, field) or 0) if row else 0) + (archived or {}).get(field, 0)
+        for field in ("total", "success", "failed", "duplicate")
+    }
+
+
+@router.get("/overview", response_model=OverviewStats)
+async def get_overview(request: Request):
     """获取概览统计 - 按角色维度计算今日签到"""
+    return await stats_cache.respond(request, _overview)
+
+
+async def _overview() -> OverviewStats:
     async with db.get_session() as session:
-        from sqlalchemy import select, func, cast, Integer
+        from sqlalchemy import select, func, cast, Integer, and_
+        from core.sign_state import SIGNED_STATUSES
 
         # 用户统计
         user_stmt = select(
@@ -64,20 +105,19 @@ async def get_overview():
         user_result = await session.execute(user_stmt)
         user_row = user_result.one()
 
-        # 角色统计
-        char_stmt = select(func.count(Character.id))
-        char_result = await session.execute(char_stmt)
-        total_characters = char_result.scalar()
-
-        # 今日签到统计 - 按角色维度
+        # 角色统计及今日签到统计 - 按角色的最近签到状态计算，不扫描签到记录
         today = date.today()
-
-        # 获取今日已签到的角色（去重）
-        signed_char_stmt = select(func.count(func.distinct(SignRecord.character_id))).where(
-            func.date(SignRecord.sign_time) == today
+        signed_today = and_(
+            Character.last_sign_at >= datetime.combine(today, datetime.min.time()),
+            Character.last_status.in_(SIGNED_STATUSES),
         )
-        signed_char_result = await session.execute(signed_char_stmt)
-        signed_count = signed_char_result.scalar() or 0
+        char_stmt = select(
+            func.count(Character.id).label("total"),
+            func.sum(func.cast(signed_today, Integer)).label("signed"),
+        ).where(Character.deleted_at.is_(None))
+        char_row = (await session.execute(char_stmt)).one()
+        total_characters = char_row.total
+        signed_count = char_row.signed or 0
 
         return OverviewStats(
             total_users=user_row.total or 0,
@@ -94,17 +134,22 @@ async def get_overview():
 
 
 @router.get("/games", response_model=List[GameStats])
-async def get_game_stats(days: int = Query(30, ge=1, le=365, description="统计天数")):
+async def get_game_stats(request: Request, days: int = Query(30, ge=1, le=365, description="统计天数")):
     """获取游戏统计"""
+    return await stats_cache.respond(request, lambda: _game_stats(days))
+
+
+async def _game_stats(days: int) -> list[GameStats]:
+    start_date = date.today() - timedelta(days=days)
+    archived = await _archived_counts(start_date, lambda record: record["game_type"])
+
     async with db.get_session() as session:
         from sqlalchemy import select, func, cast, Integer, and_
 
-        start_date = date.today() - timedelta(days=days)
-
         stats = []
 
         # 明日方舟统计
-        ark_char_stmt = select(func.count(Character.id)).where(Character.app_name == "明日方舟")
+        ark_char_stmt = select(func.count(Character.id)).where(Character.app_name == "明日方舟", Character.deleted_at.is_(None))
         ark_char_result = await session.execute(ark_char_stmt)
         ark_char_count = ark_char_result.scalar()
 
@@ -116,23 +161,24 @@ async def get_game_stats(days: int = Query(30, ge=1, le=365, description="统计
         ).where(
             and_(
                 SignRecord.game_type == "arknights",
-                func.date(SignRecord.sign_time) >= start_date
+                SignRecord.sign_date >= start_date,
+                SignRecord.status != "pending",
             )
         )
         ark_sign_result = await session.execute(ark_sign_stmt)
-        ark_sign_row = ark_sign_result.one()
+        ark_sign = _merge_counts(ark_sign_result.one(), archived.get("arknights"))
 
         stats.append(GameStats(
             game_type="arknights",
             total_characters=ark_char_count or 0,
-            today_success=ark_sign_row.success or 0,
-            today_failed=ark_sign_row.failed or 0,
-            today_duplicate=ark_sign_row.duplicate or 0,
-            success_rate=(ark_sign_row.success / ark_sign_row.total * 100) if ark_sign_row.total else 0,
+            today_success=ark_sign["success"],
+            today_failed=ark_sign["failed"],
+            today_duplicate=ark_sign["duplicate"],
+            success_rate=(ark_sign["success"] / ark_sign["total"] * 100) if ark_sign["total"] else 0,
         ))
 
         # 终末地统计
-        end_char_stmt = select(func.count(Character.id)).where(Character.app_name == "终末地")
+        end_char_stmt = select(func.count(Character.id)).where(Character.app_name == "终末地", Character.deleted_at.is_(None))
         end_char_result = await session.execute(end_char_stmt)
         end_char_count = end_char_result.scalar()
 
@@ -144,19 +190,20 @@ async def get_game_stats(days: int = Query(30, ge=1, le=365, description="统计
         ).where(
             and_(
                 SignRecord.game_type == "endfield",
-                func.date(SignRecord.sign_time) >= start_date
+                SignRecord.sign_date >= start_date,
+                SignRecord.status != "pending",
             )
         )
         end_sign_result = await session.execute(end_sign_stmt)
-        end_sign_row = end_sign_result.one()
+        end_sign = _merge_counts(end_sign_result.one(), archived.get("endfield"))
 
         stats.append(GameStats(
             game_type="endfield",
             total_characters=end_char_count or 0,
-            today_success=end_sign_row.success or 0,
-            today_failed=end_sign_row.failed or 0,
-            today_duplicate=end_sign_row.duplicate or 0,
-            success_rate=(end_sign_row.success / end_sign_row.total * 100) if end_sign_row.total else 0,
+            today_success=end_sign["success"],
+            today_failed=end_sign["failed"],
+            today_duplicate=end_sign["duplicate"],
+            success_rate=(end_sign["success"] / end_sign["total"] * 100) if end_sign["total"] else 0,
         ))
 
         return stats
@@ -164,68 +211,88 @@ async def get_game_stats(days: int = Query(30, ge=1, le=365, description="统计
 
 @router.get("/daily", response_model=List[DailyStats])
 async def get_daily_stats(
-    days: int = Query(7, ge=1, le=90, description="统计天数")
+    request: Request,
+    days: int = Query(7, ge=1, le=90, description="统计天数"),
 ):
     """获取每日统计"""
-    async with db.get_session() as session:
-        from sqlalchemy import select, func, desc
-        from datetime import timedelta
+    return await stats_cache.respond(request, lambda: _daily_stats(days))
 
-        stats = []
-        start_date = date.today() - timedelta(days=days - 1)
 
-        for i in range(days):
-            current_date = start_date + timedelta(days=i)
+async def _daily_stats(days: int) -> list[DailyStats]:
+    start_date = date.today() - timedelta(days=days - 1)
+    archived = await _archived_counts(start_date, lambda record: record["sign_date"])
 
-            stmt = select(
-                func.count(SignRecord.id).label("total"),
-                func.sum(func.cast(SignRecord.status == "success", Integer)).label("success"),
-                func.sum(func.cast(SignRecord.status == "failed", Integer)).label("failed"),
-                func.sum(func.cast(SignRecord.status == "duplicate", Integer)).label("duplicate"),
-            ).where(func.date(SignRecord.sign_time) == current_date)
+    async with db.get_session() as session:
+        from sqlalchemy import select, func, Integer
 
-            result = await session.execute(stmt)
-            row = result.one()
+        # 按签到日期一次聚合，没有记录的日期补 0
+        stmt = select(
+            SignRecord.sign_date,
+            func.count(SignRecord.id).label("total"),
+            func.sum(func.cast(SignRecord.status == "success", Integer)).label("success"),
+            func.sum(func.cast(SignRecord.status == "failed", Integer)).label("failed"),
+            func.sum(func.cast(SignRecord.status == "duplicate", Integer)).label("duplicate"),
+        ).where(
+            SignRecord.sign_date >= start_date,
+            # 认领中的占位记录还没有结果，不计入
+            SignRecord.status != "pending",
+        ).group_by(
+            SignRecord.sign_date
+        )
 
-            stats.append(DailyStats(
-                date=current_date.isoformat(),
-                total=row.total or 0,
-                success=row.success or 0,
-                failed=row.failed or 0,
-                duplicate=row.duplicate or 0,
-            ))
+        result = await session.execute(stmt)
+        rows = {row.sign_date: row for row in result.all()}
+
+        stats = []
+        for i in range(days):
+            current_date = start_date + timedelta(days=i)
+            counts = _merge_counts(rows.get(current_date), archived.get(current_date.isoformat()))
+            stats.append(DailyStats(date=current_date.isoformat(), **counts))
 
         return stats
 
 
 @router.get("/users", response_model=List[UserStats])
-async def get_user_stats():
+async def get_user_stats(request: Request):
     """获取用户统计"""
+    return await stats_cache.respond(request, _user_stats)
+
+
+async def _user_stats() -> list[UserStats]:
     async with db.get_session() as session:
-        from sqlalchemy import select, desc
+        from sqlalchemy import select, func, desc, Integer
 
-        # 子查询：每个用户最后一次签到时间
-        last_sign_stmt = select(
+        # 子查询：每个用户的角色数
+        character_counts = select(
+            Character.user_id,
+            func.count(Character.id).label("char_count"),
+        ).where(
+            Character.deleted_at.is_(None)
+        ).group_by(Character.user_id).subquery()
+
+        # 子查询：每个用户的签到次数、成功次数（不含签到中的认领记录），最后一次签到时间取自账号
+        sign_stats = select(
             SignRecord.user_id,
-            func.max(SignRecord.sign_time).label("last_sign")
+            func.count(SignRecord.id).label("total_sign"),
+            func.sum(func.cast(SignRecord.status == "success", Integer)).label("success_sign"),
+        ).where(
+            SignRecord.status != "pending"
         ).group_by(SignRecord.user_id).subquery()
 
-        # 主查询
+        char_count = func.coalesce(character_counts.c.char_count, 0)
         stmt = select(
             User.id,
             User.name,
-            func.count(Character.id).label("char_count"),
-            func.count(SignRecord.id).label("total_sign"),
-            func.sum(func.cast(SignRecord.status == "success", func.INTEGER)).label("success_sign"),
-            last_sign_stmt.c.last_sign,
+            char_count.label("char_count"),
+            func.coalesce(sign_stats.c.total_sign, 0).label("total_sign"),
+            func.coalesce(sign_stats.c.success_sign, 0).label("success_sign"),
+            User.last_sign_at,
         ).outerjoin(
-            Character, User.id == Character.user_id
+            character_counts, User.id == character_counts.c.user_id
         ).outerjoin(
-            last_sign_stmt, User.id == last_sign_stmt.c.user_id
-        ).group_by(
-            User.id, User.name, last_sign_stmt.c.last_sign
+            sign_stats, User.id == sign_stats.c.user_id
         ).order_by(
-            desc(func.count(Character.id))
+            desc(char_count), User.id
         )
 
         result = await session.execute(stmt)
@@ -238,29 +305,119 @@ async def get_user_stats():
                 character_count=row.char_count,
                 total_sign=row.total_sign,
                 success_sign=row.success_sign,
-                last_sign_time=row.last_sign,
+                last_sign_time=row.last_sign_at,
             )
             for row in rows
         ]
 
 
+@router.get("/unsigned", response_model=List[UnsignedCharacter])
+async def get_unsigned_characters():
+    """获取今日未签到（或签到失败）的有效角色，只查询角色表和账号表"""
+    async with db.get_session() as session:
+        from sqlalchemy import select, or_
+        from core.sign_state import SIGNED_STATUSES
+
+        today_start = datetime.combine(date.today(), datetime.min.time())
+        stmt = select(
+            Character.id,
+            Character.nickname,
+            Character.app_name,
+            Character.user_id,
+            User.name.label("user_name"),
+            Character.last_sign_at,
+            Character.last_status,
+            Character.last_error_class,
+        ).join(
+            User, Character.user_id == User.id
+        ).where(
+            Character.deleted_at.is_(None),
+            User.enabled == True,
+            or_(
+                Character.last_sign_at.is_(None),
+                Character.last_sign_at < today_start,
+                Character.last_status.not_in(SIGNED_STATUSES),
+            ),
+        ).order_by(Character.user_id, Character.id)
+
+        result = await session.execute(stmt)
+        return [
+            UnsignedCharacter(
+                character_id=row.id,
+                nickname=row.nickname,
+                app_name=row.app_name,
+                user_id=row.user_id,
+                user_name=row.user_name,
+                last_sign_at=row.last_sign_at,
+                last_status=row.last_status,
+                last_error_class=row.last_error_class,
+            )
+            for row in result.all()
+        ]
+
+
+@router.get("/failures")
+async def get_failure_stats(
+    request: Request,
+    days: int = Query(7, ge=1, le=365, description="统计天数"),
+):
+    """获取签到失败原因统计（按失败分类和游戏类型）"""
+    return await stats_cache.respond(request, lambda: _failure_stats(days))
+
+
+async def _failure_stats(days: int) -> dict:
+    start_date = date.today() - timedelta(days=days - 1)
+    async with db.get_session() as session:
+        from sqlalchemy import select, func
+
+        stmt = select(
+            SignRecord.error_class,
+            SignRecord.game_type,
+            func.count(SignRecord.id).label("count"),
+        ).where(
+            SignRecord.sign_date >= start_date,
+            SignRecord.error_class.is_not(None),
+        ).group_by(
+            SignRecord.error_class, SignRecord.game_type
+        )
+
+        result = await session.execute(stmt)
+        failures: dict[str, dict[str, int]] = {}
+        for row in result.all():
+            failures.setdefault(row.error_class, {})[row.game_type] = row.count
+
+    async for record in read_archived(start_date):
+        if record["error_class"]:
+            games = failures.setdefault(record["error_class"], {})
+            games[record["game_type"]] = games.get(record["game_type"], 0) + 1
+
+    return {
+        "period_days": days,
+        "failures": failures,
+    }
+
+
 @router.get("/rewards")
 async def get_rewards_stats(
-    days: int = Query(30, ge=1, le=365, description="统计天数")
+    request: Request,
+    days: int = Query(30, ge=1, le=365, description="统计天数"),
 ):
     """获取奖励统计"""
+    return await stats_cache.respond(request, lambda: _rewards_stats(days))
+
+
+async def _rewards_stats(days: int) -> dict:
+    start_date = date.today() - timedelta(days=days - 1)
     async with db.get_session() as session:
         from sqlalchemy import select, func
-        from datetime import timedelta
-
-        start_date = datetime.now() - timedelta(days=days)
 
         # 按游戏类型统计成功签到次数
         stmt = select(
             SignRecord.game_type,
             func.count(SignRecord.id).label("count")
         ).where(
-            SignRecord.status == "success"
+            SignRecord.status == "success",
+            SignRecord.sign_date >= start_date,
         ).group_by(
             SignRecord.game_type
         )
@@ -268,10 +425,49 @@ async def get_rewards_stats(
         result = await session.execute(stmt)
         rows = result.all()
 
-        return {
-            "period_days": days,
-            "rewards": {
-                row.game_type: row.count
-                for row in rows
-            }
+        # 按物品汇总数量：只扫描 (sign_date, item_id, count) 索引，再关联物品字典
+        totals = select(
+            SignReward.item_id,
+            func.sum(SignReward.count).label("count"),
+            func.count().label("times"),
+        ).where(
+            SignReward.sign_date >= start_date
+        ).group_by(
+            SignReward.item_id
+        ).subquery()
+        item_stmt = select(
+            RewardItem.game_type,
+            RewardItem.item_key,
+            RewardItem.name,
+            totals.c.count,
+            totals.c.times,
+        ).join(
+            totals, totals.c.item_id == RewardItem.id
+        ).order_by(
+            RewardItem.game_type, totals.c.count.desc()
+        )
+        item_rows = (await session.execute(item_stmt)).all()
+
+    rewards = {row.game_type: row.count for row in rows}
+    items = {
+        (row.game_type, row.item_key): {
+            "game_type": row.game_type, "name": row.name, "count": row.count, "times": row.times,
         }
+        for row in item_rows
+    }
+    # 归档记录没有拆分的奖励明细，从奖励 JSON 中解析
+    async for record in read_archived(start_date, filters={"status": "success"}):
+        game_type = record["game_type"]
+        rewards[game_type] = rewards.get(game_type, 0) + 1
+        for reward in parse_rewards(record["rewards"]):
+            item = items.setdefault(
+                (game_type, reward["id"]), {"game_type": game_type, "name": reward["name"], "count": 0, "times": 0}
+            )
+            item["count"] += reward["count"]
+            item["times"] += 1
+
+    return {
+        "period_days": days,
+        "rewards": rewards,
+        "items": sorted(items.values(), key=lambda item: (item["game_type"], -item["count"])),
+    }
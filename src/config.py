@@ -12,17 +12,37 @@ from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
-class AppConfig(BaseModel):
+class AppConfig(BaseSettings):
     """应用配置"""
     name: str = "Skland Auto Sign"
     version: str = "1.0.0"
     debug: bool = False
+    query_stats: bool = False  # 统计每个请求的 SQL 次数和耗时（Server-Timing 响应头）并记录慢查询
+    slow_query_ms: float = 200.0  # 慢查询日志阈值（毫秒），<= 0 时不记录
+
+    model_config = SettingsConfigDict(
+        env_prefix="APP_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
 
 
 class DatabaseConfig(BaseSettings):
     """数据库配置"""
     type: Literal["sqlite", "postgresql"] = "sqlite"
     url: str = "sqlite:///data/skland.db"
+    write_batch_size: int = 500  # 签到记录每批写入的最大条数
+    write_flush_interval: float = 1.0  # 签到记录在缓冲区中的最长停留时间（秒）
+    write_queue_size: int = 10000  # 写缓冲上限，写满时签到流程等待数据库写入（背压）
+    pool_size: int = 5  # 连接池常驻连接数（仅 PostgreSQL）
+    max_overflow: int = 10  # 连接池允许超出的连接数（仅 PostgreSQL）
+    pool_timeout: float = 30.0  # 等待空闲连接的超时时间（秒）
+    pool_recycle: int = 1800  # 连接最长使用时间（秒），超过后重新建立
+    pool_pre_ping: bool = True  # 借出连接前检测连接是否可用
+    copy_threshold: int = 100  # 批量写入的行数达到该值时使用 COPY（仅 PostgreSQL），0 为不使用
+    partition_sign_record: bool = False  # 签到记录表按月分区（仅 PostgreSQL，新建表时生效）
+    partition_months_ahead: int = 3  # 提前创建的分区月数
 
     model_config = SettingsConfigDict(
         env_prefix="DATABASE_",
@@ -47,6 +67,12 @@ class SchedulerConfig(BaseSettings):
     endfield_sign_time: str = "00:20"
     timezone: str = "Asia/Shanghai"
     random_delay: int = 300  # 随机延迟秒数
+    character_sync_time: str = "04:00"  # 每日同步所有账号角色的时间，为空时不自动同步
+    sync_concurrency: int = 5  # 同步角色时同时请求的账号数
+    sync_rate_limit: float = 5.0  # 同步角色时每秒最多请求的账号数，<= 0 时不限速
+    cred_check_time: str = "23:45"  # 每日检查所有账号凭证的时间（应早于签到时间），为空时不自动检查
+    cred_refresh_before: int = 10  # 明日方舟签到前多少分钟预刷新 cred_token，<= 0 时不预刷新
+    cred_refresh_max_age: int = 360  # 距上次刷新超过多少分钟的 cred_token 需要预刷新
 
     model_config = SettingsConfigDict(
         env_prefix="SCHEDULER_",
@@ -62,6 +88,7 @@ class LoggingConfig(BaseSettings):
     dir: str = "data/logs"
     retention: str = "30 days"
     rotation: str = "1 day"
+    json_enabled: bool = False  # 额外输出 JSON Lines 结构化日志（app.jsonl）
 
     model_config = SettingsConfigDict(
         env_prefix="LOG_",
@@ -85,6 +112,66 @@ class WebConfig(BaseSettings):
     )
 
 
+class MetricsConfig(BaseSettings):
+    """监控指标配置"""
+    enabled: bool = True
+    port: int = 9108  # 独立运行（未启用 Web）时内嵌 exporter 的端口
+
+    model_config = SettingsConfigDict(
+        env_prefix="METRICS_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+
+class TracingConfig(BaseSettings):
+    """链路追踪配置"""
+    enabled: bool = False
+    exporter: Literal["jsonl", "otlp"] = "jsonl"
+    path: str = "data/traces/traces.jsonl"  # jsonl 导出文件路径
+    otlp_endpoint: str = "http://localhost:4318"  # OTLP/HTTP 收集器地址
+    service_name: str = "skland-auto-sign"
+    sample_ratio: float = Field(1.0, ge=0.0, le=1.0)  # 采样比例
+
+    model_config = SettingsConfigDict(
+        env_prefix="TRACING_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+
+class CacheConfig(BaseSettings):
+    """缓存配置（森空岛只读接口、统计接口响应）"""
+    ttl: float = 60.0  # 缓存有效期（秒），<= 0 时不缓存
+    maxsize: int = 1024  # 每个接口最多缓存的 cred 数
+    stats_ttl: float = 300.0  # 统计接口响应缓存的最长有效期（秒），写入数据后立即失效；<= 0 时不缓存
+    stats_maxsize: int = 256  # 统计接口最多缓存的响应数
+
+    model_config = SettingsConfigDict(
+        env_prefix="CACHE_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+
+class ArchiveConfig(BaseSettings):
+    """签到记录归档配置"""
+    enabled: bool = False  # 是否每天自动归档
+    after_days: int = 180  # 归档多少天前的签到记录
+    time: str = "03:30"  # 每天自动归档的时间
+    chunk_size: int = 1000  # 归档文件中每个压缩块的记录数
+
+    model_config = SettingsConfigDict(
+        env_prefix="ARCHIVE_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+
 class Config(BaseModel):
     """应用总配置"""
     app: AppConfig = Field(default_factory=AppConfig)
@@ -92,6 +179,10 @@ class Config(BaseModel):
     scheduler: SchedulerConfig = Field(default_factory=SchedulerConfig)
     logging: LoggingConfig = Field(default_factory=LoggingConfig)
     web: WebConfig = Field(default_factory=WebConfig)
+    metrics: MetricsConfig = Field(default_factory=MetricsConfig)
+    tracing: TracingConfig = Field(default_factory=TracingConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
+    archive: ArchiveConfig = Field(default_factory=ArchiveConfig)
 
 
 class AccountConfig(BaseModel):
@@ -121,10 +212,14 @@ class AccountsConfig(BaseSettings):
 
     或者使用 JSON 格式：
     - ACCOUNTS_JSON='[{"name":"账号1","token":"xxx"}]'
+
+    另外会读取账号文件（ACCOUNTS_FILE，默认 config/accounts.yaml），运行期间修改会自动生效。
     """
 
     # 使用 JSON 字符串存储所有账号（优先级高于单独的环境变量）
     accounts_json: str = ""
+    file: str = "config/accounts.yaml"  # 账号文件路径（相对路径基于项目根目录）
+    watch_interval: int = 10  # 检查账号文件变化的间隔（秒），<= 0 时只在启动时读取
 
     model_config = SettingsConfigDict(
         env_prefix="ACCOUNTS_",
@@ -182,6 +277,10 @@ def load_config() -> Config:
         scheduler=SchedulerConfig(),
         logging=LoggingConfig(),
         web=WebConfig(),
+        metrics=MetricsConfig(),
+        tracing=TracingConfig(),
+        cache=CacheConfig(),
+        archive=ArchiveConfig(),
     )
 
 
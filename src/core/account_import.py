@@ -0,0 +1,311 @@
+"""账号批量导入模块
+
+从 JSON / CSV / YAML 列表批量导入账号：
+- 按并发数和速率并发用 token 换取 cred 并获取绑定的角色（请求期间不占用数据库会话）
+- 成功的账号攒够一批后在一个事务中批量写入账号和角色（PostgreSQL 下行数达到 COPY 阈值时
+  先 COPY 到临时表再 INSERT ... SELECT，见 core.bulk）
+- 每个账号处理完成（写入或失败）后立即产出一条进度，单个账号失败不影响其他账号
+
+已存在的账号（名称或森空岛用户 ID 相同）更新凭证并同步角色。
+"""
+
+import asyncio
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from typing import AsyncIterator
+
+import yaml
+from sqlalchemy import insert, or_, select, update
+
+from config import AccountConfig, config
+from database import db
+from models import User, Character
+from core import SklandLoginAPI
+from core.bulk import copy_to_temp, supports_copy
+from core.throttle import RateLimiter
+from core.cache import invalidate_cred
+from core.sign_service import fetch_characters, diff_characters, apply_character_changes
+from utils.logger import logger
+
+# 每批写入的账号数
+WRITE_BATCH_SIZE = 100
+
+
+def parse_accounts(content: str, fmt: str) -> list[AccountConfig]:
+    """解析导入文件
+
+    支持的格式：
+    - json: 账号对象列表、token 字符串列表，或 {"accounts": [...]}
+    - yaml: 同 json（与 accounts.yaml 格式相同）
+    - csv: 带表头（name, token, cred, cred_token, remark, enabled），或每行一个 token
+
+    Args:
+        content: 文件内容
+        fmt: 格式（json/csv/yaml）
+    """
+    if fmt == "csv":
+        rows = list(csv.reader(io.StringIO(content)))
+        rows = [row for row in rows if any(cell.strip() for cell in row)]
+        if rows and "token" in [cell.strip().lower() for cell in rows[0]]:
+            header = [cell.strip().lower() for cell in rows[0]]
+            data = [dict(zip(header, (cell.strip() for cell in row))) for row in rows[1:]]
+        else:
+            data = [row[0].strip() for row in rows]
+    else:
+        data = json.loads(content) if fmt == "json" else yaml.safe_load(content)
+        if isinstance(data, dict):
+            data = data.get("accounts", [])
+        if not isinstance(data, list):
+            raise ValueError("导入内容应为账号列表")
+
+    accounts = []
+    for entry in data:
+        if isinstance(entry, str):
+            entry = {"token": entry}
+        if not isinstance(entry, dict):
+            raise ValueError(f"无法解析的账号: {entry!r}")
+        enabled = entry.get("enabled", True)
+        if isinstance(enabled, str):
+            enabled = enabled.strip().lower() in ("true", "1", "yes", "")
+        accounts.append(AccountConfig(
+            name=str(entry.get("name") or ""),
+            enabled=enabled,
+            token=str(entry.get("token") or ""),
+            cred=str(entry.get("cred") or ""),
+            cred_token=str(entry.get("cred_token") or ""),
+            remark=str(entry.get("remark") or ""),
+        ))
+    return accounts
+
+
+def detect_format(filename: str | None, content: str) -> str:
+    """按文件扩展名或内容判断格式"""
+    suffix = (filename or "").rsplit(".", 1)[-1].lower()
+    if suffix in ("json", "csv"):
+        return suffix
+    if suffix in ("yaml", "yml"):
+        return "yaml"
+    stripped = content.lstrip()
+    if stripped.startswith(("[", "{")):
+        return "json"
+    if stripped.startswith(("accounts:", "- ")):
+        return "yaml"
+    return "csv"
+
+
+async def _prepare(index: int, account: AccountConfig) -> tuple[User, list[Character]]:
+    """换取 cred 并获取角色（只发起网络请求，不写入数据库）"""
+    if not account.token and not account.cred:
+        raise ValueError("缺少 token 或 cred")
+
+    user = User(
+        name=account.name,
+        enabled=account.enabled,
+        token=account.token,
+        cred=account.cred,
+        cred_token=account.cred_token,
+        user_id="",
+        remark=account.remark,
+    )
+    if account.token and not account.cred:
+        grant_code = await SklandLoginAPI.get_grant_code(account.token, 0)
+        cred = await SklandLoginAPI.get_cred(grant_code)
+        user.cred, user.cred_token, user.user_id = cred.cred, cred.token, cred.userId or ""
+        user.cred_refreshed_at = datetime.now()
+    if not user.name:
+        user.name = f"skland-{user.user_id}" if user.user_id else f"import-{index + 1}"
+    return user, await fetch_characters(user)
+
+
+async def _insert_rows(session, model, rows: list[dict], *returning):
+    """批量插入（PostgreSQL 下行数达到 COPY 阈值时经临时表写入）"""
+    stmt = insert(model)
+    threshold = config.database.copy_threshold
+    use_copy = threshold and len(rows) >= threshold and supports_copy(db.engine)
+    if use_copy:
+        source = await copy_to_temp(session, model.__table__, rows)
+        stmt = stmt.from_select(list(source.c.keys()), source.select())
+    if returning:
+        stmt = stmt.returning(*returning)
+    return await session.execute(stmt) if use_copy else await session.execute(stmt, rows)
+
+
+async def _save(batch: list[tuple[int, User, list[Character]]]) -> list[dict]:
+    """批量写入一批账号及其角色
+
+    Returns:
+        list: 每个账号的进度
+    """
+    async with db.get_session() as session:
+        names = [user.name for _, user, _ in batch]
+        skland_ids = [user.user_id for _, user, _ in batch if user.user_id]
+        result = await session.execute(
+            select(User.id, User.name, User.user_id, User.cred).where(
+                or_(User.name.in_(names), User.user_id.in_(skland_ids))
+            )
+        )
+        by_name, by_skland_id = {}, {}
+        for row in result.all():
+            by_name[row.name] = row
+            if row.user_id:
+                by_skland_id[row.user_id] = row
+
+        new_users, existing = [], {}
+        for index, user, _ in batch:
+            row = by_skland_id.get(user.user_id) or by_name.get(user.name)
+            if row:
+                existing[index] = row
+            else:
+                new_users.append((index, user))
+
+        # 已存在的账号更新凭证，新账号批量插入
+        if existing:
+            await session.execute(update(User), [
+                {"id": existing[index].id, "token": user.token, "cred": user.cred, "cred_token": user.cred_token,
+                 "user_id": user.user_id or existing[index].user_id, "cred_refreshed_at": user.cred_refreshed_at}
+                for index, user, _ in batch if index in existing
+            ])
+        user_ids = {index: row.id for index, row in existing.items()}
+        if new_users:
+            result = await _insert_rows(
+                session,
+                User,
+                [
+                    {"name": user.name, "enabled": user.enabled, "token": user.token, "cred": user.cred,
+                     "cred_token": user.cred_token, "user_id": user.user_id, "remark": user.remark,
+                     "cred_refreshed_at": user.cred_refreshed_at}
+                    for _, user in new_users
+                ],
+                User.id, User.name,
+            )
+            ids_by_name = {row.name: row.id for row in result.all()}
+            user_ids.update({index: ids_by_name[user.name] for index, user in new_users})
+
+        # 角色按已存在的角色比对后批量写入
+        result = await session.execute(select(Character).where(Character.user_id.in_(user_ids.values())))
+        characters_by_user: dict[int, list[Character]] = {}
+        for character in result.scalars().all():
+            characters_by_user.setdefault(character.user_id, []).append(character)
+
+        inserts, updates, removed_ids = [], [], []
+        for index, _, characters in batch:
+            user_id = user_ids[index]
+            user_inserts, user_updates, user_removed = diff_characters(
+                user_id, characters_by_user.get(user_id, []), characters
+            )
+            inserts.extend(user_inserts)
+            updates.extend(user_updates)
+            removed_ids.extend(user_removed)
+        if inserts:
+            await _insert_rows(session, Character, inserts)
+        await apply_character_changes(session, [], updates, removed_ids)
+
+    for row in existing.values():
+        if row.cred:
+            invalidate_cred(row.cred)
+
+    return [
+        {
+            "index": index,
+            "name": existing[index].name if index in existing else user.name,
+            "status": "updated" if index in existing else "created",
+            "account_id": user_ids[index],
+            "characters": len(characters),
+        }
+        for index, user, characters in batch
+    ]
+
+
+async def import_accounts(
+    accounts: list[AccountConfig], concurrency: int, rate: float = 0.0
+) -> AsyncIterator[dict]:
+    """批量导入账号，逐个产出进度，最后产出汇总
+
+    Args:
+        accounts: 要导入的账号
+        concurrency: 同时进行的换取 cred / 获取角色请求数
+        rate: 每秒最多开始处理的账号数，<= 0 时不限速
+
+    Yields:
+        dict: 每个账号的进度（index、name、status 为 created/updated/failed、error），
+            最后一条为汇总（event 为 summary）
+    """
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    limiter = RateLimiter(rate)
+    prepared: asyncio.Queue = asyncio.Queue()
+
+    async def _run(index: int, account: AccountConfig):
+        async with semaphore:
+            await limiter.acquire()
+            try:
+                user, characters = await _prepare(index, account)
+                await prepared.put((index, user, characters, None))
+            except Exception as e:
+                logger.warning("导入第 {} 个账号失败: {}", index + 1, e)
+                await prepared.put((index, account, None, str(e)))
+
+    # 名称重复的账号保留第一个，后面的不发起请求直接记为失败
+    counts = {"created": 0, "updated": 0, "failed": 0}
+    seen_names: set[str] = set()
+    duplicates, pending = [], []
+    for index, account in enumerate(accounts):
+        if account.name and account.name in seen_names:
+            duplicates.append((index, account))
+        else:
+            seen_names.add(account.name)
+            pending.append((index, account))
+    for index, account in duplicates:
+        counts["failed"] += 1
+        yield {"index": index, "name": account.name, "status": "failed", "error": "导入列表中账号名称重复"}
+
+    tasks = [asyncio.create_task(_run(index, account)) for index, account in pending]
+    batch: list[tuple[int, User, list[Character]]] = []
+    # 未填写名称的账号在换取 cred 后才生成名称，生成的名称仍可能与其他账号重复
+    saved_names: set[str] = set()
+
+    async def _flush():
+        try:
+            progress = await _save(batch)
+        except Exception as e:
+            logger.error("写入 {} 个导入的账号失败: {}", len(batch), e)
+            progress = [
+                {"index": index, "name": user.name, "status": "failed", "error": f"写入数据库失败: {e}"}
+                for index, user, _ in batch
+            ]
+        batch.clear()
+        return progress
+
+    try:
+        for _ in range(len(pending)):
+            index, user, characters, error = await prepared.get()
+            if error is None and user.name in saved_names:
+                error = "导入列表中账号名称重复"
+            if error is not None:
+                counts["failed"] += 1
+                yield {"index": index, "name": user.name, "status": "failed", "error": error}
+                continue
+            saved_names.add(user.name)
+            batch.append((index, user, characters))
+            # 还有请求未完成时攒够一批再写入，否则立即写入
+            if len(batch) >= WRITE_BATCH_SIZE or prepared.empty():
+                for progress in await _flush():
+                    counts[progress["status"]] += 1
+                    yield progress
+        if batch:
+            for progress in await _flush():
+                counts[progress["status"]] += 1
+                yield progress
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    duration = time.perf_counter() - start
+    logger.info(
+        "批量导入完成: {} 个账号，新增 {}，更新 {}，失败 {}，耗时 {:.1f}s",
+        len(accounts), counts["created"], counts["updated"], counts["failed"], duration,
+    )
+    yield {"event": "summary", "total": len(accounts), **counts, "duration": round(duration, 2)}
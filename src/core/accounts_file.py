@@ -0,0 +1,182 @@
+"""账号配置同步模块
+
+把环境变量和账号文件（默认 config/accounts.yaml）中的账号同步到数据库：
+- 与数据库比对，只写入有变化的账号（新账号批量插入，变化的账号批量更新）
+- 凭证只在配置中的值相对上一次同步有改动时写入；首次同步（启动时）只填补数据库中为空的凭证，
+  避免配置中的旧 cred 覆盖已自动刷新的 cred
+- 账号文件按间隔检查修改时间和内容，变化后只同步文件中改动过的账号，
+  从文件中删除的账号会被禁用（保留签到记录），正在进行的签到不受影响
+"""
+
+import asyncio
+import hashlib
+from pathlib import Path
+
+from sqlalchemy import insert, select, update
+
+from config import AccountConfig, accounts_config, get_project_root
+from database import db
+from models import User
+from core.account_import import parse_accounts
+from core.cache import invalidate_cred
+from utils.logger import logger
+
+# 可由配置写入的字段
+ACCOUNT_FIELDS = ("enabled", "token", "cred", "cred_token", "remark")
+# 配置中为空时不覆盖的字段
+CREDENTIAL_FIELDS = ("token", "cred", "cred_token")
+
+
+async def sync_accounts(
+    accounts: list[AccountConfig], previous: dict[str, AccountConfig] | None = None
+) -> dict[str, int]:
+    """把账号配置同步到数据库
+
+    Args:
+        accounts: 账号配置
+        previous: 上一次同步的账号配置（名称 -> 配置）。为 None 时与数据库比对全部账号；
+            否则只比对相对上一次有改动的账号，并禁用已删除的账号
+
+    Returns:
+        dict: 新增、更新、禁用、未变化的账号数
+    """
+    counts = {"created": 0, "updated": 0, "disabled": 0, "unchanged": 0}
+    changed = [
+        account for account in accounts
+        if previous is None or previous.get(account.name) != account
+    ]
+    counts["unchanged"] = len(accounts) - len(changed)
+    names = {account.name for account in accounts}
+    removed = [name for name in previous or {} if name not in names]
+    if not changed and not removed:
+        return counts
+
+    async with db.get_session() as session:
+        result = await session.execute(
+            select(User.id, User.name, *(getattr(User, field) for field in ACCOUNT_FIELDS))
+            .where(User.name.in_([account.name for account in changed]))
+        )
+        existing = {row.name: row for row in result.all()}
+
+        inserts, updates, stale_creds = [], [], []
+        for account in changed:
+            row = existing.get(account.name)
+            if row is None:
+                inserts.append({"name": account.name, "user_id": "", **account.model_dump(include=set(ACCOUNT_FIELDS))})
+                logger.info("添加账号: {}", account.name)
+                continue
+
+            before = (previous or {}).get(account.name)
+            values = {field: getattr(row, field) for field in ACCOUNT_FIELDS}
+            for field in ACCOUNT_FIELDS:
+                value = getattr(account, field)
+                if field in CREDENTIAL_FIELDS:
+                    # 配置中未改动的凭证不写入（数据库中的可能已自动刷新），没有上一次的配置时只填补空值
+                    if not value:
+                        continue
+                    if before is not None and value == getattr(before, field):
+                        continue
+                    if before is None and getattr(row, field):
+                        continue
+                values[field] = value
+            if all(values[field] == getattr(row, field) for field in ACCOUNT_FIELDS):
+                counts["unchanged"] += 1
+                continue
+            if row.cred and values["cred"] != row.cred:
+                stale_creds.append(row.cred)
+            updates.append({"id": row.id, **values})
+            logger.info("更新账号: {}", account.name)
+
+        if inserts:
+            await session.execute(insert(User), inserts)
+        if updates:
+            await session.execute(update(User), updates)
+        if removed:
+            result = await session.execute(
+                update(User)
+                .where(User.name.in_(removed), User.enabled.is_(True))
+                .values(enabled=False)
+            )
+            counts["disabled"] = result.rowcount
+            if result.rowcount:
+                logger.info("禁用已从账号文件删除的账号: {}", ', '.join(removed))
+
+    for cred in stale_creds:
+        invalidate_cred(cred)
+    counts["created"] = len(inserts)
+    counts["updated"] = len(updates)
+    return counts
+
+
+class AccountsFile:
+    """账号文件（读取、比对并同步到数据库）"""
+
+    def __init__(self, path: str | Path):
+        path = Path(path)
+        self.path = path if path.is_absolute() else get_project_root() / path
+        self._stat: tuple[int, int] | None = None
+        self._digest: str | None = None
+        self._accounts: dict[str, AccountConfig] | None = None
+        self._lock = asyncio.Lock()
+
+    def _parse(self, content: bytes) -> list[AccountConfig]:
+        """解析账号文件（忽略未填写名称的账号，名称重复时以后面的为准）"""
+        accounts: dict[str, AccountConfig] = {}
+        for account in parse_accounts(content.decode("utf-8-sig"), "yaml"):
+            if not account.name:
+                logger.warning("账号文件 {} 中有未填写名称的账号，已忽略", self.path)
+                continue
+            if account.name in accounts:
+                logger.warning("账号文件 {} 中账号名称重复: {}", self.path, account.name)
+            accounts[account.name] = account
+        return list(accounts.values())
+
+    async def reload(self, force: bool = False) -> dict[str, int] | None:
+        """账号文件有变化时同步到数据库
+
+        Args:
+            force: 为 True 时不检查修改时间和内容
+
+        Returns:
+            dict: 同步结果，文件不存在、未变化或解析失败时为 None
+        """
+        async with self._lock:
+            try:
+                stat = self.path.stat()
+            except FileNotFoundError:
+                if self._stat is not None:
+                    logger.warning("账号文件 {} 已不存在，保留现有账号", self.path)
+                    self._stat = None
+                return None
+
+            key = (stat.st_mtime_ns, stat.st_size)
+            if not force and key == self._stat:
+                return None
+
+            content = await asyncio.to_thread(self.path.read_bytes)
+            digest = hashlib.sha256(content).hexdigest()
+            if not force and digest == self._digest:
+                self._stat = key
+                return None
+
+            try:
+                accounts = self._parse(content)
+            except Exception as e:
+                # 文件再次修改前不重复解析
+                self._stat = key
+                logger.error("解析账号文件 {} 失败，保留现有账号: {}", self.path, e)
+                return None
+
+            # 写入数据库失败时不记录文件状态，下次检查时重试
+            counts = await sync_accounts(accounts, self._accounts)
+            self._stat, self._digest = key, digest
+            self._accounts = {account.name: account for account in accounts}
+            logger.info(
+                "已同步账号文件 {}: {} 个账号，新增 {}，更新 {}，禁用 {}，未变化 {}",
+                self.path.name, len(accounts), counts["created"], counts["updated"],
+                counts["disabled"], counts["unchanged"],
+            )
+            return counts
+
+
+accounts_file = AccountsFile(accounts_config.file)
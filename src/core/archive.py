@@ -0,0 +1,379 @@
+"""签到记录归档模块
+
+把较早的签到记录移出 skland_sign_record，按月写入 data/archive/ 下的压缩文件：
+- 每月一个文件（sign_records_2025-01.bin），由若干 zlib 压缩块拼接而成，
+  每块是按签到日期排序的若干条记录（每行一条 JSON）
+- manifest.json 记录每个文件的记录数、日期范围，以及每个压缩块的偏移、长度和日期范围
+- 读取时通过 mmap 映射文件，只切出并解压与查询日期范围重叠的块，逐块产出记录，不把整个范围读入内存
+
+归档先写文件和清单，再从数据库删除记录；中途中断后重新归档会按记录 ID 去重。
+"""
+
+import asyncio
+import json
+import mmap
+import os
+import zlib
+from datetime import date, datetime
+from pathlib import Path
+from typing import AsyncIterator, Iterator
+
+from sqlalchemy import delete, func, select
+
+from config import get_data_dir
+from database import db
+from models import SignRecord, SignReward
+from utils.logger import logger
+
+MANIFEST_NAME = "manifest.json"
+
+# 归档文件中保存的字段
+RECORD_FIELDS = (
+    "id", "user_id", "character_id", "game_type", "sign_time", "sign_date",
+    "status", "attempts", "rewards", "error_message", "error_class",
+)
+
+_lock = asyncio.Lock()
+
+
+def archive_dir() -> Path:
+    """归档目录"""
+    path = get_data_dir() / "archive"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def load_manifest() -> dict:
+    """读取归档清单（月份 -> 文件信息）"""
+    path = archive_dir() / MANIFEST_NAME
+    if not path.exists():
+        return {"version": 1, "months": {}}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _save_manifest(manifest: dict):
+    _replace(archive_dir() / MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+
+
+def _replace(path: Path, data: bytes):
+    """先写临时文件再替换，中断时不会留下写了一半的文件"""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _record_dict(record: SignRecord) -> dict:
+    data = {field: getattr(record, field) for field in RECORD_FIELDS}
+    data["sign_time"] = record.sign_time.isoformat()
+    data["sign_date"] = (record.sign_date or record.sign_time.date()).isoformat()
+    return data
+
+
+def _write_month(month: str, records: list[dict], chunk_size: int) -> dict:
+    """写入一个月的归档文件，返回清单中的文件信息"""
+    records.sort(key=lambda record: (record["sign_date"], record["sign_time"], record["id"]))
+    chunks = []
+    data = bytearray()
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        lines = "\n".join(json.dumps(record, ensure_ascii=False, separators=(",", ":")) for record in chunk)
+        compressed = zlib.compress(lines.encode("utf-8"))
+        chunks.append({
+            "offset": len(data),
+            "length": len(compressed),
+            "count": len(chunk),
+            "min_date": chunk[0]["sign_date"],
+            "max_date": chunk[-1]["sign_date"],
+        })
+        data += compressed
+
+    file_name = f"sign_records_{month}.bin"
+    _replace(archive_dir() / file_name, bytes(data))
+    return {
+        "file": file_name,
+        "count": len(records),
+        "size": len(data),
+        "min_date": records[0]["sign_date"],
+        "max_date": records[-1]["sign_date"],
+        "chunks": chunks,
+    }
+
+
+def _matches(record: dict, start: str | None, end: str | None, filters: dict | None) -> bool:
+    if (start and record["sign_date"] < start) or (end and record["sign_date"] > end):
+        return False
+    return not filters or all(record[field] == value for field, value in filters.items())
+
+
+def _decode(data: bytes, start: str | None, end: str | None, filters: dict | None) -> list[dict]:
+    """解压一个块，返回其中符合条件的记录"""
+    records = (json.loads(line) for line in zlib.decompress(data).decode("utf-8").split("\n"))
+    return [record for record in records if _matches(record, start, end, filters)]
+
+
+def _overlaps(item: dict, start: str | None, end: str | None) -> bool:
+    return not ((start and item["max_date"] < start) or (end and item["min_date"] > end))
+
+
+def _map(entry: dict) -> mmap.mmap | None:
+    """只读映射一个月的归档文件，文件不存在或没有块时为 None"""
+    path = archive_dir() / entry["file"]
+    if not entry["chunks"] or not path.exists():
+        return None
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _read_chunk(
+    mapped: mmap.mmap, chunk: dict, start: str | None, end: str | None, filters: dict | None
+) -> list[dict]:
+    """从映射中切出一个块并解压"""
+    return _decode(mapped[chunk["offset"]:chunk["offset"] + chunk["length"]], start, end, filters)
+
+
+def _read_month(
+    entry: dict, start: str | None = None, end: str | None = None, filters: dict | None = None
+) -> Iterator[dict]:
+    """读取归档文件中签到日期在 [start, end] 内的记录（只解压重叠的块）"""
+    mapped = _map(entry)
+    if mapped is None:
+        return
+    with mapped:
+        for chunk in entry["chunks"]:
+            if _overlaps(chunk, start, end):
+                yield from _read_chunk(mapped, chunk, start, end, filters)
+
+
+class _MonthFiles:
+    """按需映射归档文件，每个文件只映射一次，用完后统一关闭"""
+
+    def __init__(self):
+        self._mapped: dict[str, mmap.mmap | None] = {}
+
+    def read(self, entry: dict, chunk: dict, start: str | None, end: str | None, filters: dict | None) -> list[dict]:
+        if entry["file"] not in self._mapped:
+            self._mapped[entry["file"]] = _map(entry)
+        mapped = self._mapped[entry["file"]]
+        return _read_chunk(mapped, chunk, start, end, filters) if mapped is not None else []
+
+    def close(self):
+        for mapped in self._mapped.values():
+            if mapped is not None:
+                mapped.close()
+        self._mapped.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _chunks(manifest: dict, start: str | None, end: str | None) -> list[tuple[dict, dict]]:
+    """与日期范围重叠的块（按签到日期升序）"""
+    return [
+        (entry, chunk)
+        for _, entry in sorted(manifest["months"].items())
+        if _overlaps(entry, start, end)
+        for chunk in entry["chunks"]
+        if _overlaps(chunk, start, end)
+    ]
+
+
+def _iso(day: date | None) -> str | None:
+    return day.isoformat() if day else None
+
+
+async def read_archived(
+    start_date: date | None = None,
+    end_date: date | None = None,
+    filters: dict | None = None,
+) -> AsyncIterator[dict]:
+    """逐条产出签到日期在范围内的归档记录（按签到日期升序）
+
+    每个月的文件映射一次，在线程中每次切出并解压一个块。
+
+    Args:
+        start_date: 开始日期，为空时不限
+        end_date: 结束日期，为空时不限
+        filters: 字段 -> 值，只产出这些字段都相等的记录
+    """
+    start, end = _iso(start_date), _iso(end_date)
+    manifest = await asyncio.to_thread(load_manifest)
+    files = _MonthFiles()
+    try:
+        month = None
+        for entry, chunk in _chunks(manifest, start, end):
+            if entry["file"] != month:
+                # 块按月份顺序排列，读到下一个月时关闭上一个月的映射
+                files.close()
+                month = entry["file"]
+            for record in await asyncio.to_thread(files.read, entry, chunk, start, end, filters):
+                yield record
+    finally:
+        files.close()
+
+
+# (清单版本, 日期范围, 过滤条件) -> 每个块中符合条件的记录数，翻页时不必重新解压前面的块
+_count_cache: dict[tuple, list[int]] = {}
+_COUNT_CACHE_SIZE = 64
+
+
+def _chunk_counts(
+    files: _MonthFiles,
+    chunks: list[tuple[dict, dict]],
+    start: str | None,
+    end: str | None,
+    filters: dict | None,
+    key: tuple,
+) -> list[int]:
+    counts = _count_cache.get(key)
+    if counts is None:
+        counts = [
+            # 没有过滤条件且整块都在范围内时直接用清单中的记录数
+            chunk["count"]
+            if not filters and (not start or chunk["min_date"] >= start) and (not end or chunk["max_date"] <= end)
+            else len(files.read(entry, chunk, start, end, filters))
+            for entry, chunk in chunks
+        ]
+        if len(_count_cache) >= _COUNT_CACHE_SIZE:
+            _count_cache.clear()
+        _count_cache[key] = counts
+    return counts
+
+
+def _read_page(
+    start: str | None, end: str | None, filters: dict | None, offset: int, limit: int
+) -> tuple[int, list[dict]]:
+    path = archive_dir() / MANIFEST_NAME
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return 0, []
+    chunks = _chunks(load_manifest(), start, end)
+    key = ((stat.st_mtime_ns, stat.st_size), start, end, tuple(sorted((filters or {}).items())))
+    with _MonthFiles() as files:
+        counts = _chunk_counts(files, chunks, start, end, filters, key)
+
+        records: list[dict] = []
+        for (entry, chunk), count in zip(reversed(chunks), reversed(counts)):
+            if len(records) >= limit:
+                break
+            if offset >= count:
+                offset -= count
+                continue
+            matched = files.read(entry, chunk, start, end, filters)
+            matched.reverse()
+            records.extend(matched[offset:offset + limit - len(records)])
+            offset = 0
+    return sum(counts), records
+
+
+async def read_archived_page(
+    start_date: date | None,
+    end_date: date | None,
+    filters: dict | None,
+    offset: int,
+    limit: int,
+) -> tuple[int, list[dict]]:
+    """按签到日期降序分页读取归档记录
+
+    每个块中符合条件的记录数按清单版本缓存，翻页时跳过前面的块，只解压本页所在的块。
+
+    Returns:
+        tuple: (符合条件的归档记录总数, 本页记录)
+    """
+    return await asyncio.to_thread(_read_page, _iso(start_date), _iso(end_date), filters, offset, limit)
+
+
+def iter_archived(
+    start_date: date | None = None, end_date: date | None = None, filters: dict | None = None
+) -> Iterator[dict]:
+    """逐月读取归档记录（同步，一次只解压一个块）"""
+    start, end = _iso(start_date), _iso(end_date)
+    for month, entry in sorted(load_manifest()["months"].items()):
+        if _overlaps(entry, start, end):
+            yield from _read_month(entry, start, end, filters)
+
+
+def _month_after(month_start: date) -> date:
+    return date(month_start.year + month_start.month // 12, month_start.month % 12 + 1, 1)
+
+
+async def archive_records(before: date, chunk_size: int = 1000) -> int:
+    """归档签到日期早于 before 的记录
+
+    Returns:
+        int: 归档的记录数
+    """
+    async with _lock:
+        async with db.get_session() as session:
+            oldest = (await session.execute(
+                select(func.min(SignRecord.sign_date)).where(SignRecord.sign_date < before)
+            )).scalar()
+        if oldest is None:
+            return 0
+
+        manifest = await asyncio.to_thread(load_manifest)
+        total = 0
+        month_start = oldest.replace(day=1)
+        while month_start < before:
+            month_end = min(_month_after(month_start), before)
+            async with db.get_session() as session:
+                records = (await session.execute(
+                    select(SignRecord).where(SignRecord.sign_date >= month_start, SignRecord.sign_date < month_end)
+                )).scalars().all()
+            if records:
+                total += await _archive_month(manifest, month_start.strftime("%Y-%m"), records, chunk_size)
+            month_start = _month_after(month_start)
+
+        logger.info("已归档 {} 条 {} 之前的签到记录", total, before)
+        return total
+
+
+async def _archive_month(manifest: dict, month: str, records: list[SignRecord], chunk_size: int) -> int:
+    """把一个月的记录合并进归档文件，再从数据库删除"""
+    entry = manifest["months"].get(month)
+    merged = {}
+    if entry:
+        merged = {record["id"]: record for record in await asyncio.to_thread(lambda: list(_read_month(entry)))}
+    merged.update({record.id: _record_dict(record) for record in records})
+
+    manifest["months"][month] = await asyncio.to_thread(_write_month, month, list(merged.values()), chunk_size)
+    await asyncio.to_thread(_save_manifest, manifest)
+
+    ids = [record.id for record in records]
+    async with db.get_session() as session:
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            await session.execute(delete(SignReward).where(SignReward.record_id.in_(chunk)))
+            await session.execute(delete(SignRecord).where(SignRecord.id.in_(chunk)))
+    logger.info("已归档 {} 的 {} 条签到记录", month, len(ids))
+    return len(ids)
+
+
+def archive_summary() -> list[dict]:
+    """归档文件概况"""
+    return [
+        {
+            "month": month,
+            "file": entry["file"],
+            "count": entry["count"],
+            "size": entry["size"],
+            "min_date": entry["min_date"],
+            "max_date": entry["max_date"],
+        }
+        for month, entry in sorted(load_manifest()["months"].items())
+    ]
+
+
+def parse_record(record: dict) -> dict:
+    """把归档记录中的日期字段转换回 datetime / date"""
+    return {
+        **record,
+        "sign_time": datetime.fromisoformat(record["sign_time"]),
+        "sign_date": date.fromisoformat(record["sign_date"]),
+    }
@@ -0,0 +1,164 @@
+"""签到日历模块
+
+每个角色每年一个 366 位的位图（skland_attendance），签到成功或重复签到时置位：
+- 写缓冲写入签到记录时同步更新位图（见 core.record_writer）
+- 连续签到天数、月历、漏签日期只需读取一两行位图，不扫描签到记录
+- rebuild_attendance() 从签到记录和归档记录重建全部位图
+"""
+
+import calendar
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Connection, bindparam, delete, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import Attendance, SignRecord
+
+# 位图字节数（366 位）
+BITMAP_BYTES = 46
+
+# 计入签到日历的状态
+ATTENDED_STATUSES = ("success", "duplicate")
+
+
+def day_index(day: date) -> int:
+    """日期在当年的位序号（1 月 1 日为 0）"""
+    return day.timetuple().tm_yday - 1
+
+
+def to_int(days: bytes | None) -> int:
+    """位图转为整数（第 n 位对应当年第 n + 1 天）"""
+    return int.from_bytes(days, "little") if days else 0
+
+
+def to_bytes(bits: int) -> bytes:
+    return bits.to_bytes(BITMAP_BYTES, "little")
+
+
+def _insert(conn: Connection):
+    return postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+
+
+def _collect(rows) -> dict[tuple[int, int], int]:
+    """按 (角色 ID, 年份) 汇总已签到日期的位"""
+    bitmaps: dict[tuple[int, int], int] = {}
+    for character_id, sign_date in rows:
+        key = (character_id, sign_date.year)
+        bitmaps[key] = bitmaps.get(key, 0) | (1 << day_index(sign_date))
+    return bitmaps
+
+
+def mark_attended(conn: Connection, rows: list[tuple[int, date]]):
+    """把已签到的日期合并进位图
+
+    并发写入同一行时不丢位：先插入缺少的行（冲突时跳过），再锁定这些行读取当前位图，
+    合并后写回。PostgreSQL 用 SELECT ... FOR UPDATE 锁定行；SQLite 只有一个写入者，
+    插入语句已取得数据库写锁，之后读到的就是最新的位图，直到事务提交。
+
+    Args:
+        conn: 数据库连接（异步会话中通过 run_sync 调用）
+        rows: (角色 ID, 签到日期) 列表
+    """
+    bitmaps = _collect(rows)
+    if not bitmaps:
+        return
+    # 按主键顺序插入和加锁，避免并发事务死锁
+    keys = sorted(bitmaps)
+    conn.execute(
+        _insert(conn)(Attendance).on_conflict_do_nothing(index_elements=["character_id", "year"]),
+        [{"character_id": character_id, "year": year, "days": to_bytes(0)} for character_id, year in keys],
+    )
+
+    changed = []
+    for start in range(0, len(keys), 500):
+        existing = conn.execute(
+            select(Attendance.character_id, Attendance.year, Attendance.days)
+            .where(tuple_(Attendance.character_id, Attendance.year).in_(keys[start:start + 500]))
+            .order_by(Attendance.character_id, Attendance.year)
+            .with_for_update()
+        )
+        for row in existing:
+            current = to_int(row.days)
+            merged = current | bitmaps[(row.character_id, row.year)]
+            if merged != current:
+                changed.append({
+                    "target_character_id": row.character_id,
+                    "target_year": row.year,
+                    "merged_days": to_bytes(merged),
+                })
+
+    if changed:
+        conn.execute(
+            update(Attendance)
+            .where(
+                Attendance.character_id == bindparam("target_character_id"),
+                Attendance.year == bindparam("target_year"),
+            )
+            .values(days=bindparam("merged_days"), updated_at=datetime.now()),
+            changed,
+        )
+
+
+def rebuild_attendance(conn: Connection) -> int:
+    """从签到记录（含归档记录）重建全部位图
+
+    Returns:
+        int: 位图行数
+    """
+    from core.archive import iter_archived
+
+    pairs = [
+        (row.character_id, row.sign_date)
+        for row in conn.execute(
+            select(SignRecord.character_id, SignRecord.sign_date).where(
+                SignRecord.status.in_(ATTENDED_STATUSES), SignRecord.sign_date.is_not(None)
+            )
+        )
+    ]
+    pairs.extend(
+        (record["character_id"], date.fromisoformat(record["sign_date"]))
+        for record in iter_archived()
+        if record["status"] in ATTENDED_STATUSES
+    )
+
+    conn.execute(delete(Attendance))
+    bitmaps = _collect(pairs)
+    if bitmaps:
+        conn.execute(
+            _insert(conn)(Attendance),
+            [
+                {"character_id": character_id, "year": year, "days": to_bytes(bits)}
+                for (character_id, year), bits in bitmaps.items()
+            ],
+        )
+    return len(bitmaps)
+
+
+def streak(bitmaps: dict[int, int], today: date) -> int:
+    """截至今天的连续签到天数（今天还没签到时从昨天算起）
+
+    Args:
+        bitmaps: 年份 -> 位图整数
+        today: 今天
+    """
+    day = today if bitmaps.get(today.year, 0) >> day_index(today) & 1 else today - timedelta(days=1)
+    total = 0
+    while True:
+        position = day_index(day)
+        window = (1 << (position + 1)) - 1
+        missed = ~bitmaps.get(day.year, 0) & window
+        if missed:
+            # 最近一个未签到的日期之后的天数
+            return total + position - missed.bit_length() + 1
+        total += position + 1
+        day = date(day.year - 1, 12, 31)
+        if day.year not in bitmaps:
+            return total
+
+
+def month_days(bits: int, year: int, month: int) -> list[bool]:
+    """某月每天是否已签到"""
+    first = day_index(date(year, month, 1))
+    count = calendar.monthrange(year, month)[1]
+    window = bits >> first & ((1 << count) - 1)
+    return [bool(window >> offset & 1) for offset in range(count)]
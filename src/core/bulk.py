@@ -0,0 +1,49 @@
+"""PostgreSQL 批量写入模块
+
+PostgreSQL（asyncpg）下大批量写入使用 COPY：先把数据 COPY 到临时表，再由一条
+INSERT ... SELECT（可带 ON CONFLICT）合并到目标表，省去逐行执行 insert 的往返和参数绑定。
+其他数据库（SQLite）不支持 COPY，调用方需先用 supports_copy() 判断。
+"""
+
+from itertools import count
+
+from sqlalchemy import Table, column, table, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.sql.expression import TableClause
+
+_temp_ids = count(1)
+
+
+def supports_copy(engine: AsyncEngine | None) -> bool:
+    """数据库是否支持 COPY（PostgreSQL + asyncpg）"""
+    return engine is not None and engine.dialect.name == "postgresql" and engine.dialect.driver == "asyncpg"
+
+
+async def copy_to_temp(session: AsyncSession, target: Table, rows: list[dict]) -> TableClause:
+    """把 rows COPY 到与目标表列类型相同的临时表
+
+    临时表只包含 rows 中出现的列，不带约束和默认值，事务提交后自动删除。
+
+    Args:
+        session: 数据库会话（COPY 在会话当前的事务中执行）
+        target: 目标表
+        rows: 要写入的行，每行的键相同
+
+    Returns:
+        TableClause: 临时表，可用于 insert(target).from_select(...)
+    """
+    columns = list(rows[0])
+    temp_name = f"_copy_{target.name}_{next(_temp_ids)}"
+    connection = await session.connection()
+    await connection.execute(text(
+        f"CREATE TEMP TABLE {temp_name} ON COMMIT DROP AS "
+        f"SELECT {', '.join(columns)} FROM {target.name} WITH NO DATA"
+    ))
+
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        temp_name,
+        records=[tuple(row[name] for name in columns) for row in rows],
+        columns=columns,
+    )
+    return table(temp_name, *(column(name) for name in columns))
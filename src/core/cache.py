@@ -0,0 +1,94 @@
+"""只读接口缓存模块
+
+缓存森空岛只读接口（获取绑定角色、获取 userId）的结果：
+- 按 cred 缓存，超过 TTL 过期，超过容量时淘汰最久未使用的条目（LRU）
+- 同一 cred 的并发请求共享同一次上游调用
+- cred 刷新后调用 invalidate_cred() 使该 cred 的缓存失效
+"""
+
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from config import config
+from core.metrics import CACHE_REQUESTS
+
+# 所有缓存实例，用于按 cred 统一失效
+_caches: list["AsyncTTLCache"] = []
+
+
+class AsyncTTLCache:
+    """带 TTL、LRU 淘汰和请求合并的异步缓存"""
+
+    def __init__(self, name: str, ttl: float, maxsize: int):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+        _caches.append(self)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """获取缓存的值，未命中时调用 loader 加载（异常不缓存）"""
+        if not self.enabled:
+            return await loader()
+
+        now = asyncio.get_running_loop().time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                CACHE_REQUESTS.labels(cache=self.name, result="hit").inc()
+                return value
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            CACHE_REQUESTS.labels(cache=self.name, result="coalesced").inc()
+        else:
+            CACHE_REQUESTS.labels(cache=self.name, result="miss").inc()
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_loaded(key, t))
+        # 某个调用方被取消时不取消共享的上游请求
+        return await asyncio.shield(task)
+
+    def _on_loaded(self, key: str, task: asyncio.Task):
+        # 加载期间已失效（被移除或替换）的结果不写入缓存
+        if self._inflight.get(key) is not task:
+            return
+        del self._inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._entries[key] = (task.get_loop().time() + self.ttl, task.result())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: str):
+        """使指定 key 的缓存失效"""
+        self._entries.pop(key, None)
+        self._inflight.pop(key, None)
+
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+        self._inflight.clear()
+
+
+def invalidate_cred(cred: str):
+    """cred 或 cred_token 刷新后，使该 cred 的所有缓存失效"""
+    if not cred:
+        return
+    for cache in _caches:
+        cache.invalidate(cred)
+
+
+# 森空岛只读接口的缓存
+binding_cache = AsyncTTLCache("binding", config.cache.ttl, config.cache.maxsize)
+user_id_cache = AsyncTTLCache("user_id", config.cache.ttl, config.cache.maxsize)
@@ -0,0 +1,264 @@
+"""凭证健康检查模块
+
+在签到前检查所有启用账号的凭证，提前刷新失效的凭证，避免签到时才发现凭证失效：
+- 按同步角色的并发数和速率并发调用获取 userId 接口（不使用缓存）
+- cred_token 失效时用 cred 刷新，cred 失效时用 token 重新获取，刷新后再检查一次
+- 全部检查完成后在一个事务中批量写入刷新后的凭证和检查结果（cred_status / cred_checked_at / cred_error），
+  凭证只在数据库中仍是检查前的值时写入，不覆盖期间被其他任务更新的凭证
+
+检查结果：
+- ok: 凭证有效
+- refreshed: 凭证已失效，刷新后有效
+- invalid: 凭证失效且无法刷新（未配置 token 或 token 也已失效）
+- error: 网络错误等其他原因，无法判断凭证是否有效
+
+另外在签到前几分钟预刷新较旧的 cred_token（refresh_stale_cred_tokens），
+签到时第一次请求即可成功，不必在最繁忙的时候先失败一次再刷新。
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, or_, select, update
+
+from config import config
+from database import db
+from models import User
+from schemas import CRED
+from core import SklandAPI
+from core.metrics import CRED_HEALTH
+from core.sign_service import refresh_cred, refresh_cred_token, user_credentials
+from core.throttle import run_limited
+from exception import LoginException, UnauthorizedException
+from utils.logger import logger
+
+CRED_STATUSES = ("ok", "refreshed", "invalid", "error")
+
+
+@dataclass
+class CredCheckResult:
+    """单个账号的凭证检查结果"""
+
+    status: str = "ok"
+    """检查结果（ok/refreshed/invalid/error）"""
+
+    error: str | None = None
+    """错误信息"""
+
+    duration: float = 0.0
+    """耗时（秒）"""
+
+
+async def _validate(user: User):
+    """调用获取 userId 接口验证凭证（绕过缓存）"""
+    user_id = await SklandAPI.get_user_ID(CRED(cred=user.cred, token=user.cred_token), use_cache=False)
+    if user_id:
+        user.user_id = str(user_id)
+
+
+async def _save_credentials(session, refreshed: list[tuple[User, tuple]]) -> int:
+    """写入刷新后的凭证
+
+    只有数据库中的 cred / cred_token 仍是刷新前的值时才写入，检查期间被签到、其他任务或账号文件
+    更新过的凭证不会被这里较旧的结果覆盖。
+
+    Args:
+        refreshed: (刷新后的用户, 刷新前的凭证 user_credentials) 列表
+
+    Returns:
+        int: 因凭证已被更新而跳过的账号数
+    """
+    if not refreshed:
+        return 0
+    # 带条件的批量更新在连接上执行（ORM 会话的批量更新只支持按主键更新）
+    connection = await session.connection()
+    result = await connection.execute(
+        update(User)
+        .where(
+            User.id == bindparam("target_id"),
+            User.cred.is_not_distinct_from(bindparam("old_cred")),
+            User.cred_token.is_not_distinct_from(bindparam("old_cred_token")),
+        )
+        .values(
+            cred=bindparam("new_cred"),
+            cred_token=bindparam("new_cred_token"),
+            user_id=bindparam("new_user_id"),
+            cred_refreshed_at=bindparam("new_cred_refreshed_at"),
+        ),
+        [
+            {
+                "target_id": user.id, "old_cred": old[0], "old_cred_token": old[1],
+                "new_cred": user.cred, "new_cred_token": user.cred_token,
+                "new_user_id": user.user_id, "new_cred_refreshed_at": user.cred_refreshed_at,
+            }
+            for user, old in refreshed
+        ],
+    )
+    skipped = len(refreshed) - result.rowcount if result.rowcount >= 0 else 0
+    if skipped:
+        logger.info("{} 个账号的凭证在刷新期间已被更新，保留数据库中较新的凭证", skipped)
+    return skipped
+
+
+async def check_credentials(user: User) -> CredCheckResult:
+    """检查并在需要时刷新账号的凭证（只更新 user 对象，由调用方写入数据库）"""
+    result = CredCheckResult()
+    start = time.perf_counter()
+    try:
+        try:
+            if not user.cred:
+                raise LoginException("未配置 cred")
+            try:
+                await _validate(user)
+            except UnauthorizedException:
+                logger.warning("用户 {} 检查凭证时 cred_token 失效，尝试自动刷新...", user.name)
+                await refresh_cred_token(user)
+                result.status = "refreshed"
+                await _validate(user)
+        except LoginException:
+            if not user.token:
+                raise
+            logger.warning("用户 {} 检查凭证时 cred 失效，尝试自动刷新...", user.name)
+            await refresh_cred(user)
+            result.status = "refreshed"
+            await _validate(user)
+    except (LoginException, UnauthorizedException) as e:
+        result.status, result.error = "invalid", str(e)
+    except Exception as e:
+        result.status, result.error = "error", str(e)
+    result.duration = time.perf_counter() - start
+
+    if result.error:
+        logger.error("用户 {} 凭证检查失败 ({}): {}", user.name, result.status, result.error)
+    return result
+
+
+async def check_all_credentials(trigger: str = "manual") -> dict:
+    """检查所有启用账号的凭证
+
+    Args:
+        trigger: 触发方式（schedule/api），仅用于日志
+
+    Returns:
+        dict: 汇总（各结果的账号数、耗时）和每个账号的结果
+    """
+    start = time.perf_counter()
+    async with db.get_session() as session:
+        result = await session.execute(select(User).where(User.enabled == True))
+        users = result.scalars().all()
+
+    logger.info("开始检查 {} 个账号的凭证（触发方式: {}）", len(users), trigger)
+
+    async def _check(user: User) -> tuple[User, CredCheckResult, tuple]:
+        credentials = user_credentials(user)
+        with logger.contextualize(user_id=user.id):
+            check = await check_credentials(user)
+        return user, check, credentials
+
+    checked = await run_limited(
+        users, _check, config.scheduler.sync_concurrency, config.scheduler.sync_rate_limit
+    )
+
+    now = datetime.now()
+    if checked:
+        async with db.get_session() as session:
+            await session.execute(update(User), [
+                {"id": user.id, "cred_status": check.status, "cred_checked_at": now, "cred_error": check.error}
+                for user, check, _ in checked
+            ])
+            await _save_credentials(session, [
+                (user, credentials) for user, _, credentials in checked if user_credentials(user) != credentials
+            ])
+
+    counts = {status: 0 for status in CRED_STATUSES}
+    for _, check, _ in checked:
+        counts[check.status] += 1
+    for status, count in counts.items():
+        CRED_HEALTH.labels(status=status).set(count)
+
+    duration = time.perf_counter() - start
+    logger.info(
+        "凭证检查完成: {} 个账号，有效 {}，已刷新 {}，失效 {}，出错 {}，耗时 {:.1f}s",
+        len(checked), counts["ok"], counts["refreshed"], counts["invalid"], counts["error"], duration,
+    )
+    return {
+        "total": len(checked),
+        **counts,
+        "duration_ms": round(duration * 1000),
+        "accounts": {
+            user.name: {
+                "status": check.status,
+                "error": check.error,
+                "duration_ms": round(check.duration * 1000),
+            }
+            for user, check, _ in checked
+        },
+    }
+
+
+async def refresh_stale_cred_tokens(max_age: timedelta, trigger: str = "manual") -> dict:
+    """预刷新超过 max_age 未刷新的 cred_token
+
+    按同步角色的并发数和速率并发刷新，cred 也已失效且配置了 token 时重新获取 cred，
+    全部完成后批量写入（只写入数据库中仍是刷新前凭证的账号，见 _save_credentials）。
+
+    Args:
+        max_age: cred_token 距上次刷新的最长时间，从未记录刷新时间的账号也会刷新
+        trigger: 触发方式（schedule/api），仅用于日志
+
+    Returns:
+        dict: 刷新的账号数、失败的账号数、因凭证已被更新而未写入的账号数和耗时
+    """
+    start = time.perf_counter()
+    async with db.get_session() as session:
+        result = await session.execute(
+            select(User).where(
+                User.enabled == True,
+                User.cred != "",
+                or_(User.cred_refreshed_at.is_(None), User.cred_refreshed_at < datetime.now() - max_age),
+            )
+        )
+        users = result.scalars().all()
+
+    logger.info("开始预刷新 {} 个账号的 cred_token（触发方式: {}）", len(users), trigger)
+
+    async def _refresh(user: User) -> tuple[User, tuple, str | None]:
+        credentials = user_credentials(user)
+        with logger.contextualize(user_id=user.id):
+            try:
+                try:
+                    await refresh_cred_token(user)
+                except LoginException:
+                    if not user.token:
+                        raise
+                    logger.warning("用户 {} 预刷新 cred_token 时 cred 失效，尝试自动刷新...", user.name)
+                    await refresh_cred(user)
+            except Exception as e:
+                logger.error("用户 {} 预刷新 cred_token 失败: {}", user.name, e)
+                return user, credentials, str(e)
+        return user, credentials, None
+
+    refreshed = await run_limited(
+        users, _refresh, config.scheduler.sync_concurrency, config.scheduler.sync_rate_limit
+    )
+
+    succeeded = [(user, credentials) for user, credentials, error in refreshed if error is None]
+    skipped = 0
+    if succeeded:
+        async with db.get_session() as session:
+            skipped = await _save_credentials(session, succeeded)
+
+    duration = time.perf_counter() - start
+    failed = len(refreshed) - len(succeeded)
+    logger.info(
+        "cred_token 预刷新完成: 刷新 {} 个账号，失败 {}，耗时 {:.1f}s", len(succeeded), failed, duration,
+    )
+    return {
+        "total": len(refreshed),
+        "refreshed": len(succeeded),
+        "failed": failed,
+        "skipped": skipped,
+        "duration_ms": round(duration * 1000),
+        "errors": {user.name: error for user, _, error in refreshed if error is not None},
+    }
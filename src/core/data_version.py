@@ -0,0 +1,40 @@
+"""数据版本模块
+
+每次执行写入语句（INSERT/UPDATE/DELETE）后递增版本号，
+用于判断基于数据库内容生成的缓存（如统计接口的响应缓存）是否过期。
+版本号只在当前进程内有效，其他进程的写入由缓存的有效期兜底。
+"""
+
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class DataVersion:
+    """数据版本号"""
+
+    def __init__(self):
+        self.value = 0
+        self.changed_at = datetime.now(timezone.utc)
+
+    def bump(self):
+        """数据已变化"""
+        self.value += 1
+        self.changed_at = datetime.now(timezone.utc)
+
+    def install(self, engine: Engine):
+        """在引擎上注册写入事件
+
+        Args:
+            engine: 同步引擎（AsyncEngine.sync_engine）
+        """
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            if context is not None and (context.isinsert or context.isupdate or context.isdelete):
+                self.bump()
+
+
+# 全局数据版本
+data_version = DataVersion()
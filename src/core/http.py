@@ -0,0 +1,42 @@
+"""HTTP 请求模块
+
+森空岛相关接口的统一请求入口，负责上报请求耗时和监控指标。
+"""
+
+import time
+from urllib.parse import urlparse
+
+import httpx
+
+from core.run_recorder import record_http
+from core.metrics import UPSTREAM_LATENCY, HTTP_IN_FLIGHT
+from core.tracing import tracer
+
+
+async def request(method: str, url: str, **kwargs) -> httpx.Response:
+    """发送 HTTP 请求
+
+    Args:
+        method: 请求方法
+        url: 请求地址
+        **kwargs: 透传给 httpx 的参数
+
+    Returns:
+        httpx.Response: 响应
+    """
+    endpoint = urlparse(url).path
+    status = "error"
+    async with httpx.AsyncClient() as client:
+        start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            with tracer.span("http.request", method=method, endpoint=endpoint) as span:
+                response = await client.request(method, url, **kwargs)
+                status = str(response.status_code)
+                span.set_attribute("status_code", response.status_code)
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            UPSTREAM_LATENCY.labels(endpoint=endpoint, status=status).observe(elapsed)
+            record_http(elapsed)
@@ -0,0 +1,127 @@
+"""监控指标模块
+
+使用 prometheus_client 暴露 Prometheus 格式的指标：
+- 上游接口请求耗时（按接口和状态码）
+- 各游戏签到结果、凭证刷新次数和检查结果、签到记录写缓冲、只读接口缓存命中
+- HTTP 连接、数据库连接池和定时任务调度延迟
+"""
+
+from datetime import datetime
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+UPSTREAM_LATENCY = Histogram(
+    "skland_upstream_request_seconds",
+    "上游接口请求耗时",
+    ["endpoint", "status"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+HTTP_IN_FLIGHT = Gauge(
+    "skland_http_requests_in_flight",
+    "正在进行的上游 HTTP 请求数（即占用的 HTTP 连接数）",
+)
+
+SIGN_OUTCOMES = Counter(
+    "skland_sign_outcomes_total",
+    "签到结果计数",
+    ["game", "status"],
+)
+
+CRED_REFRESHES = Counter(
+    "skland_cred_refresh_total",
+    "凭证刷新计数",
+    ["kind", "result"],
+)
+
+CRED_HEALTH = Gauge(
+    "skland_cred_health_accounts",
+    "最近一次凭证检查各结果的账号数",
+    ["status"],
+)
+
+RECORD_WRITES = Counter(
+    "skland_record_writer_rows_total",
+    "签到记录写缓冲写入的行数",
+    ["result"],
+)
+
+RECORD_QUEUE_DEPTH = Gauge(
+    "skland_record_writer_queue_depth",
+    "签到记录写缓冲中等待写入的行数",
+)
+
+CACHE_REQUESTS = Counter(
+    "skland_cache_requests_total",
+    "只读接口缓存请求计数（hit 命中，miss 未命中，coalesced 合并到进行中的请求）",
+    ["cache", "result"],
+)
+
+SCHEDULER_LAG = Gauge(
+    "skland_scheduler_job_lag_seconds",
+    "定时任务实际提交时间与计划时间的差值",
+    ["job"],
+)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+
+class _RuntimeCollector:
+    """运行时指标采集器（数据库连接池、定时任务下次运行时间）
+
+    在抓取时读取当前状态，避免在业务代码中维护。
+    """
+
+    def describe(self):
+        # 注册时不调用 collect()，避免在导入阶段引入数据库和调度器模块
+        return []
+
+    def collect(self):
+        from database import db
+        from scheduler import job_manager
+
+        pool = db.engine.pool if db.engine is not None else None
+        size = GaugeMetricFamily("skland_db_pool_size", "数据库连接池大小")
+        checked_out = GaugeMetricFamily("skland_db_pool_checked_out", "数据库连接池已借出连接数")
+        overflow = GaugeMetricFamily("skland_db_pool_overflow", "数据库连接池溢出连接数")
+        if pool is not None and hasattr(pool, "checkedout"):
+            size.add_metric([], pool.size())
+            checked_out.add_metric([], pool.checkedout())
+            overflow.add_metric([], max(pool.overflow(), 0))
+        yield size
+        yield checked_out
+        yield overflow
+
+        next_run = GaugeMetricFamily(
+            "skland_scheduler_next_run_seconds",
+            "距离定时任务下次运行的秒数",
+            labels=["job"],
+        )
+        if job_manager.scheduler.running:
+            for job in job_manager.get_jobs():
+                if job.next_run_time is not None:
+                    delta = job.next_run_time - datetime.now(job.next_run_time.tzinfo)
+                    next_run.add_metric([job.id], delta.total_seconds())
+        yield next_run
+
+
+REGISTRY.register(_RuntimeCollector())
+
+
+def render_metrics() -> bytes:
+    """生成 Prometheus 文本格式的指标"""
+    return generate_latest(REGISTRY)
+
+
+def start_exporter(port: int):
+    """启动内嵌的指标 HTTP 服务（用于未启用 Web 的独立运行模式）"""
+    start_http_server(port)
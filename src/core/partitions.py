@@ -0,0 +1,108 @@
+"""签到记录分区模块（仅 PostgreSQL）
+
+开启 DATABASE_PARTITION_SIGN_RECORD 后，新建的 skland_sign_record 按 sign_date 按月范围分区：
+- 分区表的主键和唯一索引必须包含分区键，主键改为 (id, sign_date)
+- skland_sign_reward 的外键相应改为 (record_id, sign_date)
+- 每月一个分区（skland_sign_record_y2026m01），另有默认分区兜底，按日期查询时只扫描相关分区
+
+已存在的普通表不会自动转换。
+"""
+
+from datetime import date
+
+from sqlalchemy import Connection, ForeignKeyConstraint, MetaData, PrimaryKeyConstraint, text
+
+from database import Base
+from utils.logger import logger
+
+SIGN_RECORD_TABLE = "skland_sign_record"
+SIGN_REWARD_TABLE = "skland_sign_reward"
+
+
+def create_partitioned_tables(conn: Connection):
+    """创建按月分区的签到记录表（及引用它的奖励明细表）
+
+    在 create_all 之前调用，create_all 会跳过已创建的表。
+    """
+    metadata = MetaData()
+    for source in Base.metadata.sorted_tables:
+        source.to_metadata(metadata)
+
+    record = metadata.tables[SIGN_RECORD_TABLE]
+    record.c.sign_date.primary_key = True
+    record.c.sign_date.nullable = False
+    record.append_constraint(PrimaryKeyConstraint("id", "sign_date"))
+    record.dialect_options["postgresql"]["partition_by"] = "RANGE (sign_date)"
+
+    reward = metadata.tables[SIGN_REWARD_TABLE]
+    for constraint in list(reward.foreign_key_constraints):
+        if constraint.referred_table is record:
+            reward.constraints.remove(constraint)
+    reward.append_constraint(ForeignKeyConstraint(
+        ["record_id", "sign_date"], [record.c.id, record.c.sign_date], ondelete="CASCADE",
+    ))
+
+    metadata.create_all(conn, tables=[metadata.tables[name] for name in _dependencies(metadata)])
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {SIGN_RECORD_TABLE}_default PARTITION OF {SIGN_RECORD_TABLE} DEFAULT"))
+    logger.info("已创建按月分区的签到记录表")
+
+
+def _dependencies(metadata: MetaData) -> list[str]:
+    """签到记录表、奖励明细表及它们依赖的表"""
+    names = {SIGN_RECORD_TABLE, SIGN_REWARD_TABLE}
+    for name in (SIGN_RECORD_TABLE, SIGN_REWARD_TABLE):
+        names.update(fk.referred_table.name for fk in metadata.tables[name].foreign_key_constraints)
+    return [table.name for table in metadata.sorted_tables if table.name in names]
+
+
+def is_partitioned(conn: Connection) -> bool:
+    """签到记录表是否为分区表"""
+    return conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:name)"),
+        {"name": SIGN_RECORD_TABLE},
+    ).first() is not None
+
+
+def month_partitions(today: date, months_ahead: int) -> list[tuple[str, date, date]]:
+    """从本月起（含上月）的月分区 (分区名, 起始日期, 结束日期)"""
+    partitions = []
+    year, month = (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+    for _ in range(months_ahead + 2):
+        next_year, next_month = (year, month + 1) if month < 12 else (year + 1, 1)
+        partitions.append((
+            f"{SIGN_RECORD_TABLE}_y{year}m{month:02d}", date(year, month, 1), date(next_year, next_month, 1),
+        ))
+        year, month = next_year, next_month
+    return partitions
+
+
+def ensure_partitions(conn: Connection, months_ahead: int) -> int:
+    """创建缺少的月分区
+
+    默认分区中已有某月的数据时无法再创建该月分区，跳过并记录警告。
+
+    Returns:
+        int: 新建的分区数
+    """
+    existing = {
+        row.name for row in conn.execute(text(
+            "SELECT c.relname AS name FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:name)"
+        ), {"name": SIGN_RECORD_TABLE})
+    }
+    created = 0
+    for name, start, end in month_partitions(date.today(), months_ahead):
+        if name in existing:
+            continue
+        try:
+            with conn.begin_nested():
+                conn.execute(text(
+                    f"CREATE TABLE {name} PARTITION OF {SIGN_RECORD_TABLE} "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                ))
+            created += 1
+        except Exception as e:
+            logger.warning("创建签到记录分区 {} 失败: {}", name, e)
+    if created:
+        logger.info("已创建 {} 个签到记录分区", created)
+    return created
@@ -0,0 +1,99 @@
+"""数据库查询统计模块
+
+通过 SQLAlchemy 事件统计每个请求执行的 SQL 次数、总耗时和最慢的语句：
+- track_queries() 为当前请求开启统计（由 Web 中间件调用）
+- 超过阈值的语句写入慢查询日志（不论是否在请求中）
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from utils.logger import logger
+
+
+@dataclass
+class QueryStats:
+    """单个请求的查询统计"""
+
+    count: int = 0
+    """执行的 SQL 次数"""
+
+    total: float = 0.0
+    """SQL 总耗时（秒）"""
+
+    slowest: float = 0.0
+    """最慢一条 SQL 的耗时（秒）"""
+
+    slowest_statement: str = ""
+    """最慢的 SQL 语句"""
+
+    def server_timing(self) -> str:
+        """生成 Server-Timing 响应头的值"""
+        return (
+            f'db;dur={self.total * 1000:.1f};desc="{self.count} queries", '
+            f"db-slowest;dur={self.slowest * 1000:.1f}"
+        )
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+_context: ContextVar[str] = ContextVar("query_context", default="")
+
+
+@contextmanager
+def track_queries(context: str = ""):
+    """统计代码块内执行的 SQL
+
+    Args:
+        context: 上下文描述（如 "GET /api/accounts/"），写入慢查询日志
+    """
+    stats = QueryStats()
+    stats_token = _current.set(stats)
+    context_token = _context.set(context)
+    try:
+        yield stats
+    finally:
+        _current.reset(stats_token)
+        _context.reset(context_token)
+
+
+def install(engine: Engine, slow_query_ms: float):
+    """在引擎上注册查询统计事件
+
+    Args:
+        engine: 同步引擎（AsyncEngine.sync_engine）
+        slow_query_ms: 慢查询阈值（毫秒），<= 0 时不记录慢查询
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.count += 1
+            stats.total += elapsed
+            if elapsed > stats.slowest:
+                stats.slowest = elapsed
+                stats.slowest_statement = statement
+        if 0 < slow_query_ms <= elapsed * 1000:
+            logger.warning(
+                "慢查询 {:.1f}ms{}: {}",
+                elapsed * 1000,
+                f" ({_context.get()})" if _context.get() else "",
+                " ".join(statement.split()),
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(exception_context):
+        # 执行失败时不会触发 after_cursor_execute，丢弃对应的开始时间
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
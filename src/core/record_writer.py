@@ -0,0 +1,332 @@
+"""签到记录写缓冲模块
+
+签到结果先放入内存队列，由后台任务按条数或时间批量写入 skland_sign_record：
+- 使用 insert ... ON CONFLICT 批量写入，不创建 ORM 对象、不经过 identity map
+- PostgreSQL 下批次较大时先 COPY 到临时表再合并（见 core.bulk）
+- 队列有上限，数据库写入跟不上时 put() 会等待（背压）
+- flush() 等待已放入的记录全部写入，close() 在关闭时写完剩余记录
+
+每个角色每个游戏每天只有一条记录：写入为 upsert（更新状态并累加尝试次数），
+成功签到的奖励同时拆分写入奖励明细表（见 core.rewards），成功或重复签到同时更新签到日历（见 core.attendance），角色和账号的最近签到状态同时更新（见 core.sign_state），
+签到前通过 claim_characters() 认领角色，避免多个同时运行的签到任务重复签到同一角色。
+"""
+
+import asyncio
+import contextvars
+from contextlib import suppress
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, select, tuple_, update, or_, and_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config import config, DatabaseConfig
+from database import db
+from models import SignRecord
+from core.metrics import RECORD_WRITES, RECORD_QUEUE_DEPTH
+from core.bulk import copy_to_temp, supports_copy
+from core.rewards import save_rewards
+from core.attendance import ATTENDED_STATUSES, mark_attended
+from core.sign_state import update_characters, update_users
+from utils.logger import logger
+
+
+def sign_record_row(
+    user_id: int,
+    character_id: int,
+    game_type: str,
+    status: str,
+    rewards: str = "",
+    error_message: str = "",
+    error_class: str | None = None,
+    sign_date: date | None = None,
+) -> dict:
+    """生成一条签到记录（写缓冲使用的行格式）
+
+    sign_date 为空时取当前日期；认领后签到的记录应传入认领时的日期，跨过零点也写入认领的那一行。
+    """
+    now = datetime.now()
+    return {
+        "user_id": user_id,
+        "character_id": character_id,
+        "game_type": game_type,
+        "status": status,
+        "rewards": rewards,
+        "error_message": error_message,
+        "error_class": error_class,
+        "sign_time": now,
+        "sign_date": sign_date or now.date(),
+        "attempts": 1,
+    }
+
+
+# 签到记录的唯一键
+RECORD_KEY = ("character_id", "game_type", "sign_date")
+
+# 认领超时时间，超时未完成的认领（如进程崩溃）可被其他运行接管
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def _insert():
+    """当前数据库方言的 insert（支持 ON CONFLICT）"""
+    return postgresql.insert if db.engine.dialect.name == "postgresql" else sqlite.insert
+
+
+def _upsert_statement(source=None):
+    """签到记录 upsert：已有当天记录时更新状态并累加尝试次数，已成功的记录保持成功
+
+    Args:
+        source: 数据来源表（COPY 写入的临时表），为空时按传入的参数逐行写入
+    """
+    stmt = _insert()(SignRecord)
+    if source is not None:
+        stmt = stmt.from_select(list(source.c.keys()), source.select())
+    keep_success = SignRecord.status == "success"
+    return stmt.on_conflict_do_update(
+        index_elements=list(RECORD_KEY),
+        set_={
+            "status": case((keep_success, SignRecord.status), else_=stmt.excluded.status),
+            "rewards": case((keep_success, SignRecord.rewards), else_=stmt.excluded.rewards),
+            "error_message": stmt.excluded.error_message,
+            "error_class": case((keep_success, SignRecord.error_class), else_=stmt.excluded.error_class),
+            "sign_time": stmt.excluded.sign_time,
+            "attempts": SignRecord.attempts + 1,
+        },
+    )
+
+
+async def claim_characters(
+    owner: str, user_id: int, keys: list[tuple[int, str]], sign_date: date | None = None
+) -> dict[tuple[int, str], str]:
+    """认领今天要签到的角色
+
+    Args:
+        owner: 认领者（签到运行 ID）
+        user_id: 用户 ID
+        keys: (角色 ID, 游戏类型) 列表
+        sign_date: 认领的签到日期，为空时取今天；签到结果需以同一日期写入（见 sign_record_row）
+
+    Returns:
+        dict: (角色 ID, 游戏类型) -> 认领结果
+            "claimed": 认领成功，可以签到
+            "done": 今天已签到成功，无需再签
+            "busy": 已被其他运行认领
+    """
+    if not keys:
+        return {}
+    today = sign_date or date.today()
+    now = datetime.now()
+    requested = tuple_(SignRecord.character_id, SignRecord.game_type).in_(keys)
+
+    async with db.get_session() as session:
+        # 今天还没有记录的角色：插入认领中的占位记录
+        await session.execute(
+            _insert()(SignRecord).on_conflict_do_nothing(index_elements=list(RECORD_KEY)),
+            [
+                {
+                    "user_id": user_id,
+                    "character_id": character_id,
+                    "game_type": game_type,
+                    "sign_date": today,
+                    "sign_time": now,
+                    "status": "pending",
+                    "attempts": 0,
+                    "rewards": "",
+                    "error_message": "",
+                    "error_class": None,
+                    "claimed_by": owner,
+                    "claimed_at": now,
+                }
+                for character_id, game_type in keys
+            ],
+        )
+        # 已有记录的角色：认领失败的，或认领超时的
+        await session.execute(
+            update(SignRecord)
+            .where(
+                SignRecord.sign_date == today,
+                requested,
+                or_(
+                    SignRecord.status == "failed",
+                    and_(SignRecord.status == "pending", SignRecord.claimed_at < now - CLAIM_TIMEOUT),
+                ),
+            )
+            .values(status="pending", claimed_by=owner, claimed_at=now)
+        )
+        result = await session.execute(
+            select(SignRecord.character_id, SignRecord.game_type, SignRecord.status, SignRecord.claimed_by).where(
+                SignRecord.sign_date == today,
+                requested,
+            )
+        )
+
+    claims = {}
+    for row in result.all():
+        if row.status in ("success", "duplicate"):
+            claims[(row.character_id, row.game_type)] = "done"
+        elif row.status == "pending" and row.claimed_by == owner:
+            claims[(row.character_id, row.game_type)] = "claimed"
+        else:
+            claims[(row.character_id, row.game_type)] = "busy"
+    return claims
+
+
+async def _save_rewards(session, rows: list[dict]):
+    """拆分写入本批成功签到的奖励明细"""
+    keys = {
+        (row["character_id"], row["game_type"], row["sign_date"])
+        for row in rows
+        if row["status"] == "success" and row["rewards"]
+    }
+    if not keys:
+        return
+    result = await session.execute(
+        select(
+            SignRecord.id, SignRecord.character_id, SignRecord.game_type, SignRecord.sign_date, SignRecord.rewards
+        ).where(
+            SignRecord.character_id.in_({character_id for character_id, _, _ in keys}),
+            SignRecord.sign_date.in_({sign_date for _, _, sign_date in keys}),
+            SignRecord.status == "success",
+        )
+    )
+    records = [
+        (row.id, row.sign_date, row.game_type, row.rewards)
+        for row in result.all()
+        if (row.character_id, row.game_type, row.sign_date) in keys
+    ]
+    connection = await session.connection()
+    await connection.run_sync(save_rewards, records)
+
+
+async def _mark_attendance(session, rows: list[dict]):
+    """本批成功或重复签到的日期写入签到日历"""
+    attended = [(row["character_id"], row["sign_date"]) for row in rows if row["status"] in ATTENDED_STATUSES]
+    if attended:
+        connection = await session.connection()
+        await connection.run_sync(mark_attended, attended)
+
+
+async def _update_sign_state(session, rows: list[dict]):
+    """本批记录同步到角色和账号的最近签到状态"""
+    def update(conn):
+        update_users(conn, update_characters(conn, rows))
+
+    connection = await session.connection()
+    await connection.run_sync(update)
+
+
+class RecordWriter:
+    """签到记录写缓冲"""
+
+    def __init__(self, db_config: DatabaseConfig):
+        self._batch_size = db_config.write_batch_size
+        self._interval = db_config.write_flush_interval
+        self._queue_size = db_config.write_queue_size
+        self._copy_threshold = db_config.copy_threshold
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[dict] | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # 队列和事件绑定在事件循环上，换了事件循环（如多次 asyncio.run）需要重新创建
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self._queue_size)
+            self._wakeup = asyncio.Event()
+            self._task = None
+        if self._task is None or self._task.done():
+            # 在空的上下文中创建后台任务，避免继承当前签到运行的计时和日志上下文
+            self._task = contextvars.Context().run(loop.create_task, self._worker())
+
+    async def put(self, row: dict):
+        """放入一条记录，缓冲区已满时等待"""
+        self._ensure_started()
+        await self._queue.put(row)
+        RECORD_QUEUE_DEPTH.set(self._queue.qsize())
+        if self._queue.qsize() >= self._batch_size:
+            self._wakeup.set()
+
+    async def put_many(self, rows: list[dict]):
+        """放入多条记录"""
+        for row in rows:
+            await self.put(row)
+
+    async def flush(self):
+        """立即写入缓冲区中的记录，并等待全部写入完成"""
+        if self._queue is None or self._loop is not asyncio.get_running_loop():
+            return
+        self._wakeup.set()
+        await self._queue.join()
+
+    async def close(self):
+        """写入剩余记录并停止后台任务"""
+        if self._task is None or self._loop is not asyncio.get_running_loop():
+            return
+        await self.flush()
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def _worker(self):
+        while True:
+            rows = [await self._queue.get()]
+            deadline = self._loop.time() + self._interval
+            # 攒够一批、到达时间或被要求立即写入时写入
+            while len(rows) < self._batch_size:
+                try:
+                    rows.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - self._loop.time()
+                if self._wakeup.is_set() or timeout <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+            await self._write(rows)
+            for _ in rows:
+                self._queue.task_done()
+            RECORD_QUEUE_DEPTH.set(self._queue.qsize())
+            if self._queue.empty():
+                self._wakeup.clear()
+
+    def _use_copy(self, rows: list[dict]) -> bool:
+        """本批是否使用 COPY 写入
+
+        一条 INSERT ... ON CONFLICT 不能更新同一行两次，批次中有重复的记录（同一角色同一天多次写入）时逐行写入。
+        """
+        if not self._copy_threshold or len(rows) < self._copy_threshold or not supports_copy(db.engine):
+            return False
+        return len({tuple(row[key] for key in RECORD_KEY) for row in rows}) == len(rows)
+
+    async def _write(self, rows: list[dict]):
+        """批量 upsert，失败时重试一次（如 SQLite 短暂的写锁冲突）"""
+        for attempt in range(2):
+            try:
+                async with db.get_session() as session:
+                    if self._use_copy(rows):
+                        source = await copy_to_temp(session, SignRecord.__table__, rows)
+                        await session.execute(_upsert_statement(source))
+                    else:
+                        await session.execute(_upsert_statement(), rows)
+                    await _save_rewards(session, rows)
+                    await _mark_attendance(session, rows)
+                    await _update_sign_state(session, rows)
+                RECORD_WRITES.labels(result="success").inc(len(rows))
+                return
+            except Exception as e:
+                if attempt == 0:
+                    logger.warning("写入 {} 条签到记录失败，稍后重试: {}", len(rows), e)
+                    await asyncio.sleep(1)
+                else:
+                    logger.error("写入 {} 条签到记录失败，已丢弃: {}", len(rows), e)
+                    RECORD_WRITES.labels(result="failed").inc(len(rows))
+
+
+# 全局写缓冲实例
+record_writer = RecordWriter(config.database)
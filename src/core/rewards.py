@@ -0,0 +1,129 @@
+"""签到奖励模块
+
+签到记录的 rewards 字段保存 JSON 格式的奖励列表，统一为
+``[{"id": 物品标识, "name": 名称, "type": 类型, "count": 数量}, ...]``；
+同时拆分写入奖励物品字典（skland_reward_item）和奖励明细（skland_sign_reward）用于统计。
+"""
+
+import json
+from datetime import date
+
+from sqlalchemy import Connection, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import RewardItem, SignReward
+from schemas import ArkSignResponse, EndfieldSignResponse
+
+
+def ark_rewards(response: ArkSignResponse) -> list[dict]:
+    """明日方舟签到奖励（物品没有 ID，以名称作为标识）"""
+    return [
+        {"id": award.resource.name, "name": award.resource.name, "type": "", "count": award.count}
+        for award in response.awards
+    ]
+
+
+def endfield_rewards(response: EndfieldSignResponse) -> list[dict]:
+    """终末地签到奖励（名称和数量来自 resourceInfoMap）"""
+    rewards = []
+    for award_id in response.awardIds:
+        info = response.resourceInfoMap.get(award_id.id)
+        rewards.append({
+            "id": award_id.id,
+            "name": info.name if info else "",
+            "type": str(award_id.type),
+            "count": info.count if info else 1,
+        })
+    return rewards
+
+
+def parse_rewards(text: str | None) -> list[dict]:
+    """解析签到记录中的奖励 JSON
+
+    兼容旧格式：明日方舟只有 name/count，终末地只有 id/type（没有数量时按 1 计）。
+    """
+    if not text:
+        return []
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return []
+    if not isinstance(data, list):
+        return []
+
+    rewards = []
+    for entry in data:
+        if not isinstance(entry, dict):
+            continue
+        key = str(entry.get("id") or entry.get("name") or "")
+        if not key:
+            continue
+        rewards.append({
+            "id": key,
+            "name": str(entry.get("name") or ""),
+            "type": str(entry.get("type") if entry.get("type") is not None else ""),
+            "count": int(entry.get("count") or 1),
+        })
+    return rewards
+
+
+def save_rewards(conn: Connection, records: list[tuple[int, date, str, str]]) -> int:
+    """拆分并写入签到奖励（已存在的明细跳过，可重复执行）
+
+    Args:
+        conn: 数据库连接（异步会话中通过 run_sync 调用）
+        records: (签到记录 ID, 签到日期, 游戏类型, 奖励 JSON) 列表
+
+    Returns:
+        int: 解析出的奖励明细条数
+    """
+    insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+
+    parsed = []
+    items: dict[tuple[str, str], dict] = {}
+    for record_id, sign_date, game_type, text in records:
+        for reward in parse_rewards(text):
+            key = (game_type, reward["id"])
+            item = items.setdefault(key, {"game_type": game_type, "item_key": reward["id"], "name": "", "item_type": ""})
+            # 旧格式的终末地记录没有名称，有名称时补充
+            item["name"] = item["name"] or reward["name"] or reward["id"]
+            item["item_type"] = item["item_type"] or reward["type"]
+            parsed.append((record_id, sign_date, key, reward["count"]))
+    if not parsed:
+        return 0
+
+    # 补充物品字典，已有的物品如果之前没有名称则更新
+    stmt = insert(RewardItem)
+    conn.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["game_type", "item_key"],
+            set_={"name": stmt.excluded.name},
+            where=RewardItem.name == RewardItem.item_key,
+        ),
+        list(items.values()),
+    )
+    item_ids = {}
+    for game_type in {game_type for game_type, _ in items}:
+        keys = [key for game, key in items if game == game_type]
+        for start in range(0, len(keys), 500):
+            rows = conn.execute(
+                select(RewardItem.id, RewardItem.item_key).where(
+                    RewardItem.game_type == game_type,
+                    RewardItem.item_key.in_(keys[start:start + 500]),
+                )
+            )
+            item_ids.update({(game_type, row.item_key): row.id for row in rows})
+
+    # 同一条记录中重复出现的物品合并数量
+    rewards: dict[tuple[int, int], dict] = {}
+    for record_id, sign_date, key, count in parsed:
+        item_id = item_ids[key]
+        row = rewards.setdefault(
+            (record_id, item_id), {"record_id": record_id, "item_id": item_id, "count": 0, "sign_date": sign_date}
+        )
+        row["count"] += count
+    conn.execute(
+        insert(SignReward).on_conflict_do_nothing(index_elements=["record_id", "item_id"]),
+        list(rewards.values()),
+    )
+    return len(rewards)
@@ -0,0 +1,184 @@
+"""签到运行记录模块
+
+记录每次批量签到的分阶段耗时（规划、凭证刷新、签到、HTTP、数据库写入）
+以及每个角色的明细耗时，运行结束后写入 skland_sign_run 表。
+"""
+
+import math
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Iterator
+
+from models import SignRun, SignRunItem
+
+PHASES = ("plan", "cred_refresh", "sign", "http", "db_write")
+
+_current_run: ContextVar["RunRecorder | None"] = ContextVar("current_run", default=None)
+_current_item: ContextVar["ItemTiming | None"] = ContextVar("current_item", default=None)
+
+
+class ItemTiming:
+    """单个角色的签到耗时"""
+
+    def __init__(self, user_id: int, character_id: int | None, game_type: str):
+        self.user_id = user_id
+        self.character_id = character_id
+        self.game_type = game_type
+        self.status: str = ""
+        self.duration: float = 0.0
+        self.http: float = 0.0
+        self.http_calls: int = 0
+        self.cred_refresh: float = 0.0
+        self.db_write: float = 0.0
+
+    def to_model(self, run_id: int) -> SignRunItem:
+        """转换为数据库模型"""
+        return SignRunItem(
+            run_id=run_id,
+            user_id=self.user_id,
+            character_id=self.character_id,
+            game_type=self.game_type,
+            status=self.status,
+            duration_ms=self.duration * 1000,
+            http_ms=self.http * 1000,
+            http_calls=self.http_calls,
+            cred_refresh_ms=self.cred_refresh * 1000,
+            db_write_ms=self.db_write * 1000,
+        )
+
+
+class RunRecorder:
+    """签到运行记录器
+
+    通过 contextvars 绑定到当前运行，签到流程和 HTTP 层无需显式传递即可上报耗时。
+    """
+
+    def __init__(self, game_type: str, trigger: str = "manual"):
+        self.run_id = uuid.uuid4().hex[:12]  # 日志关联用的运行标识
+        self.game_type = game_type
+        self.trigger = trigger
+        self.started_at = datetime.now()
+        self.finished_at: datetime | None = None
+        self.phases: dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.items: list[ItemTiming] = []
+        self._start = time.perf_counter()
+        self._duration = 0.0
+
+    @contextmanager
+    def activate(self) -> Iterator["RunRecorder"]:
+        """将记录器绑定为当前运行"""
+        token = _current_run.set(self)
+        try:
+            yield self
+        finally:
+            _current_run.reset(token)
+
+    @contextmanager
+    def item(self, user_id: int, character_id: int | None, game_type: str) -> Iterator[ItemTiming]:
+        """记录单个角色的签到耗时（计入 sign 阶段）"""
+        item = ItemTiming(user_id, character_id, game_type)
+        token = _current_item.set(item)
+        start = time.perf_counter()
+        try:
+            yield item
+        finally:
+            item.duration = time.perf_counter() - start
+            _current_item.reset(token)
+            self.phases["sign"] += item.duration
+            self.items.append(item)
+
+    def finish(self):
+        """结束运行"""
+        self._duration = time.perf_counter() - self._start
+        self.finished_at = datetime.now()
+
+    def count(self, status: str) -> int:
+        """统计指定状态的角色数"""
+        return sum(1 for item in self.items if item.status == status)
+
+    @property
+    def throughput(self) -> float:
+        """吞吐量（角色/秒）"""
+        return len(self.items) / self._duration if self._duration > 0 else 0.0
+
+    @property
+    def p95(self) -> float:
+        """单角色耗时 P95（秒，最近秩法）"""
+        if not self.items:
+            return 0.0
+        durations = sorted(item.duration for item in self.items)
+        return durations[max(math.ceil(len(durations) * 0.95) - 1, 0)]
+
+    def to_model(self) -> SignRun:
+        """转换为数据库模型"""
+        return SignRun(
+            game_type=self.game_type,
+            trigger=self.trigger,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            duration_ms=self._duration * 1000,
+            total=len(self.items),
+            success=self.count("success"),
+            failed=self.count("failed"),
+            duplicate=self.count("duplicate"),
+            plan_ms=self.phases["plan"] * 1000,
+            cred_refresh_ms=self.phases["cred_refresh"] * 1000,
+            sign_ms=self.phases["sign"] * 1000,
+            http_ms=self.phases["http"] * 1000,
+            db_write_ms=self.phases["db_write"] * 1000,
+            throughput=self.throughput,
+            p95_ms=self.p95 * 1000,
+        )
+
+
+def current_run() -> RunRecorder | None:
+    """获取当前运行的记录器"""
+    return _current_run.get()
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """记录一个阶段的耗时，没有进行中的运行时不做任何事"""
+    run = _current_run.get()
+    if run is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        run.phases[phase] += elapsed
+        item = _current_item.get()
+        if item is not None and phase == "cred_refresh":
+            item.cred_refresh += elapsed
+        elif item is not None and phase == "db_write":
+            item.db_write += elapsed
+
+
+def record_http(elapsed: float):
+    """上报一次 HTTP 请求耗时"""
+    run = _current_run.get()
+    if run is None:
+        return
+    run.phases["http"] += elapsed
+    item = _current_item.get()
+    if item is not None:
+        item.http += elapsed
+        item.http_calls += 1
+
+
+@contextmanager
+def track_item(user_id: int, character_id: int | None, game_type: str) -> Iterator[ItemTiming | None]:
+    """记录单个角色的签到耗时，没有进行中的运行时返回 None"""
+    run = _current_run.get()
+    if run is None:
+        yield None
+        return
+
+    with run.item(user_id, character_id, game_type) as item:
+        yield item
@@ -4,16 +4,28 @@
 """
 
 import json
-from datetime import datetime
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime
 from typing import Literal
 
-from sqlalchemy import select
+from sqlalchemy import select, insert, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from models import User, Character, SignRecord
+from config import config
+from database import db
+from models import User, Character
 from schemas import CRED, ArkSignResponse, EndfieldSignResponse
-from core import SklandAPI
-from exception import LoginException, RequestException, UnauthorizedException
+from core import SklandAPI, SklandLoginAPI
+from core.metrics import SIGN_OUTCOMES, CRED_REFRESHES
+from core.cache import invalidate_cred
+from core.rewards import ark_rewards, endfield_rewards
+from core.record_writer import record_writer, sign_record_row, claim_characters
+from core.run_recorder import RunRecorder, current_run, timed, track_item
+from core.throttle import run_limited
+from core.tracing import tracer, traced
+from exception import ErrorClass, LoginException, RequestException, UnauthorizedException
 from utils.logger import logger
 
 
@@ -26,6 +38,8 @@ class SignResult:
         self.failed: int = 0
         self.duplicate: int = 0
         self.details: dict[str, str] = {}
+        self.records: list[dict] = []  # 待写入的签到记录（见 sign_record_row）
+        self.error_class: ErrorClass | None = None  # 最近一次失败的分类
 
     def add_success(self, nickname: str, message: str):
         """添加成功记录"""
@@ -33,11 +47,12 @@ class SignResult:
         self.total += 1
         self.details[nickname] = message
 
-    def add_failed(self, nickname: str, error: str):
+    def add_failed(self, nickname: str, error: str, error_class: ErrorClass = ErrorClass.UNKNOWN):
         """添加失败记录"""
         self.failed += 1
         self.total += 1
         self.details[nickname] = f"❌ 签到失败: {error}"
+        self.error_class = error_class
 
     def add_duplicate(self, nickname: str, message: str = "已签到 (无需重复签到)"):
         """添加重复签到记录"""
@@ -50,6 +65,17 @@ class SignResult:
         self.total += 1
         self.details[nickname] = f"ℹ️ {message}"
 
+    @property
+    def status(self) -> str:
+        """获取主要状态（单个角色签到时即为该角色的签到状态）"""
+        if self.failed:
+            return "failed"
+        if self.duplicate:
+            return "duplicate"
+        if self.success:
+            return "success"
+        return ""
+
     @property
     def summary(self) -> str:
         """获取摘要"""
@@ -64,27 +90,51 @@ class SignResult:
         )
 
 
-async def bind_characters(user: User, session: AsyncSession) -> list[Character]:
-    """获取并更新用户绑定的角色"""
+@dataclass
+class CharacterSyncResult:
+    """角色同步结果"""
+
+    characters: list[Character] = field(default_factory=list)
+    """同步后有效的角色"""
+
+    added: int = 0
+    """新增的角色数"""
+
+    updated: int = 0
+    """昵称、默认角色等发生变化（或重新绑定）的角色数"""
+
+    removed: int = 0
+    """已解绑（软删除）的角色数"""
+
+    duration: float = 0.0
+    """获取绑定角色的耗时（秒，批量同步时记录）"""
+
+    error: str = ""
+    """同步失败的原因"""
+
+
+async def bind_characters(user: User, session: AsyncSession) -> CharacterSyncResult:
+    """获取并更新用户绑定的角色
+
+    先完成网络请求，再在 session 中写入，避免在网络请求期间持有写锁。
+    """
+    characters = await fetch_characters(user)
+    return await save_characters(user, characters, session)
+
+
+async def fetch_characters(user: User) -> list[Character]:
+    """从森空岛获取用户绑定的角色（不写入数据库）"""
     cred = CRED(cred=user.cred, token=user.cred_token)
     binding_list = await SklandAPI.get_binding(cred)
 
-    logger.info(f"用户 {user.name} 获取到 {len(binding_list)} 个游戏绑定")
-
-    # 删除旧的角色
-    stmt = select(Character).where(Character.user_id == user.id)
-    result = await session.execute(stmt)
-    old_characters = result.scalars().all()
-    for old_char in old_characters:
-        await session.delete(old_char)
+    logger.info("用户 {} 获取到 {} 个游戏绑定", user.name, len(binding_list))
 
-    # 添加新角色
     characters = []
     for app in binding_list:
         app_code = app.get("appCode", "")
         app_name = _get_app_name(app_code)
 
-        logger.info(f"处理游戏 {app_name} (app_code={app_code})")
+        logger.info("处理游戏 {} (app_code={})", app_name, app_code)
 
         for character in app.get("bindingList", []):
             is_default = character.get("isDefault", False)
@@ -100,9 +150,8 @@ async def bind_characters(user: User, session: AsyncSession) -> list[Character]:
                     nickname=character.get("nickName", ""),
                     is_default=is_default,
                 )
-                session.add(char)
                 characters.append(char)
-                logger.info(f"  添加角色: {char.nickname} ({char.app_name})")
+                logger.info("  绑定角色: {} ({})", char.nickname, char.app_name)
 
             # 处理有 roles 的角色（终末地）
             for role in character.get("roles", []):
@@ -115,15 +164,186 @@ async def bind_characters(user: User, session: AsyncSession) -> list[Character]:
                     nickname=role.get("nickname", ""),
                     is_default=role.get("isDefault", is_default),
                 )
-                session.add(char)
                 characters.append(char)
-                logger.info(f"  添加角色: {char.nickname} ({char.app_name})")
+                logger.info("  绑定角色: {} ({})", char.nickname, char.app_name)
 
-    await session.commit()
-    logger.info(f"用户 {user.name} 角色同步完成，共 {len(characters)} 个角色")
     return characters
 
 
+def _character_key(character: Character) -> tuple[str, str, str]:
+    """角色的匹配键"""
+    return character.app_code, character.uid, character.channel_master_id
+
+
+def diff_characters(
+    user_id: int, existing: list[Character], characters: list[Character]
+) -> tuple[list[dict], list[dict], list[int]]:
+    """比对数据库中的角色和新获取的角色
+
+    Returns:
+        tuple: (待插入的行, 待更新的行, 待软删除的角色 ID)
+    """
+    existing_by_key = {_character_key(char): char for char in existing}
+    fetched = {_character_key(char): char for char in characters}
+
+    inserts, updates = [], []
+    for key, char in fetched.items():
+        values = {
+            "nickname": char.nickname,
+            "app_name": char.app_name,
+            "is_default": char.is_default,
+            "deleted_at": None,
+        }
+        old = existing_by_key.get(key)
+        if old is None:
+            inserts.append({
+                "user_id": user_id,
+                "uid": char.uid,
+                "app_code": char.app_code,
+                "channel_master_id": char.channel_master_id,
+                **values,
+            })
+        elif any(getattr(old, name) != value for name, value in values.items()):
+            updates.append({"id": old.id, **values})
+    removed_ids = [char.id for key, char in existing_by_key.items() if key not in fetched and char.deleted_at is None]
+    return inserts, updates, removed_ids
+
+
+async def apply_character_changes(
+    session: AsyncSession, inserts: list[dict], updates: list[dict], removed_ids: list[int]
+):
+    """批量写入角色变更"""
+    if inserts:
+        await session.execute(insert(Character), inserts)
+    if updates:
+        await session.execute(update(Character), updates)
+    if removed_ids:
+        await session.execute(
+            update(Character).where(Character.id.in_(removed_ids)).values(deleted_at=datetime.now())
+        )
+    await _commit(session)
+
+
+async def save_characters(user: User, characters: list[Character], session: AsyncSession) -> CharacterSyncResult:
+    """将新获取的角色与数据库中的角色比对后增量写入
+
+    按 (app_code, uid, channel_master_id) 匹配，角色 ID 保持不变：
+    新角色批量插入，昵称或默认角色变化的批量更新（已解绑后重新绑定的同时恢复），
+    不再出现的角色批量软删除。
+    """
+    sync = CharacterSyncResult()
+
+    stmt = select(Character).where(Character.user_id == user.id)
+    result = await session.execute(stmt)
+    inserts, updates, removed_ids = diff_characters(user.id, result.scalars().all(), characters)
+    await apply_character_changes(session, inserts, updates, removed_ids)
+
+    stmt = (
+        select(Character)
+        .where(Character.user_id == user.id, Character.deleted_at.is_(None))
+        .execution_options(populate_existing=True)
+    )
+    result = await session.execute(stmt)
+    sync.characters = list(result.scalars().all())
+    sync.added, sync.updated, sync.removed = len(inserts), len(updates), len(removed_ids)
+
+    logger.info(
+        "用户 {} 角色同步完成: 新增 {}，更新 {}，解绑 {}，共 {} 个角色",
+        user.name, sync.added, sync.updated, sync.removed, len(sync.characters),
+    )
+    return sync
+
+
+async def _fetch_characters_with_refresh(user: User) -> list[Character]:
+    """获取用户绑定的角色，凭证失效时刷新一次后重试（刷新的凭证只更新 user 对象）"""
+    try:
+        return await fetch_characters(user)
+    except UnauthorizedException:
+        logger.warning("用户 {} 同步角色 cred_token 失效，尝试自动刷新...", user.name)
+        await refresh_cred_token(user)
+    except LoginException:
+        if not user.token:
+            raise
+        logger.warning("用户 {} 同步角色 cred 失效，尝试自动刷新...", user.name)
+        await refresh_cred(user)
+    return await fetch_characters(user)
+
+
+@traced("sync_all_characters", lambda args: {"trigger": args["trigger"]})
+async def sync_all_characters(trigger: str = "manual") -> dict[str, CharacterSyncResult]:
+    """同步所有启用用户绑定的角色
+
+    按配置的并发数和速率并发请求森空岛，全部请求完成后在一个事务中批量写入变更，
+    请求期间不占用数据库会话。
+
+    Args:
+        trigger: 触发方式（schedule/api），仅用于日志
+
+    Returns:
+        dict: 用户名 -> 同步结果（含耗时和错误信息）
+    """
+    start = time.perf_counter()
+    async with db.get_session() as session:
+        result = await session.execute(select(User).where(User.enabled == True))
+        users = result.scalars().all()
+        result = await session.execute(
+            select(Character).where(Character.user_id.in_([user.id for user in users]))
+        )
+        existing: dict[int, list[Character]] = {user.id: [] for user in users}
+        for character in result.scalars().all():
+            existing[character.user_id].append(character)
+
+    logger.info("开始同步 {} 个账号的角色（触发方式: {}）", len(users), trigger)
+
+    async def _fetch(user: User) -> tuple[User, CharacterSyncResult, list[Character] | None, bool]:
+        sync = CharacterSyncResult()
+        credentials = user_credentials(user)
+        fetch_start = time.perf_counter()
+        fetched = None
+        with logger.contextualize(user_id=user.id):
+            try:
+                fetched = await _fetch_characters_with_refresh(user)
+            except Exception as e:
+                sync.error = str(e)
+                logger.error("用户 {} 同步角色失败: {}", user.name, e)
+        sync.duration = time.perf_counter() - fetch_start
+        return user, sync, fetched, user_credentials(user) != credentials
+
+    fetched_results = await run_limited(
+        users, _fetch, config.scheduler.sync_concurrency, config.scheduler.sync_rate_limit
+    )
+
+    # 批量写入所有账号的角色变更和刷新后的凭证
+    inserts, updates, removed_ids, credential_updates = [], [], [], []
+    results = {}
+    for user, sync, fetched, credentials_changed in fetched_results:
+        results[user.name] = sync
+        if credentials_changed:
+            credential_updates.append({
+                "id": user.id, "cred": user.cred, "cred_token": user.cred_token,
+                "user_id": user.user_id, "cred_refreshed_at": user.cred_refreshed_at,
+            })
+        if fetched is None:
+            continue
+        user_inserts, user_updates, user_removed = diff_characters(user.id, existing[user.id], fetched)
+        sync.added, sync.updated, sync.removed = len(user_inserts), len(user_updates), len(user_removed)
+        inserts.extend(user_inserts)
+        updates.extend(user_updates)
+        removed_ids.extend(user_removed)
+
+    async with db.get_session() as session:
+        if credential_updates:
+            await session.execute(update(User), credential_updates)
+        await apply_character_changes(session, inserts, updates, removed_ids)
+
+    failed = sum(1 for sync in results.values() if sync.error)
+    logger.info(
+        "角色同步完成: {} 个账号（失败 {}），新增 {}，更新 {}，解绑 {}，耗时 {:.1f}s",
+        len(results), failed, len(inserts), len(updates), len(removed_ids), time.perf_counter() - start,
+    )
+    return results
+
+
 def _get_app_name(app_code: str) -> str:
     """获取 APP 名称"""
     app_names = {
@@ -137,8 +357,52 @@ def _get_app_name(app_code: str) -> str:
     return app_names.get(app_code, "未知游戏")
 
 
-async def do_arknights_sign(user: User, character: Character, session: AsyncSession) -> SignResult:
-    """执行明日方舟签到（带自动重试）"""
+async def _commit(session: AsyncSession):
+    """提交会话（计入 db_write 阶段）"""
+    with timed("db_write"), tracer.span("session.commit"):
+        await session.commit()
+
+
+@traced("SklandLoginAPI.refresh_cred", lambda args: {"user_id": args["user"].id})
+async def refresh_cred(user: User):
+    """使用 token 重新获取 cred 和 cred_token"""
+    with timed("cred_refresh"):
+        try:
+            grant_code = await SklandLoginAPI.get_grant_code(user.token, 0)
+            new_cred = await SklandLoginAPI.get_cred(grant_code)
+        except Exception:
+            CRED_REFRESHES.labels(kind="cred", result="failed").inc()
+            raise
+    CRED_REFRESHES.labels(kind="cred", result="success").inc()
+
+    invalidate_cred(user.cred)
+    user.cred = new_cred.cred
+    user.cred_token = new_cred.token
+    user.cred_refreshed_at = datetime.now()
+    if new_cred.userId:
+        user.user_id = new_cred.userId
+
+
+@traced("SklandLoginAPI.refresh_cred_token", lambda args: {"user_id": args["user"].id})
+async def refresh_cred_token(user: User):
+    """使用 cred 刷新 cred_token"""
+    with timed("cred_refresh"):
+        try:
+            new_token = await SklandLoginAPI.refresh_token(user.cred)
+        except Exception:
+            CRED_REFRESHES.labels(kind="cred_token", result="failed").inc()
+            raise
+    CRED_REFRESHES.labels(kind="cred_token", result="success").inc()
+
+    user.cred_token = new_token
+    user.cred_refreshed_at = datetime.now()
+
+
+async def do_arknights_sign(user: User, character: Character) -> SignResult:
+    """执行明日方舟签到（带自动重试）
+
+    签到记录放入 result.records，刷新的凭证只更新 user 对象，均由调用方写入数据库。
+    """
     result = SignResult()
     retried = False  # 是否已重试过
 
@@ -152,109 +416,95 @@ async def do_arknights_sign(user: User, character: Character, session: AsyncSess
                 f"  {award.resource.name} x {award.count}"
                 for award in sign_response.awards
             )
-            record = SignRecord(
+            record = sign_record_row(
                 user_id=user.id,
                 character_id=character.id,
                 game_type="arknights",
                 status="success",
-                rewards=json.dumps([{"name": a.resource.name, "count": a.count} for a in sign_response.awards]),
+                rewards=json.dumps(ark_rewards(sign_response), ensure_ascii=False),
             )
-            session.add(record)
+            result.records.append(record)
 
             result.add_success(
                 character.nickname,
                 f"✅ 签到成功，获得了:\n📦{awards_text}"
             )
-            logger.info(f"用户 {user.name} 角色 {character.nickname} 明日方舟签到成功")
+            logger.info("用户 {} 角色 {} 明日方舟签到成功", user.name, character.nickname)
             break
 
         except LoginException as e:
             # cred 失效，尝试刷新
             if user.token and not retried:
-                logger.warning(f"用户 {user.name} 角色 {character.nickname} 明日方舟签到 cred 失效，尝试自动刷新...")
+                logger.warning("用户 {} 角色 {} 明日方舟签到 cred 失效，尝试自动刷新...", user.name, character.nickname)
                 try:
-                    from core import SklandLoginAPI
-                    grant_code = await SklandLoginAPI.get_grant_code(user.token, 0)
-                    new_cred = await SklandLoginAPI.get_cred(grant_code)
-                    user.cred = new_cred.cred
-                    user.cred_token = new_cred.token
-                    if new_cred.userId:
-                        user.user_id = new_cred.userId
-                    logger.info(f"用户 {user.name} cred 刷新成功，重试签到...")
+                    await refresh_cred(user)
+                    logger.info("用户 {} cred 刷新成功，重试签到...", user.name)
                     retried = True
-                    await session.commit()  # 保存新的 cred
                     continue
                 except Exception as refresh_error:
-                    logger.error(f"用户 {user.name} 刷新 cred 失败: {refresh_error}")
-                    result.add_failed(character.nickname, f"cred 失效且刷新失败: {e}")
+                    logger.error("用户 {} 刷新 cred 失败: {}", user.name, refresh_error)
+                    result.add_failed(character.nickname, f"cred 失效且刷新失败: {e}", e.error_class)
                     break
             else:
-                result.add_failed(character.nickname, f"cred 失效（未配置 token 无法自动刷新）: {e}")
-                logger.error(f"用户 {user.name} 角色 {character.nickname} 明日方舟签到失败 (LoginException): {e}")
+                result.add_failed(character.nickname, f"cred 失效（未配置 token 无法自动刷新）: {e}", e.error_class)
+                logger.error("用户 {} 角色 {} 明日方舟签到失败 (LoginException): {}", user.name, character.nickname, e)
                 break
 
         except UnauthorizedException as e:
             # cred_token 失效，尝试刷新
             if not retried:
-                logger.warning(f"用户 {user.name} 角色 {character.nickname} 明日方舟签到 cred_token 失效，尝试自动刷新...")
+                logger.warning("用户 {} 角色 {} 明日方舟签到 cred_token 失效，尝试自动刷新...", user.name, character.nickname)
                 try:
-                    from core import SklandLoginAPI
-                    new_token = await SklandLoginAPI.refresh_token(user.cred)
-                    user.cred_token = new_token
-                    logger.info(f"用户 {user.name} cred_token 刷新成功，重试签到...")
+                    await refresh_cred_token(user)
+                    logger.info("用户 {} cred_token 刷新成功，重试签到...", user.name)
                     retried = True
-                    await session.commit()  # 保存新的 cred_token
                     continue
                 except Exception as refresh_error:
-                    logger.error(f"用户 {user.name} 刷新 cred_token 失败: {refresh_error}")
-                    result.add_failed(character.nickname, f"cred_token 失效且刷新失败: {e}")
+                    logger.error("用户 {} 刷新 cred_token 失败: {}", user.name, refresh_error)
+                    result.add_failed(character.nickname, f"cred_token 失效且刷新失败: {e}", e.error_class)
                     break
             else:
-                result.add_failed(character.nickname, f"cred_token 失效: {e}")
-                logger.error(f"用户 {user.name} 角色 {character.nickname} 明日方舟签到失败 (UnauthorizedException): {e}")
+                result.add_failed(character.nickname, f"cred_token 失效: {e}", e.error_class)
+                logger.error("用户 {} 角色 {} 明日方舟签到失败 (UnauthorizedException): {}", user.name, character.nickname, e)
                 break
 
         except RequestException as e:
             error_msg = str(e)
-            if "请勿重复签到" in error_msg:
+            if e.error_class is ErrorClass.DUPLICATE:
                 result.add_duplicate(character.nickname)
-                record = SignRecord(
+                record = sign_record_row(
                     user_id=user.id,
                     character_id=character.id,
                     game_type="arknights",
                     status="duplicate",
                 )
-                session.add(record)
-                logger.info(f"用户 {user.name} 角色 {character.nickname} 明日方舟已签到")
-            # 对可能由认证问题导致的未知错误，尝试刷新 cred
-            elif user.token and not retried and any(keyword in error_msg.lower() for keyword in ["认证", "授权", "登录", "token", "cred", "凭证", "未登录"]):
-                logger.warning(f"用户 {user.name} 角色 {character.nickname} 明日方舟签到可能因认证问题失败，尝试自动刷新...")
+                result.records.append(record)
+                logger.info("用户 {} 角色 {} 明日方舟已签到", user.name, character.nickname)
+            # 分类为 cred 失效的其他错误（如 HTTP 401/403），尝试刷新 cred
+            elif user.token and not retried and e.error_class is ErrorClass.CRED_INVALID:
+                logger.warning("用户 {} 角色 {} 明日方舟签到可能因认证问题失败，尝试自动刷新...", user.name, character.nickname)
                 try:
-                    from core import SklandLoginAPI
-                    grant_code = await SklandLoginAPI.get_grant_code(user.token, 0)
-                    new_cred = await SklandLoginAPI.get_cred(grant_code)
-                    user.cred = new_cred.cred
-                    user.cred_token = new_cred.token
-                    if new_cred.userId:
-                        user.user_id = new_cred.userId
-                    logger.info(f"用户 {user.name} cred 刷新成功，重试签到...")
+                    await refresh_cred(user)
+                    logger.info("用户 {} cred 刷新成功，重试签到...", user.name)
                     retried = True
-                    await session.commit()  # 保存新的 cred
                     continue
                 except Exception as refresh_error:
-                    logger.error(f"用户 {user.name} 刷新 cred 失败: {refresh_error}")
-                    result.add_failed(character.nickname, error_msg)
+                    logger.error("用户 {} 刷新 cred 失败: {}", user.name, refresh_error)
+                    result.add_failed(character.nickname, error_msg, e.error_class)
                     break
             else:
-                result.add_failed(character.nickname, error_msg)
-                logger.error(f"用户 {user.name} 角色 {character.nickname} 明日方舟签到失败: {e}")
+                result.add_failed(character.nickname, error_msg, e.error_class)
+                logger.error("用户 {} 角色 {} 明日方舟签到失败: {}", user.name, character.nickname, e)
             break
 
     return result
 
 
-async def do_endfield_sign(user: User, character: Character, session: AsyncSession) -> SignResult:
-    """执行终末地签到（带自动重试）"""
+async def do_endfield_sign(user: User, character: Character) -> SignResult:
+    """执行终末地签到（带自动重试）
+
+    签到记录放入 result.records，刷新的凭证只更新 user 对象，均由调用方写入数据库。
+    """
     result = SignResult()
     retried = False  # 是否已重试过
 
@@ -265,144 +515,142 @@ async def do_endfield_sign(user: User, character: Character, session: AsyncSessi
 
             # 保存签到记录
             awards_text = sign_response.award_summary
-            record = SignRecord(
+            record = sign_record_row(
                 user_id=user.id,
                 character_id=character.id,
                 game_type="endfield",
                 status="success",
-                rewards=json.dumps([{"id": a.id, "type": a.type} for a in sign_response.awardIds]),
+                rewards=json.dumps(endfield_rewards(sign_response), ensure_ascii=False),
             )
-            session.add(record)
+            result.records.append(record)
 
             result.add_success(
                 character.nickname,
                 f"✅ 签到成功，获得了:\n📦{awards_text}"
             )
-            logger.info(f"用户 {user.name} 角色 {character.nickname} 终末地签到成功")
+            logger.info("用户 {} 角色 {} 终末地签到成功", user.name, character.nickname)
             break
 
         except LoginException as e:
             # cred 失效，尝试刷新
             if user.token and not retried:
-                logger.warning(f"用户 {user.name} 角色 {character.nickname} 终末地签到 cred 失效，尝试自动刷新...")
+                logger.warning("用户 {} 角色 {} 终末地签到 cred 失效，尝试自动刷新...", user.name, character.nickname)
                 try:
-                    from core import SklandLoginAPI
-                    grant_code = await SklandLoginAPI.get_grant_code(user.token, 0)
-                    new_cred = await SklandLoginAPI.get_cred(grant_code)
-                    user.cred = new_cred.cred
-                    user.cred_token = new_cred.token
-                    if new_cred.userId:
-                        user.user_id = new_cred.userId
-                    logger.info(f"用户 {user.name} cred 刷新成功，重试签到...")
+                    await refresh_cred(user)
+                    logger.info("用户 {} cred 刷新成功，重试签到...", user.name)
                     retried = True
-                    await session.commit()  # 保存新的 cred
                     continue
                 except Exception as refresh_error:
-                    logger.error(f"用户 {user.name} 刷新 cred 失败: {refresh_error}")
-                    result.add_failed(character.nickname, f"cred 失效且刷新失败: {e}")
+                    logger.error("用户 {} 刷新 cred 失败: {}", user.name, refresh_error)
+                    result.add_failed(character.nickname, f"cred 失效且刷新失败: {e}", e.error_class)
                     break
             else:
-                result.add_failed(character.nickname, f"cred 失效（未配置 token 无法自动刷新）: {e}")
-                logger.error(f"用户 {user.name} 角色 {character.nickname} 终末地签到失败 (LoginException): {e}")
+                result.add_failed(character.nickname, f"cred 失效（未配置 token 无法自动刷新）: {e}", e.error_class)
+                logger.error("用户 {} 角色 {} 终末地签到失败 (LoginException): {}", user.name, character.nickname, e)
                 break
 
         except UnauthorizedException as e:
             # cred_token 失效，尝试刷新
             if not retried:
-                logger.warning(f"用户 {user.name} 角色 {character.nickname} 终末地签到 cred_token 失效，尝试自动刷新...")
+                logger.warning("用户 {} 角色 {} 终末地签到 cred_token 失效，尝试自动刷新...", user.name, character.nickname)
                 try:
-                    from core import SklandLoginAPI
-                    new_token = await SklandLoginAPI.refresh_token(user.cred)
-                    user.cred_token = new_token
-                    logger.info(f"用户 {user.name} cred_token 刷新成功，重试签到...")
+                    await refresh_cred_token(user)
+                    logger.info("用户 {} cred_token 刷新成功，重试签到...", user.name)
                     retried = True
-                    await session.commit()  # 保存新的 cred_token
                     continue
                 except Exception as refresh_error:
-                    logger.error(f"用户 {user.name} 刷新 cred_token 失败: {refresh_error}")
-                    result.add_failed(character.nickname, f"cred_token 失效且刷新失败: {e}")
+                    logger.error("用户 {} 刷新 cred_token 失败: {}", user.name, refresh_error)
+                    result.add_failed(character.nickname, f"cred_token 失效且刷新失败: {e}", e.error_class)
                     break
             else:
-                result.add_failed(character.nickname, f"cred_token 失效: {e}")
-                logger.error(f"用户 {user.name} 角色 {character.nickname} 终末地签到失败 (UnauthorizedException): {e}")
+                result.add_failed(character.nickname, f"cred_token 失效: {e}", e.error_class)
+                logger.error("用户 {} 角色 {} 终末地签到失败 (UnauthorizedException): {}", user.name, character.nickname, e)
                 break
 
         except RequestException as e:
             error_msg = str(e)
-            if "请勿重复签到" in error_msg:
+            if e.error_class is ErrorClass.DUPLICATE:
                 result.add_duplicate(character.nickname)
-                record = SignRecord(
+                record = sign_record_row(
                     user_id=user.id,
                     character_id=character.id,
                     game_type="endfield",
                     status="duplicate",
                 )
-                session.add(record)
-                logger.info(f"用户 {user.name} 角色 {character.nickname} 终末地已签到")
-            # 对可能由认证问题导致的未知错误，尝试刷新 cred
-            elif user.token and not retried and any(keyword in error_msg.lower() for keyword in ["认证", "授权", "登录", "token", "cred", "凭证", "未登录"]):
-                logger.warning(f"用户 {user.name} 角色 {character.nickname} 终末地签到可能因认证问题失败，尝试自动刷新...")
+                result.records.append(record)
+                logger.info("用户 {} 角色 {} 终末地已签到", user.name, character.nickname)
+            # 分类为 cred 失效的其他错误（如 HTTP 401/403），尝试刷新 cred
+            elif user.token and not retried and e.error_class is ErrorClass.CRED_INVALID:
+                logger.warning("用户 {} 角色 {} 终末地签到可能因认证问题失败，尝试自动刷新...", user.name, character.nickname)
                 try:
-                    from core import SklandLoginAPI
-                    grant_code = await SklandLoginAPI.get_grant_code(user.token, 0)
-                    new_cred = await SklandLoginAPI.get_cred(grant_code)
-                    user.cred = new_cred.cred
-                    user.cred_token = new_cred.token
-                    if new_cred.userId:
-                        user.user_id = new_cred.userId
-                    logger.info(f"用户 {user.name} cred 刷新成功，重试签到...")
+                    await refresh_cred(user)
+                    logger.info("用户 {} cred 刷新成功，重试签到...", user.name)
                     retried = True
-                    await session.commit()  # 保存新的 cred
                     continue
                 except Exception as refresh_error:
-                    logger.error(f"用户 {user.name} 刷新 cred 失败: {refresh_error}")
-                    result.add_failed(character.nickname, error_msg)
+                    logger.error("用户 {} 刷新 cred 失败: {}", user.name, refresh_error)
+                    result.add_failed(character.nickname, error_msg, e.error_class)
                     break
             else:
-                result.add_failed(character.nickname, error_msg)
-                logger.error(f"用户 {user.name} 角色 {character.nickname} 终末地签到失败: {e}")
+                result.add_failed(character.nickname, error_msg, e.error_class)
+                logger.error("用户 {} 角色 {} 终末地签到失败: {}", user.name, character.nickname, e)
             break
 
     return result
 
 
-async def sign_user(user: User, session: AsyncSession, game_type: Literal["arknights", "endfield", "all"] = "all", auto_sync: bool = True) -> SignResult:
+@traced("sign_user", lambda args: {"user_id": args["user"].id, "user_name": args["user"].name, "game_type": args["game_type"]})
+async def sign_user(
+    user: User,
+    game_type: Literal["arknights", "endfield", "all"] = "all",
+    auto_sync: bool = True,
+    characters: list[Character] | None = None,
+) -> SignResult:
     """为用户执行签到
 
+    签到请求不在数据库事务中进行；刷新后的凭证在短事务中写入，签到记录交给写缓冲批量写入。
+
     Args:
         user: 用户对象
-        session: 数据库会话
         game_type: 游戏类型，"arknights" 只签到明日方舟，"endfield" 只签到终末地，"all" 签到全部
         auto_sync: 是否自动同步角色（如果用户没有角色）
+        characters: 用户的角色列表，为空时从数据库读取
 
     Returns:
         SignResult: 签到结果
     """
     result = SignResult()
+    credentials = user_credentials(user)
 
     # 获取用户角色
-    stmt = select(Character).where(Character.user_id == user.id)
-    db_result = await session.execute(stmt)
-    characters = db_result.scalars().all()
-
-    # 如果没有角色且开启了自动同步，尝试同步
-    if not characters and auto_sync:
-        logger.info(f"用户 {user.name} 没有角色，尝试自动同步...")
-        try:
-            characters = await bind_characters(user, session)
-        except Exception as e:
-            logger.error(f"用户 {user.name} 自动同步角色失败: {e}")
-            result.add_info("系统", f"⚠️ 没有找到游戏角色，请先在 Web 界面同步角色")
-            return result
+    with timed("plan"):
+        if characters is None:
+            async with db.get_session() as session:
+                stmt = select(Character).where(Character.user_id == user.id, Character.deleted_at.is_(None))
+                db_result = await session.execute(stmt)
+                characters = db_result.scalars().all()
+
+        # 如果没有角色且开启了自动同步，尝试同步
+        if not characters and auto_sync:
+            logger.info("用户 {} 没有角色，尝试自动同步...", user.name)
+            try:
+                fetched = await fetch_characters(user)
+                async with db.get_session() as session:
+                    characters = (await save_characters(user, fetched, session)).characters
+            except Exception as e:
+                logger.error("用户 {} 自动同步角色失败: {}", user.name, e)
+                result.add_info("系统", f"⚠️ 没有找到游戏角色，请先在 Web 界面同步角色")
+                return result
 
     # 再次检查
     if not characters:
-        logger.warning(f"用户 {user.name} 没有可签到的角色")
+        logger.warning("用户 {} 没有可签到的角色", user.name)
         result.add_info("系统", f"⚠️ 没有找到可签到的游戏角色")
         return result
 
-    logger.info(f"用户 {user.name} 开始签到，共 {len(characters)} 个角色")
+    logger.info("用户 {} 开始签到，共 {} 个角色", user.name, len(characters))
 
+    targets = []
     for character in characters:
         # 检查是否需要签到该游戏
         if game_type == "arknights" and character.app_name != "明日方舟":
@@ -410,56 +658,190 @@ async def sign_user(user: User, session: AsyncSession, game_type: Literal["arkni
         if game_type == "endfield" and character.app_name != "终末地":
             continue
 
-        # 执行签到
         if character.app_name == "明日方舟":
-            char_result = await do_arknights_sign(user, character, session)
+            targets.append((character, do_arknights_sign, "arknights"))
         elif character.app_name == "终末地":
-            char_result = await do_endfield_sign(user, character, session)
+            targets.append((character, do_endfield_sign, "endfield"))
         else:
-            logger.warning(f"未知游戏类型: {character.app_name}")
-            continue
-
-        result.total += char_result.total
-        result.success += char_result.success
-        result.failed += char_result.failed
-        result.duplicate += char_result.duplicate
-        result.details.update(char_result.details)
+            logger.warning("未知游戏类型: {}", character.app_name)
+
+    # 认领今天要签到的角色，跳过已签到成功或正由其他签到任务处理的角色
+    with timed("plan"):
+        run = current_run()
+        owner = run.run_id if run is not None else uuid.uuid4().hex[:12]
+        # 签到结果写入认领时的日期，签到跨过零点时也不会写到第二天
+        sign_date = date.today()
+        claims = await claim_characters(
+            owner, user.id, [(character.id, game) for character, _, game in targets], sign_date
+        )
 
-    await session.commit()
+    # 任何情况下都保存已完成角色的签到记录和刷新后的凭证，并释放未完成的认领
+    unfinished = {key for key, claim in claims.items() if claim == "claimed"}
+    try:
+        for character, sign_func, game in targets:
+            claim = claims.get((character.id, game))
+            if claim != "claimed":
+                # 跳过的角色也计入运行记录，与返回的签到结果一致
+                with track_item(user.id, character.id, game) as item:
+                    if claim == "done":
+                        result.add_duplicate(character.nickname, "今日已签到 (跳过)")
+                    else:
+                        logger.info("用户 {} 角色 {} 正由其他签到任务处理，跳过", user.name, character.nickname)
+                        result.add_info(character.nickname, "正由其他签到任务处理，已跳过")
+                    if item is not None:
+                        item.status = "duplicate" if claim == "done" else "skipped"
+                continue
+
+            # 执行签到
+            with logger.contextualize(character_id=character.id), track_item(user.id, character.id, game) as item, tracer.span(
+                sign_func.__name__,
+                user_id=user.id,
+                user_name=user.name,
+                character_id=character.id,
+                character_uid=character.uid,
+                game=game,
+            ) as span:
+                try:
+                    char_result = await sign_func(user, character)
+                except Exception as e:
+                    # 解析响应等未预期的错误只影响当前角色
+                    logger.exception("用户 {} 角色 {} 签到出现未预期的错误: {}", user.name, character.nickname, e)
+                    char_result = SignResult()
+                    char_result.add_failed(character.nickname, f"未预期的错误: {e}", ErrorClass.UNKNOWN)
+                span.set_attribute("status", char_result.status)
+                if item is not None:
+                    item.status = char_result.status
+            SIGN_OUTCOMES.labels(game=game, status=char_result.status).inc()
+            if not char_result.records:
+                # 签到失败也写入记录，释放认领并累计尝试次数
+                char_result.records.append(sign_record_row(
+                    user.id, character.id, game, "failed",
+                    error_message=char_result.details.get(character.nickname, ""),
+                    error_class=(char_result.error_class or ErrorClass.UNKNOWN).value,
+                ))
+            for record in char_result.records:
+                record["sign_date"] = sign_date
+
+            result.total += char_result.total
+            result.success += char_result.success
+            result.failed += char_result.failed
+            result.duplicate += char_result.duplicate
+            result.details.update(char_result.details)
+            result.records.extend(char_result.records)
+            unfinished.discard((character.id, game))
+    finally:
+        # 中途退出（如被取消）时写入失败记录，不必等认领超时即可重新签到
+        for character_id, game in unfinished:
+            result.records.append(sign_record_row(
+                user.id, character_id, game, "failed",
+                error_message="签到中断", error_class=ErrorClass.UNKNOWN.value, sign_date=sign_date,
+            ))
+        await _save_user_result(user, result, credentials_changed=user_credentials(user) != credentials)
     return result
 
 
-async def sign_all_users(session: AsyncSession, game_type: Literal["arknights", "endfield", "all"] = "all", auto_sync: bool = True) -> dict[str, SignResult]:
+def user_credentials(user: User) -> tuple:
+    """用户当前的凭证（用于判断签到过程中是否刷新过）"""
+    return user.cred, user.cred_token, user.user_id
+
+
+async def _save_user_result(user: User, result: SignResult, credentials_changed: bool):
+    """保存用户的签到结果
+
+    刷新后的凭证在单独的短事务中写入，签到记录放入写缓冲批量写入。
+    """
+    if credentials_changed:
+        try:
+            async with db.get_session() as session:
+                await session.execute(
+                    update(User)
+                    .where(User.id == user.id)
+                    .values(
+                        cred=user.cred, cred_token=user.cred_token,
+                        user_id=user.user_id, cred_refreshed_at=user.cred_refreshed_at,
+                    )
+                )
+                await _commit(session)
+        except Exception as e:
+            logger.error("用户 {} 保存刷新后的凭证失败: {}", user.name, e)
+    await record_writer.put_many(result.records)
+
+
+@traced("sign_all_users", lambda args: {"game_type": args["game_type"], "trigger": args["trigger"]})
+async def sign_all_users(
+    game_type: Literal["arknights", "endfield", "all"] = "all",
+    auto_sync: bool = True,
+    trigger: str = "manual",
+) -> dict[str, SignResult]:
     """为所有启用的用户执行签到
 
+    只在开始时读取用户和角色，之后的签到请求都不占用数据库会话，
+    签到记录由写缓冲批量写入，运行结束前等待写入完成。
+
     Args:
-        session: 数据库会话
         game_type: 游戏类型
         auto_sync: 是否自动同步角色
+        trigger: 触发方式（schedule/api/manual/cli），记录到运行历史
 
     Returns:
         dict[str, SignResult]: 每个用户的签到结果
     """
-    # 获取所有启用的用户
-    stmt = select(User).where(User.enabled == True)
-    result = await session.execute(stmt)
-    users = result.scalars().all()
-
-    if not users:
-        logger.warning("数据库中没有启用的用户")
-        return {}
-
+    run = RunRecorder(game_type, trigger)
     results = {}
-    for user in users:
-        logger.info(f"开始为用户 {user.name} 执行 {game_type} 签到")
-        try:
-            user_result = await sign_user(user, session, game_type, auto_sync)
-            results[user.name] = user_result
-        except Exception as e:
-            logger.error(f"用户 {user.name} 签到过程出错: {e}")
-            error_result = SignResult()
-            error_result.failed = 1
-            error_result.add_info("系统", f"❌ 签到过程出错: {e}")
-            results[user.name] = error_result
 
+    with run.activate(), logger.contextualize(run_id=run.run_id):
+        # 获取所有启用的用户及其角色
+        with timed("plan"):
+            async with db.get_session() as session:
+                stmt = select(User).where(User.enabled == True)
+                result = await session.execute(stmt)
+                users = result.scalars().all()
+
+                char_stmt = select(Character).where(
+                    Character.user_id.in_([user.id for user in users]),
+                    Character.deleted_at.is_(None),
+                )
+                char_result = await session.execute(char_stmt)
+                characters: dict[int, list[Character]] = {user.id: [] for user in users}
+                for character in char_result.scalars().all():
+                    characters[character.user_id].append(character)
+
+        if not users:
+            logger.warning("数据库中没有启用的用户")
+
+        for user in users:
+            logger.info("开始为用户 {} 执行 {} 签到", user.name, game_type)
+            try:
+                with logger.contextualize(user_id=user.id):
+                    user_result = await sign_user(user, game_type, auto_sync, characters[user.id])
+                results[user.name] = user_result
+            except Exception as e:
+                logger.error("用户 {} 签到过程出错: {}", user.name, e)
+                error_result = SignResult()
+                error_result.failed = 1
+                error_result.add_info("系统", f"❌ 签到过程出错: {e}")
+                results[user.name] = error_result
+
+        # 等待本次运行的签到记录全部写入
+        with timed("db_write"):
+            await record_writer.flush()
+
+    run.finish()
+    await _save_run(run)
     return results
+
+
+async def _save_run(run: RunRecorder):
+    """保存运行记录（失败不影响签到结果）"""
+    try:
+        async with db.get_session() as session:
+            sign_run = run.to_model()
+            session.add(sign_run)
+            await session.flush()
+            session.add_all(item.to_model(sign_run.id) for item in run.items)
+        logger.info(
+            "签到运行 #{} ({}) 完成: {} 个角色，耗时 {:.0f}ms，P95 {:.0f}ms，吞吐 {:.2f} 个/秒",
+            sign_run.id, run.run_id, sign_run.total, sign_run.duration_ms, sign_run.p95_ms, sign_run.throughput,
+        )
+    except Exception as e:
+        logger.error("保存签到运行记录失败: {}", e)
@@ -0,0 +1,140 @@
+"""最近签到状态模块
+
+角色和账号上冗余保存最近一次签到的时间、状态和失败分类（last_sign_at / last_status / last_error_class），
+概览、今日未签到列表和账号列表只需查询角色表和账号表：
+- 写缓冲写入签到记录时同步更新角色，再由角色汇总账号（见 core.record_writer）
+- 同一天已签到成功（或重复签到）的角色不会被之后的失败覆盖
+- 账号取所有有效角色中最近一天的结果，其中有角色失败时为 failed
+"""
+
+from datetime import datetime, time
+
+from sqlalchemy import Connection, and_, bindparam, or_, select, text, update
+
+from models import Character, User
+
+# 视为已签到的状态
+SIGNED_STATUSES = ("success", "duplicate")
+
+
+def update_characters(conn: Connection, rows: list[dict]) -> set[int]:
+    """按签到记录更新角色的最近签到状态
+
+    Args:
+        conn: 数据库连接（异步会话中通过 run_sync 调用）
+        rows: 写缓冲格式的签到记录
+
+    Returns:
+        set: 涉及的账号 ID
+    """
+    latest: dict[int, dict] = {}
+    for row in rows:
+        current = latest.get(row["character_id"])
+        if current and (
+            current["sign_date"] > row["sign_date"]
+            or (current["sign_date"] == row["sign_date"] and current["status"] in SIGNED_STATUSES)
+        ):
+            continue
+        latest[row["character_id"]] = row
+    if not latest:
+        return set()
+
+    # 之前的日期已签到的记录可以覆盖；同一天只有未签到成功时才覆盖；更早日期的记录不覆盖
+    stmt = (
+        update(Character)
+        .where(
+            Character.id == bindparam("character_id"),
+            or_(
+                Character.last_sign_at.is_(None),
+                Character.last_sign_at < bindparam("day_start"),
+                # executemany 不支持 IN 展开参数，逐个比较
+                and_(
+                    Character.last_sign_at <= bindparam("sign_time"),
+                    *(Character.last_status != status for status in SIGNED_STATUSES),
+                ),
+            ),
+        )
+        .values(
+            last_sign_at=bindparam("sign_time"),
+            last_status=bindparam("status"),
+            last_error_class=bindparam("error_class"),
+        )
+    )
+    conn.execute(stmt, [
+        {
+            "character_id": row["character_id"],
+            "day_start": datetime.combine(row["sign_date"], time.min),
+            "sign_time": row["sign_time"],
+            "status": row["status"],
+            "error_class": row.get("error_class"),
+        }
+        for row in latest.values()
+    ])
+    return {row["user_id"] for row in latest.values()}
+
+
+def update_users(conn: Connection, user_ids: set[int] | None = None):
+    """由角色汇总账号的最近签到状态
+
+    Args:
+        conn: 数据库连接
+        user_ids: 要更新的账号 ID，为空时更新全部账号
+    """
+    stmt = select(
+        Character.user_id, Character.last_sign_at, Character.last_status, Character.last_error_class
+    ).where(
+        Character.deleted_at.is_(None), Character.last_sign_at.is_not(None)
+    )
+    if user_ids is not None:
+        if not user_ids:
+            return
+        stmt = stmt.where(Character.user_id.in_(user_ids))
+
+    characters: dict[int, list] = {}
+    for row in conn.execute(stmt):
+        characters.setdefault(row.user_id, []).append(row)
+
+    values = []
+    for user_id, rows in characters.items():
+        latest = max(rows, key=lambda row: row.last_sign_at)
+        same_day = [row for row in rows if row.last_sign_at.date() == latest.last_sign_at.date()]
+        failed = [row for row in same_day if row.last_status not in SIGNED_STATUSES]
+        result = max(failed, key=lambda row: row.last_sign_at) if failed else latest
+        values.append({
+            "target_id": user_id,
+            "sign_time": latest.last_sign_at,
+            "status": result.last_status,
+            "error_class": result.last_error_class,
+        })
+    if not values:
+        return
+
+    conn.execute(
+        update(User)
+        .where(User.id == bindparam("target_id"))
+        .values(
+            last_sign_at=bindparam("sign_time"),
+            last_status=bindparam("status"),
+            last_error_class=bindparam("error_class"),
+        ),
+        values,
+    )
+
+
+def rebuild_sign_state(conn: Connection):
+    """从签到记录重建全部角色和账号的最近签到状态（不含签到中的认领记录）
+
+    每个角色取最近一天的记录（同一天只有一条），升级时补充新增的列使用。
+    """
+    latest = (
+        "SELECT {column} FROM skland_sign_record r "
+        "WHERE r.character_id = skland_characters.id AND r.status != 'pending' "
+        "ORDER BY r.sign_date DESC, r.sign_time DESC LIMIT 1"
+    )
+    conn.execute(text(
+        "UPDATE skland_characters SET "
+        f"last_sign_at = ({latest.format(column='sign_time')}), "
+        f"last_status = ({latest.format(column='status')}), "
+        f"last_error_class = ({latest.format(column='error_class')})"
+    ))
+    update_users(conn)
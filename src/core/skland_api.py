@@ -13,7 +13,10 @@ from urllib.parse import urlparse
 import httpx
 
 from schemas import CRED, ArkSignResponse, EndfieldSignResponse
-from exception import LoginException, RequestException, UnauthorizedException
+from core import http
+from core.cache import binding_cache, user_id_cache
+from core.tracing import traced
+from exception import ErrorClass, LoginException, RequestException, UnauthorizedException
 from utils.logger import logger
 
 base_url = "https://zonai.skland.com/api/v1"
@@ -55,49 +58,83 @@ class SklandAPI:
         signature = hashlib.md5(hex_secret.encode("utf-8")).hexdigest()
         return {"cred": cred.cred, **cls._headers, "sign": signature, **header_ca}
 
+    @staticmethod
+    def _check_response(response: httpx.Response, action: str) -> dict:
+        """解析响应，上游返回错误码时抛出带错误码、HTTP 状态码和接口路径的异常
+
+        Args:
+            response: 响应
+            action: 操作描述，用作错误信息前缀
+        """
+        endpoint = urlparse(str(response.url)).path
+        try:
+            data = response.json()
+        except ValueError:
+            raise RequestException(
+                f"{action} (HTTP {response.status_code})：响应不是有效的 JSON",
+                status=response.status_code,
+                endpoint=endpoint,
+            )
+        if code := data.get("code"):
+            message = data.get("message")
+            kwargs = {"code": code, "status": response.status_code, "endpoint": endpoint}
+            if code == 10000:
+                raise UnauthorizedException(f"{action}：{message}", **kwargs)
+            elif code == 10002:
+                raise LoginException(f"{action}：{message}", **kwargs)
+            else:
+                raise RequestException(f"{action} (code={code})：{message}", **kwargs)
+        return data
+
     @classmethod
-    async def get_user_ID(cls, cred: CRED) -> str:
-        """获取用户 userId"""
+    @traced("SklandAPI.get_user_ID")
+    async def get_user_ID(cls, cred: CRED, use_cache: bool = True) -> str:
+        """获取用户 userId（按 cred 缓存）
+
+        Args:
+            cred: 登录凭证
+            use_cache: 为 False 时不读取缓存，直接请求（用于检查凭证是否有效）
+        """
+        if not use_cache:
+            return await cls._get_user_ID(cred)
+        return await user_id_cache.get_or_load(cred.cred, lambda: cls._get_user_ID(cred))
+
+    @classmethod
+    async def _get_user_ID(cls, cred: CRED) -> str:
         uid_url = f"{base_url}/user/teenager"
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    uid_url,
-                    headers=cls.get_sign_header(cred, uid_url, method="get"),
-                )
-                if status := response.json().get("code"):
-                    if status == 10000:
-                        raise UnauthorizedException(f"获取账号 userId 失败：{response.json().get('message')}")
-                    elif status == 10002:
-                        raise LoginException(f"获取账号 userId 失败：{response.json().get('message')}")
-                    else:
-                        raise RequestException(f"获取账号 userId 失败 (code={status})：{response.json().get('message')}")
-                return response.json()["data"]["teenager"]["userId"]
-            except httpx.HTTPError as e:
-                raise RequestException(f"获取账号 userId 失败: {e}")
+        try:
+            response = await http.request(
+                "GET",
+                uid_url,
+                headers=cls.get_sign_header(cred, uid_url, method="get"),
+            )
+            data = cls._check_response(response, "获取账号 userId 失败")
+            return data["data"]["teenager"]["userId"]
+        except httpx.HTTPError as e:
+            raise RequestException(f"获取账号 userId 失败: {e}", endpoint=urlparse(uid_url).path, error_class=ErrorClass.NETWORK)
 
     @classmethod
+    @traced("SklandAPI.get_binding")
     async def get_binding(cls, cred: CRED) -> list[dict]:
-        """获取绑定的游戏角色"""
+        """获取绑定的游戏角色（按 cred 缓存，返回的列表不要修改）"""
+        return await binding_cache.get_or_load(cred.cred, lambda: cls._get_binding(cred))
+
+    @classmethod
+    async def _get_binding(cls, cred: CRED) -> list[dict]:
         binding_url = f"{base_url}/game/player/binding"
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    binding_url,
-                    headers=cls.get_sign_header(cred, binding_url, method="get"),
-                )
-                if status := response.json().get("code"):
-                    if status == 10000:
-                        raise UnauthorizedException(f"获取绑定角色失败：{response.json().get('message')}")
-                    elif status == 10002:
-                        raise LoginException(f"获取绑定角色失败：{response.json().get('message')}")
-                    else:
-                        raise RequestException(f"获取绑定角色失败 (code={status})：{response.json().get('message')}")
-                return response.json()["data"]["list"]
-            except httpx.HTTPError as e:
-                raise RequestException(f"获取绑定角色失败: {e}")
+        try:
+            response = await http.request(
+                "GET",
+                binding_url,
+                headers=cls.get_sign_header(cred, binding_url, method="get"),
+            )
+            data = cls._check_response(response, "获取绑定角色失败")
+            return data["data"]["list"]
+        except httpx.HTTPError as e:
+            raise RequestException(f"获取绑定角色失败: {e}", endpoint=urlparse(binding_url).path, error_class=ErrorClass.NETWORK)
 
     @classmethod
+    @traced("SklandAPI.ark_sign")
     async def ark_sign(cls, cred: CRED, uid: str, channel_master_id: str) -> ArkSignResponse:
         """进行明日方舟签到"""
         body = {"uid": uid, "gameId": channel_master_id}
@@ -109,26 +146,21 @@ class SklandAPI:
             method="post",
             query_body=body,
         )
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    sign_url,
-                    headers={**headers, "Content-Type": "application/json"},
-                    content=json_body,
-                )
-                logger.debug(f"明日方舟签到响应：{response.json()}")
-                if status := response.json().get("code"):
-                    if status == 10000:
-                        raise UnauthorizedException(f"角色 {uid} 签到失败：{response.json().get('message')}")
-                    elif status == 10002:
-                        raise LoginException(f"角色 {uid} 签到失败：{response.json().get('message')}")
-                    else:
-                        raise RequestException(f"角色 {uid} 签到失败 (code={status})：{response.json().get('message')}")
-            except httpx.HTTPError as e:
-                raise RequestException(f"角色 {uid} 签到失败: {e}")
-            return ArkSignResponse(**response.json()["data"])
+        try:
+            response = await http.request(
+                "POST",
+                sign_url,
+                headers={**headers, "Content-Type": "application/json"},
+                content=json_body,
+            )
+            logger.opt(lazy=True).debug("明日方舟签到响应：{}", lambda: response.text)
+            data = cls._check_response(response, f"角色 {uid} 签到失败")
+        except httpx.HTTPError as e:
+            raise RequestException(f"角色 {uid} 签到失败: {e}", endpoint=urlparse(sign_url).path, error_class=ErrorClass.NETWORK)
+        return ArkSignResponse(**data["data"])
 
     @classmethod
+    @traced("SklandAPI.endfield_sign")
     async def endfield_sign(cls, cred: CRED, uid: str, server_id: str) -> EndfieldSignResponse:
         """进行终末地签到"""
         sign_url = "https://zonai.skland.com/web/v1/game/endfield/attendance"
@@ -139,24 +171,18 @@ class SklandAPI:
             query_body=None,
         )
         game_role = f"3_{uid}_{server_id}"
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    sign_url,
-                    headers={
-                        **headers,
-                        "Content-Type": "application/json",
-                        "sk-game-role": game_role,
-                    },
-                )
-                logger.debug(f"终末地签到响应：{response.json()}")
-                if status := response.json().get("code"):
-                    if status == 10000:
-                        raise UnauthorizedException(f"角色 {uid} 终末地签到失败：{response.json().get('message')}")
-                    elif status == 10002:
-                        raise LoginException(f"角色 {uid} 终末地签到失败：{response.json().get('message')}")
-                    else:
-                        raise RequestException(f"角色 {uid} 终末地签到失败 (code={status})：{response.json().get('message')}")
-            except httpx.HTTPError as e:
-                raise RequestException(f"角色 {uid} 终末地签到失败: {e}")
-            return EndfieldSignResponse(**response.json()["data"])
+        try:
+            response = await http.request(
+                "POST",
+                sign_url,
+                headers={
+                    **headers,
+                    "Content-Type": "application/json",
+                    "sk-game-role": game_role,
+                },
+            )
+            logger.opt(lazy=True).debug("终末地签到响应：{}", lambda: response.text)
+            data = cls._check_response(response, f"角色 {uid} 终末地签到失败")
+        except httpx.HTTPError as e:
+            raise RequestException(f"角色 {uid} 终末地签到失败: {e}", endpoint=urlparse(sign_url).path, error_class=ErrorClass.NETWORK)
+        return EndfieldSignResponse(**data["data"])
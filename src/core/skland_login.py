@@ -3,10 +3,14 @@
 从原项目复用并移除 NoneBot 依赖。
 """
 
+from urllib.parse import urlparse
+
 import httpx
 
 from schemas import CRED
-from exception import RequestException
+from exception import ErrorClass, LoginException, RequestException
+from core import http
+from core.cache import invalidate_cred
 
 
 skland_app_code = "4ca99fa6b56cc2ba"
@@ -34,89 +38,113 @@ class SklandLoginAPI:
         Returns:
             grant_type 为 0 时返回森空岛认证代码(code)，grant_type 为 1 时返回官网通行证 token。
         """
-        async with httpx.AsyncClient() as client:
-            code = skland_app_code if grant_type == 0 else web_app_code
-            response = await client.post(
-                "https://as.hypergryph.com/user/oauth2/v2/grant",
-                json={"appCode": code, "token": token, "type": grant_type},
-                headers={**cls._headers},
-            )
-            if status := response.json().get("status"):
-                if status != 0:
-                    raise RequestException(f"使用 token 获得认证代码失败：{response.json().get('msg')}")
-            return response.json()["data"]["code"] if grant_type == 0 else response.json()["data"]["token"]
+        code = skland_app_code if grant_type == 0 else web_app_code
+        response = await http.request(
+            "POST",
+            "https://as.hypergryph.com/user/oauth2/v2/grant",
+            json={"appCode": code, "token": token, "type": grant_type},
+            headers={**cls._headers},
+        )
+        if status := response.json().get("status"):
+            if status != 0:
+                raise RequestException(f"使用 token 获得认证代码失败：{response.json().get('msg')}")
+        return response.json()["data"]["code"] if grant_type == 0 else response.json()["data"]["token"]
 
     @classmethod
     async def get_cred(cls, grant_code: str) -> CRED:
         """通过认证代码获取 cred"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://zonai.skland.com/api/v1/user/auth/generate_cred_by_code",
-                json={"code": grant_code, "kind": 1},
-                headers={**cls._headers},
-            )
-            if status := response.json().get("status"):
-                if status != 0:
-                    raise RequestException(f"获得 cred 失败：{response.json().get('message')}")
-            return CRED(**response.json().get("data"))
+        response = await http.request(
+            "POST",
+            "https://zonai.skland.com/api/v1/user/auth/generate_cred_by_code",
+            json={"code": grant_code, "kind": 1},
+            headers={**cls._headers},
+        )
+        if status := response.json().get("status"):
+            if status != 0:
+                raise RequestException(f"获得 cred 失败：{response.json().get('message')}")
+        return CRED(**response.json().get("data"))
 
     @classmethod
     async def refresh_token(cls, cred: str) -> str:
-        """刷新 cred_token"""
-        async with httpx.AsyncClient() as client:
-            refresh_url = "https://zonai.skland.com/api/v1/auth/refresh"
-            try:
-                response = await client.get(
-                    refresh_url,
-                    headers={**cls._headers, "cred": cred},
-                )
-                response.raise_for_status()
-                if status := response.json().get("status"):
-                    if status != 0:
-                        raise RequestException(f"刷新 token 失败：{response.json().get('message')}")
-                token = response.json().get("data").get("token")
-                return token
-            except httpx.HTTPError as e:
-                raise RequestException(f"刷新 token 失败：{str(e)}")
+        """刷新 cred_token
+
+        Raises:
+            LoginException: cred 已失效（业务错误码非 0、HTTP 401/403 或未返回 token），需要用 token 重新获取 cred
+            RequestException: 网络错误或上游服务器错误
+        """
+        refresh_url = "https://zonai.skland.com/api/v1/auth/refresh"
+        endpoint = urlparse(refresh_url).path
+        try:
+            response = await http.request(
+                "GET",
+                refresh_url,
+                headers={**cls._headers, "cred": cred},
+            )
+        except httpx.HTTPError as e:
+            raise RequestException(f"刷新 token 失败：{e}", endpoint=endpoint, error_class=ErrorClass.NETWORK)
+
+        if response.status_code >= 500:
+            raise RequestException(
+                f"刷新 token 失败：HTTP {response.status_code}", status=response.status_code, endpoint=endpoint
+            )
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        code = body.get("code", body.get("status"))
+        data = body.get("data") or {}
+        if response.status_code >= 400 or code or not data.get("token"):
+            message = body.get("message") or body.get("msg") or (
+                f"HTTP {response.status_code}" if response.status_code >= 400 else "未返回 token"
+            )
+            raise LoginException(
+                f"刷新 token 失败：{message}",
+                code=code or None,
+                status=response.status_code,
+                endpoint=endpoint,
+                error_class=ErrorClass.CRED_INVALID,
+            )
+        invalidate_cred(cred)
+        return data["token"]
 
     @classmethod
     async def get_scan(cls) -> str:
         """获取登录二维码"""
-        async with httpx.AsyncClient() as client:
-            get_scan_url = "https://as.hypergryph.com/general/v1/gen_scan/login"
-            response = await client.post(
-                get_scan_url,
-                json={"appCode": skland_app_code},
-            )
-            if status := response.json().get("status"):
-                if status != 0:
-                    raise RequestException(f"获取登录二维码失败：{response.json().get('msg')}")
-            return response.json()["data"]["scanId"]
+        get_scan_url = "https://as.hypergryph.com/general/v1/gen_scan/login"
+        response = await http.request(
+            "POST",
+            get_scan_url,
+            json={"appCode": skland_app_code},
+        )
+        if status := response.json().get("status"):
+            if status != 0:
+                raise RequestException(f"获取登录二维码失败：{response.json().get('msg')}")
+        return response.json()["data"]["scanId"]
 
     @classmethod
     async def get_scan_status(cls, scan_id: str) -> str:
         """获取二维码扫描状态"""
-        async with httpx.AsyncClient() as client:
-            get_scan_status_url = "https://as.hypergryph.com/general/v1/scan_status"
-            response = await client.get(
-                get_scan_status_url,
-                params={"scanId": scan_id},
-            )
-            if status := response.json().get("status"):
-                if status != 0:
-                    raise RequestException(f"获取二维码 scanCode 失败：{response.json().get('msg')}")
-            return response.json()["data"]["scanCode"]
+        get_scan_status_url = "https://as.hypergryph.com/general/v1/scan_status"
+        response = await http.request(
+            "GET",
+            get_scan_status_url,
+            params={"scanId": scan_id},
+        )
+        if status := response.json().get("status"):
+            if status != 0:
+                raise RequestException(f"获取二维码 scanCode 失败：{response.json().get('msg')}")
+        return response.json()["data"]["scanCode"]
 
     @classmethod
     async def get_token_by_scan_code(cls, scan_code: str) -> str:
         """通过扫描码获取 token"""
-        async with httpx.AsyncClient() as client:
-            get_token_by_scan_code_url = "https://as.hypergryph.com/user/auth/v1/token_by_scan_code"
-            response = await client.post(
-                get_token_by_scan_code_url,
-                json={"scanCode": scan_code},
-            )
-            if status := response.json().get("status"):
-                if status != 0:
-                    raise RequestException(f"获取 token 失败：{response.json().get('msg')}")
-            return response.json()["data"]["token"]
+        get_token_by_scan_code_url = "https://as.hypergryph.com/user/auth/v1/token_by_scan_code"
+        response = await http.request(
+            "POST",
+            get_token_by_scan_code_url,
+            json={"scanCode": scan_code},
+        )
+        if status := response.json().get("status"):
+            if status != 0:
+                raise RequestException(f"获取 token 失败：{response.json().get('msg')}")
+        return response.json()["data"]["token"]
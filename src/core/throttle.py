@@ -0,0 +1,62 @@
+"""并发与限速模块
+
+批量请求森空岛接口时限制同时进行的请求数和每秒发起的请求数，避免触发风控。
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class RateLimiter:
+    """限速器：相邻两次 acquire() 至少间隔 1/rate 秒
+
+    rate <= 0 时不限速。
+    """
+
+    def __init__(self, rate: float):
+        self._interval = 1 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """等待到允许发起下一次请求"""
+        if not self._interval:
+            return
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+                now = self._next
+            self._next = now + self._interval
+
+
+async def run_limited(
+    items: Iterable[T],
+    func: Callable[[T], Awaitable[R]],
+    concurrency: int,
+    rate: float = 0.0,
+) -> list[R]:
+    """对每个元素并发执行 func，结果顺序与 items 一致
+
+    Args:
+        items: 待处理的元素
+        func: 处理函数，异常由调用方在 func 内处理
+        concurrency: 最大并发数
+        rate: 每秒最多启动的次数，<= 0 时不限速
+
+    Returns:
+        list: 每个元素的处理结果
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    limiter = RateLimiter(rate)
+
+    async def _run(item: T) -> R:
+        async with semaphore:
+            await limiter.acquire()
+            return await func(item)
+
+    return await asyncio.gather(*(_run(item) for item in items))
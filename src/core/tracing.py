@@ -0,0 +1,333 @@
+"""链路追踪模块
+
+轻量级的 span 追踪，用于定位签到运行中耗时的环节（签到、网络、数据库提交、凭证刷新）。
+
+- span 通过 contextvars 自动建立父子关系，可直接在异步代码中使用
+- 采样在根 span 上按比例决定，子 span 继承父 span 的采样结果
+- 结束的 span 由后台线程批量导出到 JSONL 文件或 OTLP/HTTP 收集器，不阻塞事件循环
+"""
+
+import abc
+import atexit
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import httpx
+# 与 utils.logger 是同一个 logger；core 包初始化时会导入本模块，直接导入 utils 会循环导入
+from loguru import logger
+
+from config import config, TracingConfig, get_data_dir
+
+
+class Span:
+    """追踪片段"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None, attributes: dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.error: str | None = None
+
+    def set_attribute(self, key: str, value: Any):
+        """设置属性"""
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException):
+        """记录异常并将 span 标记为错误"""
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    @property
+    def duration_ms(self) -> float:
+        """耗时（毫秒）"""
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict:
+        """转换为字典（JSONL 导出格式）"""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """未采样时使用的空 span"""
+
+    def __init__(self, trace_id: str = ""):
+        self.trace_id = trace_id
+        self.span_id = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_exception(self, exc: BaseException):
+        pass
+
+
+class SpanExporter(abc.ABC):
+    """span 导出器基类"""
+
+    @abc.abstractmethod
+    def export(self, spans: list[Span]):
+        """导出一批 span，失败时抛出异常"""
+
+    def shutdown(self):
+        pass
+
+
+class JsonlExporter(SpanExporter):
+    """导出到本地 JSONL 文件（每行一个 span）"""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, spans: list[Span]):
+        for span in spans:
+            self._file.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+
+    def shutdown(self):
+        self._file.close()
+
+
+class OtlpExporter(SpanExporter):
+    """通过 OTLP/HTTP (JSON) 导出到收集器"""
+
+    def __init__(self, endpoint: str, service_name: str):
+        self._url = endpoint.rstrip("/") + "/v1/traces"
+        self._service_name = service_name
+        self._client = httpx.Client(timeout=10)
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> dict:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def _to_otlp(self, span: Span) -> dict:
+        data = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [self._attribute(k, v) for k, v in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id:
+            data["parentSpanId"] = span.parent_id
+        return data
+
+    def export(self, spans: list[Span]):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [self._attribute("service.name", self._service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "skland-auto-sign"},
+                    "spans": [self._to_otlp(span) for span in spans],
+                }],
+            }]
+        }
+        self._client.post(self._url, json=payload).raise_for_status()
+
+    def shutdown(self):
+        self._client.close()
+
+
+class _BatchProcessor:
+    """后台线程批量导出 span"""
+
+    def __init__(self, exporter: SpanExporter, batch_size: int = 256, interval: float = 2.0):
+        self._exporter = exporter
+        self._batch_size = batch_size
+        self._interval = interval
+        self._queue: queue.Queue[Span | None] = queue.Queue(maxsize=10000)
+        self._failures = 0  # 连续导出失败的批次数
+        self._thread = threading.Thread(target=self._worker, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def on_end(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            pass  # 队列满时丢弃，追踪不能影响业务
+
+    def _export(self, batch: list[Span]):
+        # 收集器不可用时每个批次都会失败，只记录第一次失败和恢复，避免刷屏
+        try:
+            self._exporter.export(batch)
+        except Exception as e:
+            self._failures += 1
+            if self._failures == 1:
+                logger.warning("span 导出失败，恢复前不再重复记录: {}", e)
+            return
+        if self._failures:
+            logger.info("span 导出已恢复，期间丢弃了 {} 批 span", self._failures)
+            self._failures = 0
+
+    def _worker(self):
+        batch: list[Span] = []
+        deadline = time.monotonic() + self._interval
+        while True:
+            try:
+                span = self._queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+                if span is None:
+                    break
+                batch.append(span)
+            except queue.Empty:
+                pass
+            if len(batch) >= self._batch_size or time.monotonic() >= deadline:
+                if batch:
+                    self._export(batch)
+                    batch = []
+                deadline = time.monotonic() + self._interval
+        if batch:
+            self._export(batch)
+        self._exporter.shutdown()
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+
+
+_current_span: ContextVar["Span | _NoopSpan | None"] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """追踪器"""
+
+    def __init__(self, tracing_config: TracingConfig):
+        self._config = tracing_config
+        self._processor: _BatchProcessor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用追踪"""
+        return self._config.enabled
+
+    def _create_exporter(self) -> SpanExporter:
+        if self._config.exporter == "otlp":
+            return OtlpExporter(self._config.otlp_endpoint, self._config.service_name)
+        path = Path(self._config.path)
+        if not path.is_absolute():
+            path = get_data_dir().parent / path
+        return JsonlExporter(path)
+
+    def _get_processor(self) -> _BatchProcessor:
+        if self._processor is None:
+            with self._lock:
+                if self._processor is None:
+                    self._processor = _BatchProcessor(self._create_exporter())
+                    atexit.register(self.shutdown)
+        return self._processor
+
+    def set_exporter(self, exporter: SpanExporter):
+        """使用自定义导出器替换配置中的导出器"""
+        self.shutdown()
+        with self._lock:
+            self._processor = _BatchProcessor(exporter)
+            atexit.register(self.shutdown)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator["Span | _NoopSpan"]:
+        """创建一个 span
+
+        Args:
+            name: span 名称
+            **attributes: span 属性（如 user_id、character_uid）
+        """
+        if not self._config.enabled:
+            yield _NoopSpan()
+            return
+
+        parent = _current_span.get()
+        if parent is None:
+            # 根 span，按比例采样
+            trace_id = os.urandom(16).hex()
+            if random.random() >= self._config.sample_ratio:
+                span = _NoopSpan(trace_id)
+            else:
+                span = Span(name, trace_id, None, attributes)
+        elif isinstance(parent, _NoopSpan):
+            span = parent
+        else:
+            span = Span(name, parent.trace_id, parent.span_id, attributes)
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            if isinstance(span, Span):
+                span.end_ns = time.time_ns()
+                self._get_processor().on_end(span)
+
+    def shutdown(self):
+        """导出剩余 span 并关闭导出器"""
+        with self._lock:
+            processor, self._processor = self._processor, None
+        if processor is not None:
+            processor.shutdown()
+
+
+# 全局追踪器实例
+tracer = Tracer(config.tracing)
+
+
+def traced(name: str | None = None, attributes: Callable[[dict[str, Any]], dict[str, Any]] | None = None):
+    """装饰器：为异步函数创建 span
+
+    Args:
+        name: span 名称，默认为函数的限定名
+        attributes: 根据调用参数（参数名 -> 值）计算 span 属性的函数
+    """
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return await func(*args, **kwargs)
+            attrs = {}
+            if attributes is not None:
+                bound = signature.bind_partial(*args, **kwargs)
+                bound.apply_defaults()
+                attrs = attributes(bound.arguments)
+            with tracer.span(span_name, **attrs):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
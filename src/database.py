@@ -1,12 +1,13 @@
 """数据库连接模块
 
-使用 SQLAlchemy 管理数据库连接。
+使用 SQLAlchemy 管理数据库连接，支持 SQLite（aiosqlite）和 PostgreSQL（asyncpg）。
 """
 
 from pathlib import Path
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
+from sqlalchemy import Connection, bindparam, inspect, make_url, text
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
@@ -29,6 +30,11 @@ class Database:
         self._engine = None
         self._session_factory = None
 
+    @property
+    def engine(self):
+        """数据库引擎（未初始化时为 None）"""
+        return self._engine
+
     def get_url(self) -> str:
         """获取数据库连接 URL"""
         db_config = config.database
@@ -41,19 +47,49 @@ class Database:
             db_path.parent.mkdir(parents=True, exist_ok=True)
             return f"sqlite+aiosqlite:///{db_path}"
         elif db_config.type == "postgresql":
+            if db_config.url.startswith("sqlite"):
+                raise ValueError("DATABASE_TYPE 为 postgresql 时需要设置 DATABASE_URL")
             return db_config.url
         else:
             raise ValueError(f"不支持的数据库类型: {db_config.type}")
 
-    async def init(self):
-        """初始化数据库连接"""
-        url = self.get_url()
+    async def init(self, url: str | None = None):
+        """初始化数据库连接
+
+        Args:
+            url: 数据库连接 URL，默认根据配置生成
+        """
+        url = make_url(url or self.get_url())
+        options = {}
+        if url.get_backend_name() == "sqlite":
+            url = url.set(drivername="sqlite+aiosqlite")
+        elif url.get_backend_name() == "postgresql":
+            # 统一使用 asyncpg 驱动（postgresql://、postgres://、postgresql+psycopg2:// 等）
+            url = url.set(drivername="postgresql+asyncpg")
+            db_config = config.database
+            options = {
+                "pool_size": db_config.pool_size,
+                "max_overflow": db_config.max_overflow,
+                "pool_timeout": db_config.pool_timeout,
+                "pool_recycle": db_config.pool_recycle,
+                "pool_pre_ping": db_config.pool_pre_ping,
+            }
         self._engine = create_async_engine(
             url,
             echo=config.app.debug,
             future=True,
+            **options,
         )
 
+        from core.data_version import data_version
+
+        data_version.install(self._engine.sync_engine)
+
+        if config.app.query_stats:
+            from core.query_stats import install
+
+            install(self._engine.sync_engine, config.app.slow_query_ms)
+
         self._session_factory = async_sessionmaker(
             bind=self._engine,
             class_=AsyncSession,
@@ -61,11 +97,44 @@ class Database:
         )
 
         # 导入所有模型
-        from models import user, character, sign_record
+        from models import user, character, sign_record, sign_run, reward, attendance
 
-        # 创建表
+        # 创建表，并为已存在的表补充新增的列和索引，为新建的表回填数据
         async with self._engine.begin() as conn:
+            existing_tables = await conn.run_sync(lambda sync_conn: set(inspect(sync_conn).get_table_names()))
+            if self._partitioning and "skland_sign_record" not in existing_tables:
+                from core.partitions import create_partitioned_tables
+
+                await conn.run_sync(create_partitioned_tables)
             await conn.run_sync(Base.metadata.create_all)
+            added_columns = await conn.run_sync(_upgrade_schema)
+            for column, backfill in _COLUMN_BACKFILLS.items():
+                if column in added_columns:
+                    await conn.run_sync(backfill)
+            for table_name, backfill in _TABLE_BACKFILLS.items():
+                if table_name not in existing_tables:
+                    await conn.run_sync(backfill)
+
+        await self.ensure_partitions()
+
+    @property
+    def _partitioning(self) -> bool:
+        """是否按月分区签到记录表"""
+        return self._engine.dialect.name == "postgresql" and config.database.partition_sign_record
+
+    async def ensure_partitions(self):
+        """为分区的签到记录表创建接下来几个月的分区（未开启分区时不做任何事）"""
+        if self._engine is None or not self._partitioning:
+            return
+        from core.partitions import ensure_partitions, is_partitioned
+
+        async with self._engine.begin() as conn:
+            if not await conn.run_sync(is_partitioned):
+                from utils.logger import logger
+
+                logger.warning("已开启签到记录分区，但 skland_sign_record 是已存在的普通表，未进行分区")
+                return
+            await conn.run_sync(ensure_partitions, config.database.partition_months_ahead)
 
     async def close(self):
         """关闭数据库连接"""
@@ -97,5 +166,158 @@ class Database:
         return self._session_factory()
 
 
+def _upgrade_schema(conn: Connection) -> set[tuple[str, str]]:
+    """升级已存在的表结构
+
+    create_all 只会创建缺失的表，这里为旧表补充新增的列（可为空或带默认值）和索引。
+
+    Returns:
+        set: 新增的 (表名, 列名)
+    """
+    inspector = inspect(conn)
+    added = set()
+    for table in Base.metadata.sorted_tables:
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+            conn.execute(text(ddl))
+            added.add((table.name, column.name))
+
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            if index.name in _INDEX_PREPARATIONS:
+                _INDEX_PREPARATIONS[index.name](conn)
+            index.create(conn)
+    return added
+
+
+def _prepare_sign_record_unique_index(conn: Connection):
+    """创建 (角色, 游戏, 日期) 唯一索引前，补充签到日期并合并同一天的重复记录
+
+    保留状态最好（success > duplicate > failed > 其他）且最新的一条，尝试次数记为合并的条数。
+    """
+    to_date = "DATE(sign_time)" if conn.dialect.name == "sqlite" else "CAST(sign_time AS DATE)"
+    conn.execute(text(f"UPDATE skland_sign_record SET sign_date = {to_date} WHERE sign_date IS NULL"))
+    # 只读取有重复的 (角色, 游戏, 日期) 组
+    rows = conn.execute(text(
+        "SELECT r.id, r.character_id, r.game_type, r.sign_date, r.status FROM skland_sign_record r "
+        "JOIN (SELECT character_id, game_type, sign_date FROM skland_sign_record "
+        "GROUP BY character_id, game_type, sign_date HAVING COUNT(*) > 1) d "
+        "ON r.character_id = d.character_id AND r.game_type = d.game_type AND r.sign_date = d.sign_date"
+    )).all()
+
+    rank = {"success": 3, "duplicate": 2, "failed": 1}
+    groups: dict[tuple, list] = {}
+    for row in rows:
+        groups.setdefault((row.character_id, row.game_type, row.sign_date), []).append(row)
+
+    delete_ids = []
+    for group in groups.values():
+        keep = max(group, key=lambda row: (rank.get(row.status, 0), row.id))
+        conn.execute(
+            text("UPDATE skland_sign_record SET attempts = :attempts WHERE id = :id"),
+            {"attempts": len(group), "id": keep.id},
+        )
+        delete_ids.extend(row.id for row in group if row.id != keep.id)
+
+    delete = text("DELETE FROM skland_sign_record WHERE id IN :ids").bindparams(bindparam("ids", expanding=True))
+    for start in range(0, len(delete_ids), 500):
+        conn.execute(delete, {"ids": delete_ids[start:start + 500]})
+
+
+def _prepare_sign_record_error_class_index(conn: Connection):
+    """为已有的失败记录按错误信息补充失败原因分类"""
+    import re
+    from exception import classify_error
+
+    rows = conn.execute(text(
+        "SELECT id, error_message FROM skland_sign_record WHERE status = 'failed' AND error_class IS NULL"
+    )).all()
+
+    groups: dict[str, list[int]] = {}
+    for row in rows:
+        message = row.error_message or ""
+        code = re.search(r"code=(\d+)", message)
+        error_class = classify_error(int(code.group(1)) if code else None, None, message)
+        groups.setdefault(error_class.value, []).append(row.id)
+
+    for error_class, ids in groups.items():
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            conn.execute(
+                text(f"UPDATE skland_sign_record SET error_class = :error_class WHERE id IN ({', '.join(str(i) for i in chunk)})"),
+                {"error_class": error_class},
+            )
+
+
+# 创建索引前需要执行的数据迁移（索引名 -> 迁移函数）
+_INDEX_PREPARATIONS = {
+    "uq_sign_record_character_game_date": _prepare_sign_record_unique_index,
+    "ix_sign_record_date_error_class": _prepare_sign_record_error_class_index,
+}
+
+
+def _backfill_sign_rewards(conn: Connection):
+    """从已有签到记录的奖励 JSON 回填奖励物品字典和奖励明细"""
+    from sqlalchemy import select
+    from models import SignRecord
+    from core.rewards import save_rewards
+
+    last_id = 0
+    total = 0
+    while True:
+        rows = conn.execute(
+            select(SignRecord.id, SignRecord.sign_date, SignRecord.game_type, SignRecord.rewards)
+            .where(SignRecord.status == "success", SignRecord.rewards != "", SignRecord.id > last_id)
+            .order_by(SignRecord.id)
+            .limit(1000)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        total += save_rewards(conn, [tuple(row) for row in rows])
+    if total:
+        from utils.logger import logger
+
+        logger.info("已从签到记录回填 {} 条奖励明细", total)
+
+
+def _backfill_attendance(conn: Connection):
+    """从已有签到记录回填签到日历"""
+    from core.attendance import rebuild_attendance
+
+    count = rebuild_attendance(conn)
+    if count:
+        from utils.logger import logger
+
+        logger.info("已从签到记录回填 {} 条签到日历", count)
+
+
+def _backfill_sign_state(conn: Connection):
+    """从已有签到记录回填角色和账号的最近签到状态"""
+    from core.sign_state import rebuild_sign_state
+
+    rebuild_sign_state(conn)
+
+
+# 新增列后需要执行的数据回填（(表名, 列名) -> 回填函数）
+_COLUMN_BACKFILLS = {
+    ("skland_characters", "last_sign_at"): _backfill_sign_state,
+}
+
+
+# 新建表后需要执行的数据回填（表名 -> 回填函数）
+_TABLE_BACKFILLS = {
+    "skland_sign_reward": _backfill_sign_rewards,
+    "skland_attendance": _backfill_attendance,
+}
+
+
 # 全局数据库实例
 db = Database()
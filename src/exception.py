@@ -1,9 +1,105 @@
 """异常类定义"""
 
+from enum import Enum
+
+
+class ErrorClass(str, Enum):
+    """错误分类（写入签到记录的 error_class）"""
+
+    TOKEN_EXPIRED = "token_expired"
+    """cred_token 失效，可用 cred 刷新"""
+
+    CRED_INVALID = "cred_invalid"
+    """cred 失效，需要用 token 重新登录"""
+
+    DUPLICATE = "duplicate"
+    """今日已签到"""
+
+    RATE_LIMITED = "rate_limited"
+    """请求过于频繁"""
+
+    NETWORK = "network"
+    """网络错误（未收到响应）"""
+
+    SERVER_ERROR = "server_error"
+    """上游服务器错误（HTTP 5xx）"""
+
+    UPSTREAM = "upstream"
+    """其他上游业务错误"""
+
+    UNKNOWN = "unknown"
+    """无法分类的错误"""
+
+
+# 上游业务错误码 -> 错误分类
+ERROR_CODE_CLASSES: dict[int, ErrorClass] = {
+    10000: ErrorClass.TOKEN_EXPIRED,
+    10001: ErrorClass.DUPLICATE,
+    10002: ErrorClass.CRED_INVALID,
+}
+
+# HTTP 状态码 -> 错误分类
+HTTP_STATUS_CLASSES: dict[int, ErrorClass] = {
+    401: ErrorClass.CRED_INVALID,
+    403: ErrorClass.CRED_INVALID,
+    429: ErrorClass.RATE_LIMITED,
+}
+
+# 错误码未知时按上游返回的提示分类（也用于迁移只有错误信息的旧记录）
+ERROR_MESSAGE_CLASSES: tuple[tuple[str, ErrorClass], ...] = (
+    ("请勿重复签到", ErrorClass.DUPLICATE),
+    ("频繁", ErrorClass.RATE_LIMITED),
+    ("登录", ErrorClass.CRED_INVALID),
+    ("认证", ErrorClass.CRED_INVALID),
+    ("授权", ErrorClass.CRED_INVALID),
+    ("凭证", ErrorClass.CRED_INVALID),
+    ("cred", ErrorClass.CRED_INVALID),
+    ("token", ErrorClass.CRED_INVALID),
+)
+
+
+def classify_error(code: int | None = None, status: int | None = None, message: str = "") -> ErrorClass:
+    """按上游错误码、HTTP 状态码、错误信息依次查表分类"""
+    if code in ERROR_CODE_CLASSES:
+        return ERROR_CODE_CLASSES[code]
+    if status in HTTP_STATUS_CLASSES:
+        return HTTP_STATUS_CLASSES[status]
+    if status is not None and status >= 500:
+        return ErrorClass.SERVER_ERROR
+    lowered = message.lower()
+    for keyword, error_class in ERROR_MESSAGE_CLASSES:
+        if keyword in lowered:
+            return error_class
+    return ErrorClass.UPSTREAM if code else ErrorClass.UNKNOWN
+
 
 class Exception(Exception):
-    """异常基类"""
-    pass
+    """异常基类
+
+    Attributes:
+        code: 上游业务错误码
+        status: HTTP 状态码（未收到响应时为 None）
+        endpoint: 请求的接口路径
+        error_class: 错误分类
+    """
+
+    default_error_class: ErrorClass | None = None
+    """未指定分类时使用的分类（为空时按错误码、状态码和错误信息查表）"""
+
+    def __init__(
+        self,
+        message: str = "",
+        *,
+        code: int | None = None,
+        status: int | None = None,
+        endpoint: str | None = None,
+        error_class: ErrorClass | None = None,
+    ):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+        self.endpoint = endpoint
+        self.error_class = error_class or self.default_error_class or classify_error(code, status, message)
 
 
 class RequestException(Exception):
@@ -13,9 +109,9 @@ class RequestException(Exception):
 
 class UnauthorizedException(Exception):
     """登录授权错误"""
-    pass
+    default_error_class = ErrorClass.TOKEN_EXPIRED
 
 
 class LoginException(Exception):
     """登录错误"""
-    pass
+    default_error_class = ErrorClass.CRED_INVALID
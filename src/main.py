@@ -9,10 +9,11 @@ from pathlib import Path
 
 from config import config, accounts_config, AccountConfig, get_data_dir
 from database import db
-from models import User
-from utils import setup_logger
+from utils import setup_logger, shutdown_logger
 from utils.logger import logger
 from scheduler import job_manager
+from core.tracing import tracer
+from core.record_writer import record_writer
 
 
 class SklandAutoSign:
@@ -27,7 +28,7 @@ class SklandAutoSign:
         """初始化应用"""
         # 设置日志
         setup_logger()
-        logger.info(f"启动 {config.app.name} v{config.app.version}")
+        logger.info("启动 {} v{}", config.app.name, config.app.version)
 
         # 初始化数据库
         logger.info("初始化数据库...")
@@ -39,50 +40,22 @@ class SklandAutoSign:
         logger.info("应用初始化完成")
 
     async def _load_accounts(self):
-        """从环境变量加载账号"""
+        """从环境变量和账号文件加载账号（只写入有变化的账号）"""
+        from core.accounts_file import accounts_file, sync_accounts
+
         accounts = accounts_config.get_accounts()
+        if accounts:
+            counts = await sync_accounts(accounts)
+            logger.info(
+                "已加载 {} 个环境变量账号配置，新增 {}，更新 {}，未变化 {}",
+                len(accounts), counts["created"], counts["updated"], counts["unchanged"],
+            )
 
-        if not accounts:
-            logger.warning("未配置任何账号")
-            logger.info("请在 .env 文件中设置账号环境变量，或使用 Web 界面添加")
-            return
+        await accounts_file.reload()
 
-        async with db.get_session() as session:
-            from sqlalchemy import select
-
-            # 获取现有账号
-            stmt = select(User)
-            result = await session.execute(stmt)
-            existing_users = {user.name: user for user in result.scalars().all()}
-
-            # 更新或添加账号
-            for account in accounts:
-                if account.name in existing_users:
-                    # 更新现有账号
-                    user = existing_users[account.name]
-                    user.enabled = account.enabled
-                    if account.token:
-                        user.token = account.token
-                    if account.cred:
-                        user.cred = account.cred
-                    if account.cred_token:
-                        user.cred_token = account.cred_token
-                    user.remark = account.remark
-                    logger.info(f"更新账号: {account.name}")
-                else:
-                    # 添加新账号
-                    user = User(
-                        name=account.name,
-                        enabled=account.enabled,
-                        token=account.token,
-                        cred=account.cred,
-                        cred_token=account.cred_token,
-                        remark=account.remark,
-                    )
-                    session.add(user)
-                    logger.info(f"添加账号: {account.name}")
-
-        logger.info(f"已加载 {len(accounts)} 个账号配置")
+        if not accounts and not accounts_file.path.exists():
+            logger.warning("未配置任何账号")
+            logger.info("请在 .env 文件或 {} 中配置账号，或使用 Web 界面添加", accounts_file.path)
 
     async def start(self):
         """启动应用"""
@@ -98,6 +71,12 @@ class SklandAutoSign:
         # 如果启用了 Web 服务
         if config.web.enabled:
             await self._start_web_server()
+        elif config.metrics.enabled:
+            # 未启用 Web 时使用内嵌 exporter 暴露 /metrics
+            from core.metrics import start_exporter
+
+            start_exporter(config.metrics.port)
+            logger.info("监控指标已启动: http://0.0.0.0:{}/metrics", config.metrics.port)
 
         logger.info("应用已启动，按 Ctrl+C 停止")
 
@@ -121,7 +100,7 @@ class SklandAutoSign:
 
         # 在后台启动 Web 服务器
         asyncio.create_task(server.serve())
-        logger.info(f"Web 服务已启动: http://{config.web.host}:{config.web.port}")
+        logger.info("Web 服务已启动: http://{}:{}", config.web.host, config.web.port)
 
     async def stop(self):
         """停止应用"""
@@ -139,31 +118,50 @@ class SklandAutoSign:
         # 停止定时任务
         job_manager.shutdown()
 
-        # 关闭数据库
+        # 写入剩余的签到记录并关闭数据库
+        await record_writer.close()
         await db.close()
+        tracer.shutdown()
 
         logger.info("应用已停止")
+        await shutdown_logger()
 
-    async def run_once(self, game_type: str = "all"):
+    async def run_once(self, game_type: str = "all", profile: set[str] | None = None, profile_top: int = 20):
         """运行一次签到（不启动定时任务）
 
         Args:
             game_type: 游戏类型 ("arknights", "endfield", "all")
+            profile: 性能分析类型（cpu/tasks/memory），为空时不分析
+            profile_top: 性能分析报告中每项显示的条数
         """
         await self.initialize()
 
         from core.sign_service import sign_all_users
 
-        async with db.get_session() as session:
-            results = await sign_all_users(session, game_type)
+        profiler = None
+        if profile:
+            from utils.profiler import RunProfiler
+
+            profiler = RunProfiler(profile, top=profile_top)
+            async with profiler:
+                results = await sign_all_users(game_type, trigger="cli")
+        else:
+            results = await sign_all_users(game_type, trigger="cli")
 
-            # 输出结果
-            for user_name, result in results.items():
-                logger.info(f"\n{result.summary}")
-                for nickname, detail in result.details.items():
-                    logger.info(f"  {nickname}: {detail}")
+        # 输出结果
+        for user_name, result in results.items():
+            logger.info("\n{}", result.summary)
+            for nickname, detail in result.details.items():
+                logger.info("  {}: {}", nickname, detail)
 
+        await record_writer.close()
         await db.close()
+        tracer.shutdown()
+
+        if profiler is not None:
+            logger.info("\n{}", profiler.report)
+
+        await shutdown_logger()
 
 
 async def main():
@@ -3,5 +3,8 @@
 from models.user import User
 from models.character import Character
 from models.sign_record import SignRecord
+from models.sign_run import SignRun, SignRunItem
+from models.reward import RewardItem, SignReward
+from models.attendance import Attendance
 
-__all__ = ["User", "Character", "SignRecord"]
+__all__ = ["User", "Character", "SignRecord", "SignRun", "SignRunItem", "RewardItem", "SignReward", "Attendance"]
@@ -0,0 +1,32 @@
+"""签到日历模型"""
+
+from datetime import datetime
+from sqlalchemy import ForeignKey, Integer, LargeBinary, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import Base
+
+
+class Attendance(Base):
+    """角色签到日历（每个角色每年一条）
+
+    days 是 46 字节（366 位）的位图，第 n 位（从 0 开始）表示当年第 n + 1 天已签到（成功或重复签到）。
+    """
+    __tablename__ = "skland_attendance"
+
+    character_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("skland_characters.id"), primary_key=True, name="character_id"
+    )
+    """关联的角色 ID"""
+
+    year: Mapped[int] = mapped_column(Integer, primary_key=True, name="year")
+    """年份"""
+
+    days: Mapped[bytes] = mapped_column(LargeBinary(46), name="days")
+    """签到位图"""
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, onupdate=datetime.now, name="updated_at")
+    """更新时间"""
+
+    def __repr__(self) -> str:
+        return f"<Attendance(character_id={self.character_id}, year={self.year})>"
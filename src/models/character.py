@@ -1,6 +1,7 @@
 """角色模型"""
 
-from sqlalchemy import String, Text, Boolean, ForeignKey, Integer
+from datetime import datetime
+from sqlalchemy import String, Text, Boolean, ForeignKey, Integer, DateTime
 from sqlalchemy.orm import Mapped, mapped_column
 
 from database import Base
@@ -34,5 +35,17 @@ class Character(Base):
     is_default: Mapped[bool] = mapped_column(Boolean, default=False, name="is_default")
     """是否为默认角色"""
 
+    deleted_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, default=None, name="deleted_at")
+    """解绑时间（同步时角色已不在森空岛绑定列表中则软删除，为空表示有效）"""
+
+    last_sign_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, default=None, name="last_sign_at")
+    """最近一次签到时间（签到记录写入时同步更新）"""
+
+    last_status: Mapped[str] = mapped_column(String(20), nullable=True, default=None, name="last_status")
+    """最近一次签到状态（同一天已签到成功后不会被后续失败覆盖）"""
+
+    last_error_class: Mapped[str] = mapped_column(String(20), nullable=True, default=None, name="last_error_class")
+    """最近一次签到失败的分类"""
+
     def __repr__(self) -> str:
         return f"<Character(uid={self.uid}, nickname={self.nickname}, app={self.app_name})>"
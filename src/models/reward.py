@@ -0,0 +1,61 @@
+"""签到奖励模型"""
+
+from datetime import date
+from sqlalchemy import String, ForeignKey, Integer, Date, Index, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import Base
+
+
+class RewardItem(Base):
+    """奖励物品字典（每个游戏的每种物品一条）"""
+    __tablename__ = "skland_reward_item"
+    __table_args__ = (
+        UniqueConstraint("game_type", "item_key", name="uq_reward_item_game_key"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True, name="id")
+    """物品 ID"""
+
+    game_type: Mapped[str] = mapped_column(String(20), name="game_type")
+    """游戏类型（arknights/endfield）"""
+
+    item_key: Mapped[str] = mapped_column(String(100), name="item_key")
+    """物品标识（明日方舟为物品名称，终末地为资源 ID）"""
+
+    name: Mapped[str] = mapped_column(String(100), default="", name="name")
+    """物品名称"""
+
+    item_type: Mapped[str] = mapped_column(String(20), nullable=True, default="", name="item_type")
+    """物品类型（终末地的 type）"""
+
+    def __repr__(self) -> str:
+        return f"<RewardItem(id={self.id}, game={self.game_type}, name={self.name})>"
+
+
+class SignReward(Base):
+    """签到奖励明细（每条签到记录的每种物品一条）
+
+    冗余签到日期，按时间段统计奖励时只需扫描 (sign_date, item_id, count) 索引。
+    """
+    __tablename__ = "skland_sign_reward"
+    __table_args__ = (
+        Index("ix_sign_reward_date_item", "sign_date", "item_id", "count"),
+    )
+
+    record_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("skland_sign_record.id", ondelete="CASCADE"), primary_key=True, name="record_id"
+    )
+    """关联的签到记录 ID"""
+
+    item_id: Mapped[int] = mapped_column(Integer, ForeignKey("skland_reward_item.id"), primary_key=True, name="item_id")
+    """关联的物品 ID"""
+
+    count: Mapped[int] = mapped_column(Integer, default=1, name="count")
+    """数量"""
+
+    sign_date: Mapped[date] = mapped_column(Date, name="sign_date")
+    """签到日期（同签到记录）"""
+
+    def __repr__(self) -> str:
+        return f"<SignReward(record_id={self.record_id}, item_id={self.item_id}, count={self.count})>"
@@ -1,15 +1,23 @@
 """签到记录模型"""
 
-from datetime import datetime
-from sqlalchemy import String, Text, Boolean, ForeignKey, Integer, DateTime
+from datetime import date, datetime
+from sqlalchemy import String, Text, Boolean, ForeignKey, Integer, DateTime, Date, Index
 from sqlalchemy.orm import Mapped, mapped_column
 
 from database import Base
 
 
 class SignRecord(Base):
-    """签到记录模型"""
+    """签到记录模型
+
+    每个角色每个游戏每天一条记录（唯一索引 character_id + game_type + sign_date），
+    重复签到只更新状态和尝试次数。
+    """
     __tablename__ = "skland_sign_record"
+    __table_args__ = (
+        Index("uq_sign_record_character_game_date", "character_id", "game_type", "sign_date", unique=True),
+        Index("ix_sign_record_date_error_class", "sign_date", "error_class"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True, name="id")
     """记录 ID"""
@@ -26,8 +34,20 @@ class SignRecord(Base):
     sign_time: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, name="sign_time")
     """签到时间"""
 
+    sign_date: Mapped[date] = mapped_column(Date, nullable=True, name="sign_date")
+    """签到日期"""
+
     status: Mapped[str] = mapped_column(String(20), name="status")
-    """签到状态（success/failed/duplicate）"""
+    """签到状态（pending/success/failed/duplicate），pending 表示正在签到"""
+
+    attempts: Mapped[int] = mapped_column(Integer, default=1, server_default="1", name="attempts")
+    """当天的签到尝试次数"""
+
+    claimed_by: Mapped[str] = mapped_column(String(32), nullable=True, name="claimed_by")
+    """认领该角色签到的运行 ID"""
+
+    claimed_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, name="claimed_at")
+    """认领时间（超时未完成的认领可被其他运行接管）"""
 
     rewards: Mapped[str] = mapped_column(Text, nullable=True, default="", name="rewards")
     """奖励信息（JSON 格式）"""
@@ -35,5 +55,8 @@ class SignRecord(Base):
     error_message: Mapped[str] = mapped_column(Text, nullable=True, default="", name="error_message")
     """错误信息"""
 
+    error_class: Mapped[str] = mapped_column(String(20), nullable=True, name="error_class")
+    """失败原因分类（见 exception.ErrorClass），成功时为空"""
+
     def __repr__(self) -> str:
         return f"<SignRecord(id={self.id}, user_id={self.user_id}, game={self.game_type}, status={self.status})>"
@@ -0,0 +1,107 @@
+"""签到运行记录模型"""
+
+from datetime import datetime
+from sqlalchemy import String, ForeignKey, Integer, DateTime, Float
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import Base
+
+
+class SignRun(Base):
+    """签到运行模型（每次批量签到一条）"""
+    __tablename__ = "skland_sign_run"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True, name="id")
+    """运行 ID"""
+
+    game_type: Mapped[str] = mapped_column(String(20), name="game_type")
+    """游戏类型（arknights/endfield/all）"""
+
+    trigger: Mapped[str] = mapped_column(String(20), default="manual", name="trigger")
+    """触发方式（schedule/api/cli）"""
+
+    started_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, index=True, name="started_at")
+    """开始时间"""
+
+    finished_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, name="finished_at")
+    """结束时间"""
+
+    duration_ms: Mapped[float] = mapped_column(Float, default=0, name="duration_ms")
+    """总耗时（毫秒）"""
+
+    total: Mapped[int] = mapped_column(Integer, default=0, name="total")
+    """处理角色数"""
+
+    success: Mapped[int] = mapped_column(Integer, default=0, name="success")
+    """成功数"""
+
+    failed: Mapped[int] = mapped_column(Integer, default=0, name="failed")
+    """失败数"""
+
+    duplicate: Mapped[int] = mapped_column(Integer, default=0, name="duplicate")
+    """重复签到数"""
+
+    plan_ms: Mapped[float] = mapped_column(Float, default=0, name="plan_ms")
+    """规划阶段耗时（加载用户、角色）"""
+
+    cred_refresh_ms: Mapped[float] = mapped_column(Float, default=0, name="cred_refresh_ms")
+    """凭证刷新耗时"""
+
+    sign_ms: Mapped[float] = mapped_column(Float, default=0, name="sign_ms")
+    """签到阶段耗时（包含 HTTP 和凭证刷新）"""
+
+    http_ms: Mapped[float] = mapped_column(Float, default=0, name="http_ms")
+    """HTTP 请求耗时"""
+
+    db_write_ms: Mapped[float] = mapped_column(Float, default=0, name="db_write_ms")
+    """数据库写入耗时"""
+
+    throughput: Mapped[float] = mapped_column(Float, default=0, name="throughput")
+    """吞吐量（角色/秒）"""
+
+    p95_ms: Mapped[float] = mapped_column(Float, default=0, name="p95_ms")
+    """单角色签到耗时 P95（毫秒）"""
+
+    def __repr__(self) -> str:
+        return f"<SignRun(id={self.id}, game={self.game_type}, duration_ms={self.duration_ms:.0f})>"
+
+
+class SignRunItem(Base):
+    """签到运行明细模型（每个角色一条）"""
+    __tablename__ = "skland_sign_run_item"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True, name="id")
+    """明细 ID"""
+
+    run_id: Mapped[int] = mapped_column(Integer, ForeignKey("skland_sign_run.id", ondelete="CASCADE"), index=True, name="run_id")
+    """关联的运行 ID"""
+
+    user_id: Mapped[int] = mapped_column(Integer, name="user_id")
+    """用户 ID"""
+
+    character_id: Mapped[int] = mapped_column(Integer, nullable=True, name="character_id")
+    """角色 ID"""
+
+    game_type: Mapped[str] = mapped_column(String(20), name="game_type")
+    """游戏类型"""
+
+    status: Mapped[str] = mapped_column(String(20), name="status")
+    """签到状态（success/failed/duplicate）"""
+
+    duration_ms: Mapped[float] = mapped_column(Float, default=0, name="duration_ms")
+    """总耗时（毫秒）"""
+
+    http_ms: Mapped[float] = mapped_column(Float, default=0, name="http_ms")
+    """HTTP 请求耗时"""
+
+    http_calls: Mapped[int] = mapped_column(Integer, default=0, name="http_calls")
+    """HTTP 请求次数"""
+
+    cred_refresh_ms: Mapped[float] = mapped_column(Float, default=0, name="cred_refresh_ms")
+    """凭证刷新耗时"""
+
+    db_write_ms: Mapped[float] = mapped_column(Float, default=0, name="db_write_ms")
+    """数据库写入耗时"""
+
+    def __repr__(self) -> str:
+        return f"<SignRunItem(run_id={self.run_id}, character_id={self.character_id}, status={self.status})>"
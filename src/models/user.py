@@ -1,6 +1,7 @@
 """用户模型"""
 
-from sqlalchemy import String, Text, Boolean, Integer
+from datetime import datetime
+from sqlalchemy import String, Text, Boolean, Integer, DateTime
 from sqlalchemy.orm import Mapped, mapped_column
 
 from database import Base
@@ -34,5 +35,26 @@ class User(Base):
     remark: Mapped[str] = mapped_column(Text, nullable=True, default="", name="remark")
     """备注信息"""
 
+    last_sign_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, default=None, name="last_sign_at")
+    """最近一次签到时间（所有角色中最近的一次）"""
+
+    last_status: Mapped[str] = mapped_column(String(20), nullable=True, default=None, name="last_status")
+    """最近一次签到状态（任一角色最近一次签到失败时为 failed）"""
+
+    last_error_class: Mapped[str] = mapped_column(String(20), nullable=True, default=None, name="last_error_class")
+    """最近一次签到失败的分类"""
+
+    cred_refreshed_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, default=None, name="cred_refreshed_at")
+    """最近一次获取或刷新 cred_token 的时间"""
+
+    cred_status: Mapped[str] = mapped_column(String(20), nullable=True, default=None, name="cred_status")
+    """最近一次凭证检查结果（ok/refreshed/invalid/error）"""
+
+    cred_checked_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, default=None, name="cred_checked_at")
+    """最近一次凭证检查时间"""
+
+    cred_error: Mapped[str] = mapped_column(Text, nullable=True, default=None, name="cred_error")
+    """最近一次凭证检查的错误信息"""
+
     def __repr__(self) -> str:
         return f"<User(id={self.id}, name={self.name}, enabled={self.enabled})>"
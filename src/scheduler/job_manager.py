@@ -4,20 +4,26 @@
 """
 
 import random
-from datetime import time
+from datetime import date, datetime, time, timedelta
 from typing import Literal
 
+from apscheduler.events import EVENT_JOB_SUBMITTED, JobSubmissionEvent
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
-from config import config
+from config import config, accounts_config
 from database import db
 from utils.logger import logger
 from utils.decorators import refresh_cred_token_with_error_return, refresh_access_token_with_error_return
 from models import User
 from schemas import CRED, ArkSignResponse, EndfieldSignResponse
 from core import SklandAPI
-from core.sign_service import sign_all_users, bind_characters
+from core.sign_service import sign_all_users, bind_characters, sync_all_characters
+from core.archive import archive_records
+from core.cred_health import check_all_credentials, refresh_stale_cred_tokens
+from core.accounts_file import accounts_file
+from core.metrics import SCHEDULER_LAG
 
 
 class JobManager:
@@ -25,6 +31,8 @@ class JobManager:
 
     def __init__(self):
         self.scheduler = AsyncIOScheduler(timezone=config.scheduler.timezone)
+        self._pending_profile: tuple[set[str], int] | None = None
+        self.last_profile: dict | None = None
 
     def start(self):
         """启动定时任务"""
@@ -50,16 +58,100 @@ class JobManager:
             replace_existing=True,
         )
 
+        # 添加角色同步任务
+        if config.scheduler.character_sync_time:
+            sync_hour, sync_minute = map(int, config.scheduler.character_sync_time.split(":"))
+            self.scheduler.add_job(
+                self._run_character_sync,
+                trigger=CronTrigger(hour=sync_hour, minute=sync_minute),
+                id="daily_character_sync",
+                name="每日同步角色",
+                replace_existing=True,
+            )
+
+        # 添加凭证检查任务（签到前提前刷新失效的凭证）
+        if config.scheduler.cred_check_time:
+            check_hour, check_minute = map(int, config.scheduler.cred_check_time.split(":"))
+            self.scheduler.add_job(
+                self._run_cred_check,
+                trigger=CronTrigger(hour=check_hour, minute=check_minute),
+                id="daily_cred_check",
+                name="每日检查账号凭证",
+                replace_existing=True,
+            )
+
+        # 添加 cred_token 预刷新任务（明日方舟签到前几分钟）
+        if config.scheduler.cred_refresh_before > 0:
+            refresh_at = datetime.combine(date.today(), time(ark_hour, ark_minute)) - timedelta(
+                minutes=config.scheduler.cred_refresh_before
+            )
+            self.scheduler.add_job(
+                self._run_cred_token_refresh,
+                trigger=CronTrigger(hour=refresh_at.hour, minute=refresh_at.minute),
+                id="daily_cred_token_refresh",
+                name="签到前预刷新 cred_token",
+                replace_existing=True,
+            )
+
+        # 添加签到记录归档任务
+        if config.archive.enabled:
+            archive_hour, archive_minute = map(int, config.archive.time.split(":"))
+            self.scheduler.add_job(
+                self._run_archive,
+                trigger=CronTrigger(hour=archive_hour, minute=archive_minute),
+                id="daily_record_archive",
+                name="归档旧签到记录",
+                replace_existing=True,
+            )
+
+        # 添加签到记录分区维护任务（每月创建接下来几个月的分区）
+        if config.database.partition_sign_record:
+            self.scheduler.add_job(
+                db.ensure_partitions,
+                trigger=CronTrigger(day=1, hour=3, minute=0),
+                id="monthly_sign_record_partitions",
+                name="创建签到记录分区",
+                replace_existing=True,
+            )
+
+        # 添加账号文件检查任务（文件变化后自动同步账号）
+        if accounts_config.watch_interval > 0:
+            self.scheduler.add_job(
+                accounts_file.reload,
+                trigger=IntervalTrigger(seconds=accounts_config.watch_interval),
+                id="accounts_file_watch",
+                name="同步账号文件",
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+            )
+
+        self.scheduler.add_listener(self._on_job_submitted, EVENT_JOB_SUBMITTED)
         self.scheduler.start()
-        logger.info(f"定时任务已启动")
-        logger.info(f"明日方舟签到时间: {config.scheduler.arknights_sign_time}")
-        logger.info(f"终末地签到时间: {config.scheduler.endfield_sign_time}")
+        logger.info("定时任务已启动")
+        logger.info("明日方舟签到时间: {}", config.scheduler.arknights_sign_time)
+        logger.info("终末地签到时间: {}", config.scheduler.endfield_sign_time)
+        if config.scheduler.character_sync_time:
+            logger.info("角色同步时间: {}", config.scheduler.character_sync_time)
+        if config.scheduler.cred_check_time:
+            logger.info("凭证检查时间: {}", config.scheduler.cred_check_time)
+        if config.scheduler.cred_refresh_before > 0:
+            logger.info("cred_token 预刷新时间: 明日方舟签到前 {} 分钟", config.scheduler.cred_refresh_before)
 
     def shutdown(self):
         """关闭定时任务"""
         self.scheduler.shutdown()
         logger.info("定时任务已关闭")
 
+    @staticmethod
+    def _on_job_submitted(event: JobSubmissionEvent):
+        """记录任务提交相对计划时间的延迟"""
+        if not event.scheduled_run_times:
+            return
+        scheduled = event.scheduled_run_times[-1]
+        lag = datetime.now(scheduled.tzinfo) - scheduled
+        SCHEDULER_LAG.labels(job=event.job_id).set(lag.total_seconds())
+
     @staticmethod
     def _get_random_delay() -> int:
         """获取随机延迟时间"""
@@ -67,50 +159,101 @@ class JobManager:
             return random.randint(0, config.scheduler.random_delay)
         return 0
 
-    @staticmethod
-    async def _run_arknights_sign():
-        """执行明日方舟签到"""
-        logger.info("开始执行明日方舟每日签到")
+    def profile_next_run(self, kinds: set[str], top: int = 20):
+        """为下一次定时签到开启性能分析（只生效一次）"""
+        self._pending_profile = (kinds, top)
+        logger.info("下一次定时签到将进行性能分析: {}", ', '.join(sorted(kinds)))
+
+    @property
+    def pending_profile(self) -> tuple[set[str], int] | None:
+        """待执行的性能分析配置"""
+        return self._pending_profile
 
-        async with db.get_session() as session:
-            results = await sign_all_users(session, "arknights")
+    async def _run_sign(self, game_type: Literal["arknights", "endfield"], trigger: str = "schedule"):
+        """执行签到（定时签到时如已开启则进行性能分析，手动签到不消耗待执行的性能分析）"""
+        profiler = None
+        if trigger == "schedule" and self._pending_profile is not None:
+            from utils.profiler import RunProfiler
 
-            # 输出结果
-            for user_name, result in results.items():
-                logger.info(f"\n{result.summary}")
-                for nickname, detail in result.details.items():
-                    logger.info(f"  {nickname}: {detail}")
+            kinds, top = self._pending_profile
+            self._pending_profile = None
+            profiler = RunProfiler(kinds, top=top)
+            async with profiler:
+                results = await sign_all_users(game_type, trigger=trigger)
+        else:
+            results = await sign_all_users(game_type, trigger=trigger)
 
+        # 输出结果
+        for user_name, result in results.items():
+            logger.info("\n{}", result.summary)
+            for nickname, detail in result.details.items():
+                logger.info("  {}: {}", nickname, detail)
+
+        if profiler is not None:
+            self.last_profile = {
+                "game_type": game_type,
+                "output_dir": str(profiler.output_dir),
+                "report": profiler.report,
+            }
+            logger.info("\n{}", profiler.report)
+
+    async def _run_arknights_sign(self, trigger: str = "schedule"):
+        """执行明日方舟签到"""
+        logger.info("开始执行明日方舟每日签到")
+        await self._run_sign("arknights", trigger)
         logger.info("明日方舟每日签到完成")
 
-    @staticmethod
-    async def _run_endfield_sign():
+    async def _run_endfield_sign(self, trigger: str = "schedule"):
         """执行终末地签到"""
         logger.info("开始执行终末地每日签到")
+        await self._run_sign("endfield", trigger)
+        logger.info("终末地每日签到完成")
 
-        async with db.get_session() as session:
-            results = await sign_all_users(session, "endfield")
+    async def _run_character_sync(self):
+        """同步所有账号的角色"""
+        logger.info("开始执行每日角色同步")
+        await sync_all_characters(trigger="schedule")
+        logger.info("每日角色同步完成")
 
-            # 输出结果
-            for user_name, result in results.items():
-                logger.info(f"\n{result.summary}")
-                for nickname, detail in result.details.items():
-                    logger.info(f"  {nickname}: {detail}")
+    async def _run_cred_check(self):
+        """检查所有账号的凭证"""
+        logger.info("开始执行每日凭证检查")
+        await check_all_credentials(trigger="schedule")
+        logger.info("每日凭证检查完成")
 
-        logger.info("终末地每日签到完成")
+    async def _run_cred_token_refresh(self):
+        """预刷新较旧的 cred_token"""
+        logger.info("开始执行签到前 cred_token 预刷新")
+        await refresh_stale_cred_tokens(
+            timedelta(minutes=config.scheduler.cred_refresh_max_age), trigger="schedule"
+        )
+        logger.info("签到前 cred_token 预刷新完成")
+
+    async def _run_archive(self):
+        """归档旧的签到记录"""
+        before = date.today() - timedelta(days=config.archive.after_days)
+        await archive_records(before, config.archive.chunk_size)
 
     async def run_arknights_sign_now(self):
         """立即执行明日方舟签到"""
-        await self._run_arknights_sign()
+        await self._run_arknights_sign(trigger="manual")
 
     async def run_endfield_sign_now(self):
         """立即执行终末地签到"""
-        await self._run_endfield_sign()
+        await self._run_endfield_sign(trigger="manual")
 
     async def run_all_sign_now(self):
         """立即执行所有签到"""
-        await self._run_arknights_sign()
-        await self._run_endfield_sign()
+        await self._run_arknights_sign(trigger="manual")
+        await self._run_endfield_sign(trigger="manual")
+
+    async def sync_characters_now(self):
+        """立即同步所有账号的角色"""
+        return await sync_all_characters(trigger="api")
+
+    async def check_credentials_now(self):
+        """立即检查所有账号的凭证"""
+        return await check_all_credentials(trigger="api")
 
     def get_jobs(self):
         """获取所有任务"""
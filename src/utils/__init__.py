@@ -1,6 +1,6 @@
 """工具模块"""
 
-from utils.logger import setup_logger
+from utils.logger import setup_logger, shutdown_logger
 from utils.decorators import (
     refresh_cred_token_if_needed,
     refresh_cred_token_with_error_return,
@@ -10,6 +10,7 @@ from utils.decorators import (
 
 __all__ = [
     "setup_logger",
+    "shutdown_logger",
     "refresh_cred_token_if_needed",
     "refresh_cred_token_with_error_return",
     "refresh_access_token_if_needed",
@@ -8,6 +8,7 @@ from typing import TypeVar, ParamSpec, Concatenate
 
 from utils.logger import logger
 from core.skland_login import SklandLoginAPI
+from core.cache import invalidate_cred
 from exception import LoginException, RequestException, UnauthorizedException
 
 P = ParamSpec("P")
@@ -25,12 +26,12 @@ def refresh_cred_token_if_needed(func: Callable[Concatenate["User", P], Coroutin
             try:
                 new_token = await SklandLoginAPI.refresh_token(user.cred)
                 user.cred_token = new_token
-                logger.info(f"用户 {user.name} cred_token 失效，已自动刷新")
+                logger.info("用户 {} cred_token 失效，已自动刷新", user.name)
                 return await func(user, *args, **kwargs)
             except (RequestException, LoginException, UnauthorizedException) as e:
-                logger.error(f"用户 {user.name} 刷新 cred_token 失败: {e}")
+                logger.error("用户 {} 刷新 cred_token 失败: {}", user.name, e)
         except RequestException as e:
-            logger.error(f"用户 {user.name} 请求失败: {e}")
+            logger.error("用户 {} 请求失败: {}", user.name, e)
 
     return wrapper
 
@@ -46,15 +47,15 @@ def refresh_cred_token_with_error_return(func: Callable[Concatenate["User", P],
             try:
                 new_token = await SklandLoginAPI.refresh_token(user.cred)
                 user.cred_token = new_token
-                logger.info(f"用户 {user.name} cred_token 失效，已自动刷新")
+                logger.info("用户 {} cred_token 失效，已自动刷新", user.name)
                 return await func(user, *args, **kwargs)
             except (RequestException, LoginException, UnauthorizedException) as e:
                 error_msg = f"接口请求失败, {e.args[0] if e.args else str(e)}"
-                logger.error(f"用户 {user.name} {error_msg}")
+                logger.error("用户 {} {}", user.name, error_msg)
                 return error_msg
         except RequestException as e:
             error_msg = f"接口请求失败, {e.args[0] if e.args else str(e)}"
-            logger.error(f"用户 {user.name} {error_msg}")
+            logger.error("用户 {} {}", user.name, error_msg)
             return error_msg
 
     return wrapper
@@ -69,23 +70,24 @@ def refresh_access_token_if_needed(func: Callable[Concatenate["User", P], Corout
             return await func(user, *args, **kwargs)
         except LoginException:
             if not user.token:
-                logger.error(f"用户 {user.name} cred 失效，但未配置 token，无法自动刷新")
+                logger.error("用户 {} cred 失效，但未配置 token，无法自动刷新", user.name)
                 return None
 
             try:
                 from schemas import CRED
                 grant_code = await SklandLoginAPI.get_grant_code(user.token, 0)
                 new_cred = await SklandLoginAPI.get_cred(grant_code)
+                invalidate_cred(user.cred)
                 user.cred = new_cred.cred
                 user.cred_token = new_cred.token
                 if new_cred.userId:
                     user.user_id = new_cred.userId
-                logger.info(f"用户 {user.name} cred 失效，已自动刷新")
+                logger.info("用户 {} cred 失效，已自动刷新", user.name)
                 return await func(user, *args, **kwargs)
             except (RequestException, LoginException, UnauthorizedException) as e:
-                logger.error(f"用户 {user.name} 刷新 cred 失败: {e}")
+                logger.error("用户 {} 刷新 cred 失败: {}", user.name, e)
         except RequestException as e:
-            logger.error(f"用户 {user.name} 请求失败: {e}")
+            logger.error("用户 {} 请求失败: {}", user.name, e)
 
     return wrapper
 
@@ -100,26 +102,27 @@ def refresh_access_token_with_error_return(func: Callable[Concatenate["User", P]
         except LoginException:
             if not user.token:
                 error_msg = "cred 失效，但未配置 token，无法自动刷新"
-                logger.error(f"用户 {user.name} {error_msg}")
+                logger.error("用户 {} {}", user.name, error_msg)
                 return error_msg
 
             try:
                 from schemas import CRED
                 grant_code = await SklandLoginAPI.get_grant_code(user.token, 0)
                 new_cred = await SklandLoginAPI.get_cred(grant_code)
+                invalidate_cred(user.cred)
                 user.cred = new_cred.cred
                 user.cred_token = new_cred.token
                 if new_cred.userId:
                     user.user_id = new_cred.userId
-                logger.info(f"用户 {user.name} cred 失效，已自动刷新")
+                logger.info("用户 {} cred 失效，已自动刷新", user.name)
                 return await func(user, *args, **kwargs)
             except (RequestException, LoginException, UnauthorizedException) as e:
                 error_msg = f"接口请求失败, {e.args[0] if e.args else str(e)}"
-                logger.error(f"用户 {user.name} {error_msg}")
+                logger.error("用户 {} {}", user.name, error_msg)
                 return error_msg
         except RequestException as e:
             error_msg = f"接口请求失败, {e.args[0] if e.args else str(e)}"
-            logger.error(f"用户 {user.name} {error_msg}")
+            logger.error("用户 {} {}", user.name, error_msg)
             return error_msg
 
     return wrapper
@@ -3,18 +3,98 @@
 使用 loguru 配置应用日志。
 """
 
+import asyncio
+import atexit
+import collections
+import copy
+import json
 import sys
+import threading
 from pathlib import Path
 from loguru import logger
 
 from config import config, get_data_dir
 
 
+class _BackgroundWriter:
+    """后台线程写日志文件
+
+    调用线程只负责格式化并追加到缓冲区，后台线程定时将缓冲区按文件合并写入，
+    文件写入、轮转和压缩都不在事件循环上执行。
+    （loguru 自带的 enqueue 会对每条记录做 pickle 并唤醒写线程，调用方开销反而更高。）
+    """
+
+    def __init__(self, interval: float = 0.2):
+        self._interval = interval
+        self._buffer: collections.deque[tuple[str, str]] = collections.deque()
+        # 独立的 logger 实例，拥有自己的处理器集合，只由后台线程使用
+        self._file_logger = copy.deepcopy(logger)
+        self._targets = {}
+        self._wakeup = threading.Event()
+        self._written = threading.Condition()
+        self._generation = 0  # 已完成的写入轮数
+        self._stopped = False
+        self._thread = threading.Thread(target=self._worker, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def add(self, path: Path, level: str, format, **kwargs):
+        """添加一个文件输出"""
+        target = str(path)
+        self._file_logger.add(path, filter=lambda record: record["extra"].get("target") == target, **kwargs)
+        self._targets[target] = self._file_logger.bind(target=target).opt(raw=True)
+        # deque.append 是线程安全的，且不会唤醒写线程
+        logger.add(lambda message: self._buffer.append((target, message)), level=level, format=format)
+
+    def _write_pending(self):
+        batches: dict[str, list[str]] = {}
+        while self._buffer:
+            target, message = self._buffer.popleft()
+            batches.setdefault(target, []).append(message)
+        for target, messages in batches.items():
+            self._targets[target].info("".join(messages))
+
+    def _worker(self):
+        while not self._stopped:
+            self._wakeup.wait(self._interval)
+            self._wakeup.clear()
+            self._write_pending()
+            with self._written:
+                self._generation += 1
+                self._written.notify_all()
+        self._write_pending()
+
+    def flush(self):
+        """等待缓冲区中的日志全部写入"""
+        with self._written:
+            # 调用时可能正处于一轮写入中，需再完整写一轮才能保证之前的日志都已写入
+            target = self._generation + 2
+            while self._generation < target and self._thread.is_alive():
+                self._wakeup.set()
+                self._written.wait(timeout=1)
+
+    def stop(self):
+        """写完剩余日志并关闭文件"""
+        if self._thread.is_alive():
+            self._stopped = True
+            self._wakeup.set()
+            self._thread.join(timeout=10)
+        self._file_logger.remove()
+
+
+_writer: _BackgroundWriter | None = None
+
+
 def setup_logger():
     """配置日志系统"""
+    global _writer
 
     # 移除默认处理器
     logger.remove()
+    if _writer is not None:
+        _writer.stop()
+    # 需在添加控制台输出前创建，独立 logger 由当前（空的）logger 复制而来
+    _writer = _BackgroundWriter()
+    atexit.register(_writer.stop)
 
     # 控制台输出
     logger.add(
@@ -31,7 +111,7 @@ def setup_logger():
 
     log_dir.mkdir(parents=True, exist_ok=True)
 
-    logger.add(
+    _writer.add(
         log_dir / "app.log",
         level=config.logging.level,
         format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
@@ -42,7 +122,7 @@ def setup_logger():
     )
 
     # 错误日志单独文件
-    logger.add(
+    _writer.add(
         log_dir / "error.log",
         level="ERROR",
         format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
@@ -52,4 +132,40 @@ def setup_logger():
         encoding="utf-8",
     )
 
+    # 结构化日志（JSON Lines），附带 run_id、user_id、character_id 等上下文
+    if config.logging.json_enabled:
+        _writer.add(
+            log_dir / "app.jsonl",
+            level=config.logging.level,
+            format=_json_format,
+            rotation=config.logging.rotation,
+            retention=config.logging.retention,
+            compression="zip",
+            encoding="utf-8",
+        )
+
     return logger
+
+
+def _json_format(record) -> str:
+    """生成单行 JSON 日志"""
+    data = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "name": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+        **{k: v for k, v in record["extra"].items() if not k.startswith("_")},
+    }
+    if record["exception"] is not None:
+        data["exception"] = f"{record['exception'].type.__name__}: {record['exception'].value}"
+    record["extra"]["_json"] = json.dumps(data, ensure_ascii=False, default=str)
+    return "{extra[_json]}\n"
+
+
+async def shutdown_logger():
+    """等待后台队列中的日志全部写入"""
+    await logger.complete()
+    if _writer is not None:
+        await asyncio.to_thread(_writer.flush)
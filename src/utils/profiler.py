@@ -0,0 +1,190 @@
+"""性能分析模块
+
+对单次签到运行采集性能数据，输出到 data/profiles/<时间戳>/：
+- cpu: cProfile 统计（cpu.prof，可用 snakeviz / pstats 查看）
+- tasks: asyncio 任务时间线（tasks.json）
+- memory: tracemalloc 内存快照（memory.snapshot）及相对运行开始的增长
+运行结束后生成 top-N 文本报告（report.txt）。
+"""
+
+import asyncio
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from config import get_data_dir
+
+PROFILE_KINDS = ("cpu", "tasks", "memory")
+
+
+def parse_profile_kinds(value: str) -> set[str]:
+    """解析逗号分隔的分析类型，如 "cpu,memory"；"all" 表示全部"""
+    kinds = {kind.strip() for kind in value.split(",") if kind.strip()}
+    if "all" in kinds:
+        return set(PROFILE_KINDS)
+    unknown = kinds - set(PROFILE_KINDS)
+    if unknown:
+        raise ValueError(f"未知的分析类型: {', '.join(sorted(unknown))}（可选: {', '.join(PROFILE_KINDS)}）")
+    return kinds
+
+
+class _TaskTimeline:
+    """记录 asyncio 任务的创建和结束时间"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._previous_factory = None
+        self._start = time.perf_counter()
+        self._main: dict | None = None
+        self.tasks: list[dict] = []
+
+    def _factory(self, loop, coro, **kwargs):
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        entry = {
+            "name": task.get_name(),
+            "coro": getattr(coro, "__qualname__", repr(coro)),
+            "start_ms": (time.perf_counter() - self._start) * 1000,
+            "end_ms": None,
+            "state": "pending",
+        }
+        self.tasks.append(entry)
+
+        def _done(t: asyncio.Task):
+            entry["end_ms"] = (time.perf_counter() - self._start) * 1000
+            entry["state"] = "cancelled" if t.cancelled() else ("error" if t.exception() else "done")
+
+        task.add_done_callback(_done)
+        return task
+
+    def start(self):
+        current = asyncio.current_task()
+        if current is not None:
+            self._main = {
+                "name": current.get_name(),
+                "coro": "(运行所在任务)",
+                "start_ms": 0.0,
+                "end_ms": None,
+                "state": "running",
+            }
+            self.tasks.append(self._main)
+        self._previous_factory = self._loop.get_task_factory()
+        self._loop.set_task_factory(self._factory)
+
+    def stop(self):
+        self._loop.set_task_factory(self._previous_factory)
+        if self._main is not None:
+            self._main["end_ms"] = (time.perf_counter() - self._start) * 1000
+        for entry in self.tasks:
+            if entry["end_ms"] is not None:
+                entry["duration_ms"] = entry["end_ms"] - entry["start_ms"]
+
+
+class RunProfiler:
+    """单次运行的性能分析器
+
+    用法::
+
+        async with RunProfiler({"cpu", "memory"}) as profiler:
+            await sign_all_users(...)
+        print(profiler.report)
+    """
+
+    def __init__(self, kinds: set[str], top: int = 20, output_dir: Path | None = None):
+        self.kinds = kinds
+        self.top = top
+        self.output_dir = output_dir or get_data_dir() / "profiles" / datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.report = ""
+        self._cpu: cProfile.Profile | None = None
+        self._tasks: _TaskTimeline | None = None
+        self._memory_baseline: tracemalloc.Snapshot | None = None
+        self._started_tracemalloc = False
+        self._start = 0.0
+
+    # 排除分析器自身（cProfile、tracemalloc）产生的内存分配
+    _memory_filters = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+        tracemalloc.Filter(False, pstats.__file__),
+        tracemalloc.Filter(False, __file__),
+    )
+
+    async def __aenter__(self) -> "RunProfiler":
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if "memory" in self.kinds:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+                self._started_tracemalloc = True
+            self._memory_baseline = tracemalloc.take_snapshot()
+        if "tasks" in self.kinds:
+            self._tasks = _TaskTimeline(asyncio.get_running_loop())
+            self._tasks.start()
+        if "cpu" in self.kinds:
+            self._cpu = cProfile.Profile()
+            self._cpu.enable()
+        self._start = time.perf_counter()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        if self._cpu is not None:
+            self._cpu.disable()
+        if self._tasks is not None:
+            self._tasks.stop()
+        # 先取内存快照，避免统计到生成报告本身的内存分配
+        snapshot = None
+        if self._memory_baseline is not None:
+            snapshot = tracemalloc.take_snapshot().filter_traces(self._memory_filters)
+            memory_usage = tracemalloc.get_traced_memory()
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+
+        sections = [f"=== 性能分析报告 ({', '.join(sorted(self.kinds))}) ===\n运行耗时: {elapsed * 1000:.0f}ms"]
+
+        if self._cpu is not None:
+            self._cpu.dump_stats(self.output_dir / "cpu.prof")
+            sections.append(self._cpu_report())
+
+        if self._tasks is not None:
+            with open(self.output_dir / "tasks.json", "w", encoding="utf-8") as f:
+                json.dump(self._tasks.tasks, f, ensure_ascii=False, indent=2)
+            sections.append(self._tasks_report())
+
+        if snapshot is not None:
+            snapshot.dump(str(self.output_dir / "memory.snapshot"))
+            sections.append(self._memory_report(snapshot, *memory_usage))
+
+        sections.append(f"输出目录: {self.output_dir}")
+        self.report = "\n\n".join(sections)
+        (self.output_dir / "report.txt").write_text(self.report, encoding="utf-8")
+
+    def _cpu_report(self) -> str:
+        stream = io.StringIO()
+        stats = pstats.Stats(self._cpu, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        return f"--- CPU (按累计耗时 top {self.top}) ---\n{stream.getvalue().strip()}"
+
+    def _tasks_report(self) -> str:
+        tasks = sorted(self._tasks.tasks, key=lambda t: t.get("duration_ms", 0), reverse=True)[: self.top]
+        lines = [f"--- asyncio 任务 (共 {len(self._tasks.tasks)} 个，按耗时 top {self.top}) ---"]
+        for task in tasks:
+            duration = task.get("duration_ms")
+            duration_text = f"{duration:8.1f}ms" if duration is not None else "   未结束"
+            lines.append(f"{duration_text}  +{task['start_ms']:.1f}ms  {task['state']:<9} {task['name']} {task['coro']}")
+        return "\n".join(lines)
+
+    def _memory_report(self, snapshot: tracemalloc.Snapshot, current: int, peak: int) -> str:
+        lines = [
+            f"--- 内存 (当前 {current / 1024:.1f} KiB，峰值 {peak / 1024:.1f} KiB，按增长 top {self.top}) ---"
+        ]
+        baseline = self._memory_baseline.filter_traces(self._memory_filters)
+        for stat in snapshot.compare_to(baseline, "lineno")[: self.top]:
+            lines.append(str(stat))
+        return "\n".join(lines)